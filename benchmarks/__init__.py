@@ -0,0 +1,4 @@
+"""
+Benchmarks for the celestial system. Run them from the repository root, for example
+`python -m benchmarks.memory`.
+"""
@@ -0,0 +1,115 @@
+"""
+Measures how quickly the ephemeris computes positions for a large catalog, against a
+per-body Python loop solving Kepler's equation one body and one time at a time.
+
+Usage:
+    python -m benchmarks.ephemeris [--bodies 100000] [--times 1000] [--chunk-size 10] [--sample 2000]
+"""
+
+import argparse
+import math
+import time
+import numpy as np
+from ephemeris import Ephemeris
+
+
+def synthetic_ephemeris(num_bodies: int, moons_per_planet: int = 9, seed: int = 0) -> Ephemeris:
+    """
+    Builds an ephemeris of a star, its planets and their moons with random elliptical orbits.
+
+    Args:
+        num_bodies (int): The number of planets and moons.
+        moons_per_planet (int): The number of moons around each planet. Defaults to 9.
+        seed (int): The random seed. Defaults to 0.
+
+    Returns:
+        Ephemeris: The ephemeris.
+    """
+    rng = np.random.default_rng(seed)
+    num_planets = max(num_bodies // (moons_per_planet + 1), 1)
+    rows = np.arange(num_bodies)
+    parents = np.concatenate([[-1], np.where(rows < num_planets, 0, 1 + (rows - num_planets) % num_planets)])
+    count = num_bodies + 1
+    return Ephemeris(
+        names=[f"Body-{row}" for row in range(count)],
+        parents=parents,
+        semi_major_axis=np.where(parents == 0, rng.uniform(50, 5000, count), rng.uniform(0.1, 2, count)),
+        eccentricity=rng.uniform(0, 0.3, count),
+        inclination=rng.uniform(0, 0.1, count),
+        ascending_node=rng.uniform(0, 2 * math.pi, count),
+        argument_of_periapsis=rng.uniform(0, 2 * math.pi, count),
+        mean_anomaly=rng.uniform(0, 2 * math.pi, count),
+        epoch=np.zeros(count),
+        mean_motion=rng.uniform(0.001, 0.5, count),
+    )
+
+
+def loop_positions(ephemeris: Ephemeris, times, count: int) -> float:
+    """
+    Computes the first bodies' offsets from their primaries with a Python loop per body and
+    time, as a baseline.
+
+    Args:
+        ephemeris (Ephemeris): The ephemeris holding the orbital elements.
+        times (Iterable[float]): The times, in days.
+        count (int): The number of bodies to compute.
+
+    Returns:
+        float: A checksum of the positions, so the work isn't optimised away.
+    """
+    total = 0.0
+    for row in range(count):
+        e = ephemeris.eccentricity[row]
+        a = ephemeris.semi_major_axis[row]
+        p_axis, q_axis = ephemeris.p_axis[row], ephemeris.q_axis[row]
+        for t in times:
+            mean = (ephemeris.mean_anomaly[row] + ephemeris.mean_motion[row] * (t - ephemeris.epoch[row])) % (2 * math.pi)
+            anomaly = mean
+            for _ in range(50):
+                step = (anomaly - e * math.sin(anomaly) - mean) / (1 - e * math.cos(anomaly))
+                anomaly -= step
+                if abs(step) < 1e-12:
+                    break
+            x = a * (math.cos(anomaly) - e)
+            y = a * math.sqrt(1 - e * e) * math.sin(anomaly)
+            total += x * p_axis[0] + y * q_axis[0]
+    return total
+
+
+def main() -> None:
+    """
+    Times the vectorised ephemeris over every body and time, and the per-body loop over a sample.
+    """
+    parser = argparse.ArgumentParser(description="Measure vectorised ephemeris throughput.")
+    parser.add_argument("--bodies", type=int, default=100_000, help="number of bodies (default: 100000)")
+    parser.add_argument("--times", type=int, default=1_000, help="number of timestamps (default: 1000)")
+    parser.add_argument("--chunk-size", type=int, default=10, help="timestamps solved per batch (default: 10)")
+    parser.add_argument("--sample", type=int, default=2_000,
+                        help="bodies computed by the per-body loop baseline (default: 2000)")
+    args = parser.parse_args()
+
+    ephemeris = synthetic_ephemeris(args.bodies)
+    times = np.linspace(0, 3650, args.times)
+    evaluations = len(ephemeris) * len(times)
+
+    start = time.perf_counter()
+    checksum = 0.0
+    for _, positions in ephemeris.iter_positions(times, args.chunk_size):
+        checksum += float(positions[..., 0].sum())
+    elapsed = time.perf_counter() - start
+    batch_mb = args.chunk_size * len(ephemeris) * 3 * 8 / 2 ** 20
+    print(f"{len(ephemeris)} bodies x {len(times)} times, {args.chunk_size} times per batch ({batch_mb:.0f} MB)")
+    print(f"vectorised: {elapsed:.2f}s, {evaluations / elapsed / 1e6:.1f}M positions/s")
+
+    sample = min(args.sample, len(ephemeris))
+    sample_times = times[:10]
+    start = time.perf_counter()
+    loop_positions(ephemeris, sample_times, sample)
+    loop_elapsed = time.perf_counter() - start
+    loop_rate = sample * len(sample_times) / loop_elapsed
+    print(f"per-body loop: {loop_rate / 1e6:.2f}M positions/s "
+          f"(about {evaluations / loop_rate:.0f}s for the full run, {evaluations / elapsed / loop_rate:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures how long importing a module takes with `python -X importtime`, in a fresh
+interpreter each time, and checks the headless import path against a budget.
+
+Importing main is what every headless use pays for (--batch, --serve, the exports and the
+benchmarks themselves), so it must stay quick and must never pull in the GUI: tkinter,
+system_menu and system_ui are only imported when the menu is shown. NumPy is only imported
+by exports and proximity questions, and asyncio by the server. The run fails, with status
+1, if any of them is imported or the fastest import is over the budget.
+
+Usage:
+    python -m benchmarks.import_time [--module main] [--repeat 5] [--budget-ms 250] [--top 10]
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Modules that belong to the GUI and must not be imported on the headless path
+GUI_MODULES = ("tkinter", "_tkinter", "system_menu", "system_ui")
+# Modules only the paths that need them import
+DEFERRED_MODULES = ("numpy", "asyncio")
+
+
+def measure_import(module: str = "main") -> dict:
+    """
+    Imports a module in a fresh interpreter with -X importtime and parses the report.
+
+    Args:
+        module (str): The module to import. Defaults to "main".
+
+    Returns:
+        dict: Maps each module imported to its self and cumulative time in microseconds.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():  # Skips the column header
+            times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def check_budget(times: dict, module: str, budget_ms: float) -> list:
+    """
+    Returns what is wrong with an import: GUI or deferred modules it pulled in, and going
+    over budget.
+
+    Args:
+        times (dict): The times returned by measure_import.
+        module (str): The module that was imported.
+        budget_ms (float): The most the import may take, in milliseconds.
+
+    Returns:
+        list: A message for each problem, empty if there are none.
+    """
+    problems = [f"{name} was imported" for name in GUI_MODULES + DEFERRED_MODULES if name in times]
+    total_ms = times[module][1] / 1000
+    if total_ms > budget_ms:
+        problems.append(f"importing {module} took {total_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+    return problems
+
+
+def main() -> None:
+    """
+    Parses the command line, times the import, prints the slowest modules and checks the budget.
+    """
+    parser = argparse.ArgumentParser(description="Time the headless import path and check it against a budget.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to time (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=250.0,
+                        help="most the fastest import may take, in milliseconds (default: 250)")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list (default: 10)")
+    args = parser.parse_args()
+
+    # The fastest run is the one least disturbed by the rest of the machine
+    runs = [measure_import(args.module) for _ in range(max(args.repeat, 1))]
+    times = min(runs, key=lambda run: run[args.module][1])
+
+    print(f"{'module':<40} {'self ms':>9} {'cumulative ms':>14}")
+    slowest = sorted(times.items(), key=lambda item: -item[1][0])[:args.top]
+    for name, (own, cumulative) in slowest:
+        print(f"{name:<40} {own / 1000:>9.1f} {cumulative / 1000:>14.1f}")
+    print(f"{len(times)} modules, {args.module} took {times[args.module][1] / 1000:.1f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+
+    problems = check_budget(times, args.module, args.budget_ms)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measures the memory used per body by the object model and the columnar store.
+
+Save a run with --output, then pass it as --baseline to a later run (for example after
+changing celestial.py) to print the bytes per body before and after the change.
+
+Usage:
+    python -m benchmarks.memory [--sizes 10000 100000 1000000] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import tracemalloc
+from functools import partial
+from benchmarks.synthetic import write_catalog
+from main import create_system, create_columnar_system
+
+
+LOADERS = {
+    "objects": create_system,
+    "lazy": partial(create_system, lazy_moons=True),
+    "columnar": create_columnar_system,
+}
+
+
+def measure(loader, star_name: str, planets_file: str, moons_file: str) -> int:
+    """
+    Returns the number of bytes still allocated once a loader has built a system.
+
+    Args:
+        loader (Callable): One of the LOADERS.
+        star_name (str): The name of the star.
+        planets_file (str): The path to the planets JSON file.
+        moons_file (str): The path to the moons JSON file.
+
+    Returns:
+        int: The bytes held by the built system.
+    """
+    gc.collect()
+    tracemalloc.start()
+    system = loader(star_name, planets_file, moons_file)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del system
+    return size
+
+
+def main() -> None:
+    """
+    Builds synthetic systems of each size and prints the bytes used per body.
+    """
+    parser = argparse.ArgumentParser(description="Measure memory used per body.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="numbers of bodies to build (default: 10^4 10^5 10^6)")
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    results = {}
+    print(f"{'bodies':>10} {'model':>9} {'before B/body':>14} {'after B/body':>13}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            planets_file, moons_file = write_catalog(folder, size)
+            for model, loader in LOADERS.items():
+                per_body = measure(loader, "Sol", planets_file, moons_file) / size
+                results.setdefault(str(size), {})[model] = per_body
+                before = baseline.get(str(size), {}).get(model)
+                before_text = f"{before:.1f}" if before is not None else "-"
+                print(f"{size:>10} {model:>9} {before_text:>14} {per_body:>13.1f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Times matching a question against the menu keywords and planet names, with the compiled
+MenuMatcher and with the substring loops the menu used before it, on catalogs with more
+and more planets. The loops rebuild their lists on every call, as they did in the menu.
+
+Usage:
+    python -m benchmarks.menu_matcher [--sizes 8 1000 10000 100000] [--repeat 200]
+"""
+
+import argparse
+import statistics
+import time
+from menu_matcher import MENU_CHOICES, MenuMatcher
+
+QUESTIONS = {
+    "named planet": "what is the mass of planet-{}",
+    "other sentence": "tell me everything about the solar system please",
+}
+
+
+def baseline_match(planet_names_text: str, user_input: str) -> tuple:
+    """
+    Matches a question with the substring loops the menu used before MenuMatcher.
+
+    Args:
+        planet_names_text (str): The comma separated planet names, as the star returns them.
+        user_input (str): The user's input string.
+
+    Returns:
+        tuple: The menu choice and planet name, or (None, None) if no menu choice matches.
+    """
+    user_input = user_input.lower()
+    choices = {choice: list(keywords) for choice, keywords in MENU_CHOICES.items()}
+    planet_names = [name.strip() for name in planet_names_text.split(",")]
+    for planet in planet_names:
+        if planet and planet.lower() in user_input:
+            planet_choice = planet
+            break
+    else:
+        planet_choice = None
+
+    if len(user_input.split()) < 2 and planet_choice is not None:
+        return 1, planet_choice
+
+    for choice, keywords in choices.items():
+        if any(keyword in user_input for keyword in keywords):
+            return choice, planet_choice
+    return None, None
+
+
+def time_per_call(function, repeat: int) -> float:
+    """
+    Returns the median time of a call, in seconds.
+
+    Args:
+        function (Callable): Called with no arguments.
+        repeat (int): The number of times to time the call.
+
+    Returns:
+        float: The median seconds per call.
+    """
+    times = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    """
+    Parses the command line and prints the time per question of each matcher.
+    """
+    parser = argparse.ArgumentParser(description="Compare MenuMatcher with the substring loops it replaced.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 1_000, 10_000, 100_000],
+                        help="numbers of planets (default: 8 to 10^5)")
+    parser.add_argument("--repeat", type=int, default=200, help="times each question is timed (default: 200)")
+    args = parser.parse_args()
+
+    print(f"{'planets':>8} {'question':>15} {'matcher ms':>11} {'baseline ms':>12} {'speedup':>8}")
+    for size in args.sizes:
+        names = [f"Planet-{number}" for number in range(size)]
+        names_text = ", ".join(names)
+        start = time.perf_counter()
+        matcher = MenuMatcher(names)
+        build = time.perf_counter() - start
+        for label, template in QUESTIONS.items():
+            question = template.format(size * 3 // 4)
+            assert matcher.match(question) == baseline_match(names_text, question)
+            compiled = time_per_call(lambda: matcher.match(question), args.repeat)
+            baseline = time_per_call(lambda: baseline_match(names_text, question), args.repeat)
+            print(f"{size:>8} {label:>15} {compiled * 1000:>11.4f} {baseline * 1000:>12.4f} "
+                  f"{baseline / compiled:>7.0f}x")
+        print(f"{size:>8} {'(build)':>15} {build * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
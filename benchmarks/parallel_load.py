@@ -0,0 +1,52 @@
+"""
+Measures how loading a multi-star catalog scales with the number of worker processes.
+
+Usage:
+    python -m benchmarks.parallel_load [--stars 32] [--bodies 20000] [--workers 1 2 4 8] [--chunk-size 1]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from benchmarks.synthetic import write_catalog
+from main import create_catalog
+
+
+def main() -> None:
+    """
+    Writes a synthetic catalog of star systems and times loading it with each worker count.
+    """
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(2 ** power for power in range(1, cpus.bit_length()) if 2 ** power <= cpus), cpus})
+
+    parser = argparse.ArgumentParser(description="Measure multi-star catalog loading against worker count.")
+    parser.add_argument("--stars", type=int, default=32, help="number of star systems (default: 32)")
+    parser.add_argument("--bodies", type=int, default=20_000, help="bodies per star system (default: 20000)")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers,
+                        help="worker counts to time (default: powers of two up to the CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1, help="star systems per task (default: 1)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as catalog_dir:
+        for number in range(args.stars):
+            folder = os.path.join(catalog_dir, f"Star-{number}")
+            os.mkdir(folder)
+            write_catalog(folder, args.bodies, seed=number)
+
+        print(f"{args.stars} star systems x {args.bodies} bodies, {cpus} CPU(s)")
+        print(f"{'model':>9} {'workers':>8} {'seconds':>9} {'speedup':>8}")
+        for model in ("objects", "columnar"):
+            baseline = None
+            for workers in args.workers:
+                start = time.perf_counter()
+                create_catalog(catalog_dir, workers, args.chunk_size, columnar=model == "columnar")
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{model:>9} {workers:>8} {elapsed:>9.3f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
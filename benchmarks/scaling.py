@@ -0,0 +1,213 @@
+"""
+Measures how loading a catalog and answering questions scale with the number of bodies,
+on synthetic catalogs written with a fixed seed so every run times the same data.
+
+`run` times each step at each catalog size and can save the results as JSON. `compare`
+reads two saved runs and flags every step that got slower by more than a threshold,
+exiting with status 1 if any did, so it can gate a change.
+
+Usage:
+    python -m benchmarks.scaling run [--sizes 100 1000 10000 100000 1000000] [--repeat 3]
+        [--questions 200] [--seed 0] [--output FILE]
+    python -m benchmarks.scaling compare BASELINE CURRENT [--threshold 0.2] [--min-seconds 0.001]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from benchmarks.synthetic import write_catalog
+from celestial import Star
+from main import load_json_data, create_planets, create_moons, create_system
+from query_engine import QueryEngine
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+# The questions asked of each catalog, filled in with a planet name
+QUESTION_TEMPLATES = [
+    "tell me about {}",
+    "what is the mass of {}",
+    "does {} exist",
+    "how many moons does {} have",
+]
+
+
+def time_call(function, repeat: int, setup=None) -> dict:
+    """
+    Times a call several times and returns the fastest and median times.
+
+    Args:
+        function (Callable): Called with the value returned by setup, or with nothing.
+        repeat (int): The number of times to time the call.
+        setup (Callable, optional): Called before each timed call, untimed. Defaults to None.
+
+    Returns:
+        dict: The fastest and median seconds, keyed "min" and "median".
+    """
+    times = []
+    for _ in range(max(repeat, 1)):
+        arguments = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*arguments)
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+def make_questions(star: Star, count: int, seed: int) -> list:
+    """
+    Returns questions about randomly chosen planets, the same ones for the same seed.
+
+    Args:
+        star (Star): The system the questions are about.
+        count (int): The number of questions.
+        seed (int): The random seed.
+
+    Returns:
+        list: The questions.
+    """
+    rng = random.Random(seed)
+    planets = star.get_orbiting_objects()
+    return [rng.choice(QUESTION_TEMPLATES).format(rng.choice(planets).get_name().lower()) for _ in range(count)]
+
+
+def measure_size(size: int, repeat: int, num_questions: int, seed: int) -> dict:
+    """
+    Writes a synthetic catalog and times each step of loading it and answering questions.
+
+    Args:
+        size (int): The number of bodies.
+        repeat (int): The number of times to time each step.
+        num_questions (int): The number of questions matched and answered per repeat.
+        seed (int): The random seed of the catalog and questions.
+
+    Returns:
+        dict: The fastest and median seconds of each step, keyed by step name.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        planets_file, moons_file = write_catalog(folder, size, seed=seed)
+
+        def planets_only() -> Star:
+            star = Star("Sol")
+            create_planets(star, planets_file)
+            return star
+
+        results = {
+            "load_json_data": time_call(lambda: (load_json_data(planets_file), load_json_data(moons_file)), repeat),
+            "create_planets": time_call(lambda: create_planets(Star("Sol"), planets_file), repeat),
+            "create_moons": time_call(lambda star: create_moons(star, moons_file), repeat, setup=planets_only),
+            "create_system": time_call(lambda: create_system("Sol", planets_file, moons_file), repeat),
+        }
+
+        star = create_system("Sol", planets_file, moons_file)
+        engine = QueryEngine(star, cache_size=0)
+        questions = make_questions(star, num_questions, seed)
+        resolved = [engine.resolve(question) for question in questions]
+        results["determine_menu_choice"] = time_call(
+            lambda: [engine.determine_menu_choice(question) for question in questions], repeat)
+        results["format_answers"] = time_call(
+            lambda: [engine.render_uncached(*question) for question in resolved], repeat)
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Times every step at each catalog size, prints a table and saves the results if asked.
+
+    Args:
+        args (argparse.Namespace): The parsed "run" arguments.
+    """
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "questions": args.questions,
+        },
+        "results": {},
+    }
+    print(f"{'bodies':>10} {'step':>22} {'min s':>10} {'median s':>10}")
+    for size in args.sizes:
+        results = report["results"][str(size)] = measure_size(size, args.repeat, args.questions, args.seed)
+        for step, timing in results.items():
+            print(f"{size:>10} {step:>22} {timing['min']:>10.4f} {timing['median']:>10.4f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def compare(args: argparse.Namespace) -> int:
+    """
+    Compares two saved runs step by step and flags the steps that got slower.
+
+    A step regresses when its median time grows by more than the threshold and by more than
+    min_seconds, so steps too quick to time reliably aren't flagged for noise.
+
+    Args:
+        args (argparse.Namespace): The parsed "compare" arguments.
+
+    Returns:
+        int: 1 if any step regressed, otherwise 0.
+    """
+    with open(args.baseline, "r") as file:
+        baseline = json.load(file)["results"]
+    with open(args.current, "r") as file:
+        current = json.load(file)["results"]
+
+    regressions = 0
+    print(f"{'bodies':>10} {'step':>22} {'baseline s':>11} {'current s':>10} {'change':>8}")
+    for size in sorted(set(baseline) & set(current), key=int):
+        for step in baseline[size]:
+            if step not in current[size]:
+                continue
+            before, after = baseline[size][step]["median"], current[size][step]["median"]
+            change = after / before - 1 if before > 0 else 0.0
+            regressed = change > args.threshold and after - before > args.min_seconds
+            regressions += regressed
+            print(f"{size:>10} {step:>22} {before:>11.4f} {after:>10.4f} {change:>+8.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    """
+    Parses the command line and runs or compares the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Measure how loading and querying scale with catalog size.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time each step and optionally save the results")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                            help="numbers of bodies to build (default: 10^2 to 10^6)")
+    run_parser.add_argument("--repeat", type=int, default=3, help="times each step is timed (default: 3)")
+    run_parser.add_argument("--questions", type=int, default=200,
+                            help="questions matched and answered per repeat (default: 200)")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed of the catalogs and questions (default: 0)")
+    run_parser.add_argument("--output", metavar="FILE", help="save the results as JSON")
+
+    compare_parser = commands.add_parser("compare", help="flag steps that got slower between two saved runs")
+    compare_parser.add_argument("baseline", help="results saved by the earlier run")
+    compare_parser.add_argument("current", help="results saved by the later run")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="fractional slowdown flagged as a regression (default: 0.2)")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.001,
+                                help="ignore slowdowns smaller than this many seconds (default: 0.001)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
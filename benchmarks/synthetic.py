@@ -0,0 +1,57 @@
+"""
+Writes synthetic planets.json / moons.json catalogs of any size for the benchmarks.
+"""
+
+import json
+import os
+import random
+
+
+FACTS = [
+    "It has a thin atmosphere of nitrogen and methane.",
+    "Its surface is covered in craters from ancient impacts.",
+    "It is tidally locked, so one side always faces its star.",
+    "It has a faint ring system made of dust.",
+    "Its core is thought to be made of iron and nickel.",
+    "Strong winds sweep across its surface.",
+    "It was discovered by a space telescope.",
+    "Its day is longer than its year.",
+]
+
+
+def write_catalog(folder: str, num_bodies: int, moons_per_planet: int = 9, seed: int = 0) -> tuple:
+    """
+    Write a synthetic catalog with roughly the given number of bodies (planets plus moons).
+
+    Args:
+        folder (str): The folder the catalog files are written to.
+        num_bodies (int): The total number of planets and moons.
+        moons_per_planet (int): The number of moons each planet has. Defaults to 9.
+        seed (int): The random seed, so the same arguments always write the same catalog. Defaults to 0.
+
+    Returns:
+        tuple: The paths of the planets and moons files.
+    """
+    rng = random.Random(seed)
+    num_planets = max(1, num_bodies // (moons_per_planet + 1))
+    planets = []
+    moons = {}
+    for number in range(num_planets):
+        name = f"Planet-{number}"
+        planets.append({
+            "name": name,
+            "mass": round(rng.uniform(0.1, 2000), 3),
+            "distance": round(rng.uniform(50, 5000), 1),
+            "rotational": round(rng.uniform(1, 13000), 2),
+            "fact1": rng.choice(FACTS),
+            "fact2": rng.choice(FACTS),
+        })
+        moons[name] = [f"Moon-{number}-{moon}" for moon in range(moons_per_planet)]
+
+    planets_file = os.path.join(folder, "planets.json")
+    moons_file = os.path.join(folder, "moons.json")
+    with open(planets_file, "w") as file:
+        json.dump(planets, file)
+    with open(moons_file, "w") as file:
+        json.dump(moons, file)
+    return planets_file, moons_file
@@ -0,0 +1,225 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from celestial_store import BodyStore
+
+
+MAGIC = b"CELCAT01"
+VERSION = 1
+HEADER = struct.Struct("<8sIII4x")
+
+# Fixed-width columns, in file order, with their array type codes
+COLUMNS = (
+    ("kind", "b"),
+    ("integer_flags", "b"),
+    ("name_id", "i"),
+    ("primary", "i"),
+    ("fact1_id", "i"),
+    ("fact2_id", "i"),
+    ("child_start", "i"),
+    ("child_count", "i"),
+    ("name_order", "i"),
+    ("mass", "d"),
+    ("distance", "d"),
+    ("rotational", "d"),
+)
+SECTIONS = struct.Struct(f"<{len(COLUMNS) + 2}Q")
+
+
+def align(offset: int) -> int:
+    """
+    Rounds a file offset up to the next multiple of eight bytes.
+
+    Args:
+        offset (int): The offset.
+
+    Returns:
+        int: The aligned offset.
+    """
+    return (offset + 7) & ~7
+
+
+def write_binary_catalog(store: BodyStore, filename: str) -> None:
+    """
+    Writes a BodyStore to a binary catalog file.
+
+    The file starts with a header (magic, version, body count and string count) and the
+    offset of every section. Each column follows as a block of fixed-width values, one per
+    body, then the string table as an array of byte offsets and a block of UTF-8 text. The
+    file is written to a temporary name first and then moved into place.
+
+    Args:
+        store (BodyStore): The store to write.
+        filename (str): The path of the catalog file.
+    """
+    if sys.byteorder != "little":
+        raise OSError("Binary catalogs are little-endian and can only be written on little-endian machines")
+
+    encoded = [text.encode("utf-8") for text in store.strings]
+    string_offsets = array("q", [0])
+    for text in encoded:
+        string_offsets.append(string_offsets[-1] + len(text))
+
+    blocks = [array(code, getattr(store, name) if name != "name_order" else store.get_name_order())
+              for name, code in COLUMNS]
+    blocks.append(string_offsets)
+
+    offsets = []
+    position = align(HEADER.size + SECTIONS.size)
+    for block in blocks:
+        offsets.append(position)
+        position = align(position + len(block) * block.itemsize)
+    offsets.append(position)
+
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(store), len(store.strings)))
+        file.write(SECTIONS.pack(*offsets))
+        for block, offset in zip(blocks, offsets):
+            file.write(b"\0" * (offset - file.tell()))
+            block.tofile(file)
+        file.write(b"\0" * (offsets[-1] - file.tell()))
+        for text in encoded:
+            file.write(text)
+    os.replace(temp_filename, filename)
+
+
+class MappedCatalog(BodyStore):
+    """
+    A class to read a binary catalog file through a memory map.
+
+    Every column is a memoryview cast straight onto the mapped file, so opening a catalog
+    doesn't parse or copy anything. Lookups, column scans and the Star, Planet and Moon
+    views inherited from BodyStore all read the mapped pages directly; only the strings
+    actually displayed are decoded.
+
+    Attributes:
+        filename (str): The path of the catalog file.
+        file (BinaryIO): The open catalog file.
+        map (mmap.mmap): The read-only memory map of the file.
+        string_offsets (memoryview): The byte offset of each string in the string block.
+        string_block (memoryview): The UTF-8 text of every string.
+
+    Methods:
+        close(): Releases the memory map and closes the file.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Opens and maps a binary catalog file.
+
+        Args:
+            filename (str): The path of the catalog file.
+
+        Raises:
+            ValueError: If the file is not a binary catalog of a supported version, or its
+                sections don't fit in the file, such as when it was cut short.
+        """
+        if sys.byteorder != "little":
+            raise OSError("Binary catalogs are little-endian and can only be read on little-endian machines")
+
+        self.filename = filename
+        self.file = open(filename, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"'{filename}' is not a binary catalog")
+        self.buffer = memoryview(self.map)
+
+        try:
+            magic, version, body_count, string_count = HEADER.unpack_from(self.buffer, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"'{filename}' is not a version {VERSION} binary catalog")
+            offsets = SECTIONS.unpack_from(self.buffer, HEADER.size)
+        except (struct.error, ValueError):
+            self.close()
+            raise ValueError(f"'{filename}' is not a version {VERSION} binary catalog")
+
+        # Slicing a memoryview past its end silently shortens it, so every section is checked
+        # to lie after the one before and to end before the next, or the file, starts
+        sizes = [body_count * struct.calcsize(code) for _, code in COLUMNS] + [(string_count + 1) * 8]
+        ends = [*offsets[1:], len(self.buffer)]
+        position = HEADER.size + SECTIONS.size
+        for offset, size, end in zip(offsets, sizes + [0], ends):
+            if offset < position or offset + size > end:
+                self.close()
+                raise ValueError(f"'{filename}' is truncated or its section offsets are invalid")
+            position = offset + size
+
+        for (name, code), offset in zip(COLUMNS, offsets):
+            size = struct.calcsize(code)
+            setattr(self, name, self.buffer[offset:offset + body_count * size].cast(code))
+        self.string_offsets = self.buffer[offsets[-2]:offsets[-2] + (string_count + 1) * 8].cast("q")
+        self.string_block = self.buffer[offsets[-1]:]
+        if self.string_offsets[0] != 0 or self.string_offsets[-1] != len(self.string_block):
+            self.close()
+            raise ValueError(f"'{filename}' is truncated or its string table is invalid")
+        self.strings = None
+        self.string_ids = None
+        self.name_indexes = {}
+        self.subtree_totals = None
+
+    def __enter__(self) -> "MappedCatalog":
+        """
+        Returns the catalog for use in a with statement.
+
+        Returns:
+            MappedCatalog: The catalog.
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Closes the catalog at the end of a with statement.
+        """
+        self.close()
+
+    def string(self, string_id: int) -> str:
+        """
+        Decodes a string from the mapped string block.
+
+        Args:
+            string_id (int): The string's id.
+
+        Returns:
+            str: The string.
+        """
+        return str(self.string_block[self.string_offsets[string_id]:self.string_offsets[string_id + 1]], "utf-8")
+
+    def add_body(self, *args, **kwargs) -> int:
+        """
+        Mapped catalogs are read-only; build a BodyStore and write it instead.
+
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Mapped catalogs are read-only")
+
+    def close(self) -> None:
+        """
+        Releases the memory map and closes the file. Views of the catalog's bodies can't be
+        used after this.
+        """
+        for name in [name for name, _ in COLUMNS] + ["string_offsets", "string_block"]:
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self.buffer.release()
+        self.map.close()
+        self.file.close()
+
+
+def open_binary_catalog(filename: str) -> MappedCatalog:
+    """
+    Opens a binary catalog file through a memory map.
+
+    Args:
+        filename (str): The path of the catalog file.
+
+    Returns:
+        MappedCatalog: The mapped catalog; its get_root() returns the star.
+    """
+    return MappedCatalog(filename)
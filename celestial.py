@@ -1,14 +1,55 @@
+import sys
+from bisect import bisect_left, bisect_right
+from collections import deque
+from operator import attrgetter, methodcaller
+from typing import Iterator, NamedTuple
+from name_index import TrigramIndex
+
+
+class SubtreeTotals(NamedTuple):
+    """
+    Totals over a body and everything orbiting it, directly or indirectly.
+
+    Attributes:
+        mass (float): The mass of the body and all its descendants.
+        descendants (int): The number of bodies orbiting it, directly or indirectly.
+        depth (int): The number of levels of bodies below it, 0 if nothing orbits it.
+    """
+
+    mass: float
+    descendants: int
+    depth: int
+
+
 class CelestialBody:
     """
     A base class to represent a celestial body such as a planet, moon, or star.
 
+    Bodies use __slots__ rather than a per-instance dictionary, and a body with nothing
+    orbiting it holds an empty tuple instead of its own empty list, to keep large
+    catalogs compact. Orbiting objects can also be deferred as a list of names, in which
+    case they are only created the first time the orbiting objects themselves are needed.
+    Strings derived from the orbiting objects, such as the comma-separated names, are
+    remembered after they are first built and forgotten whenever orbiting objects are
+    added or deferred.
+
+    The tree below a body is walked with the iter_ generators, which keep their own stack
+    or queue rather than recursing, so hierarchies of any depth can be walked. Totals over
+    a body's subtree are worked out the first time they are asked for and are then kept
+    up to date as objects are added, by adjusting the totals of the body and each of its
+    primaries in turn. A body's totals are only ever worked out along with those of all
+    its descendants, so the adjustment can stop at the first primary without totals.
+
     Attributes:
         name (str): The name of the celestial body.
         primary (CelestialBody, optional): The celestial body this object orbits.
         mass (int): The mass of the celestial body (in arbitrary units).
         distance (int): The distance from its primary (in arbitrary units).
         rotational (int): The rotational speed of the celestial body (in arbitrary units).
-        orbiting_objects (list): A list of objects orbiting this celestial body.
+        orbiting_objects (list | tuple): A list of objects orbiting this celestial body, or an empty tuple.
+        deferred_objects (tuple | None): The factory and names of orbiting objects not created yet.
+        derived (dict | None): Remembered strings derived from the body, keyed by what they are.
+        subtree (SubtreeTotals | None): The totals over the body's subtree, once worked out.
 
     Methods:
         get_name(): Returns the name of the celestial body.
@@ -17,11 +58,30 @@ class CelestialBody:
         get_rotational(): Returns the rotational speed of the celestial body.
         get_primary(): Returns the name of the primary celestial body.
         add_orbiting_objects(objects): Adds objects to the list of orbiting objects.
+        indexing_primary(): Returns the nearest primary that indexes the bodies below it.
+        register_orbiting_objects(parent, objects, changed): Passes newly added objects up to the indexing primary.
+        remove_orbiting_objects(objects): Removes objects from the list of orbiting objects.
+        unregister_orbiting_objects(parent, objects): Passes removed objects up to the indexing primary.
+        defer_orbiting_objects(names, factory): Records orbiting objects to be created on first access.
+        register_deferred_objects(parent, names): Passes deferred object names up to the indexing primary.
+        materialise_orbiting_objects(): Creates any deferred orbiting objects.
         get_orbiting_objects(): Returns the list of orbiting objects.
         get_num_orbiting_objects(): Returns the number of orbiting objects.
         get_orbiting_object_names(): Returns a comma-separated string of orbiting object names.
+        recall(key): Returns a remembered derived string, or None.
+        remember(key, value): Remembers a derived string until the orbiting objects change.
+        forget_derived(): Forgets every remembered derived string.
+        iter_depth_first(include_self, materialise): Yields the bodies in the subtree depth-first.
+        iter_breadth_first(include_self, materialise): Yields the bodies in the subtree level by level.
+        iter_bodies(kind, breadth_first, include_self): Yields the bodies in the subtree of a kind.
+        get_subtree_totals(): Returns the total mass, descendant count and depth of the subtree.
+        update_subtree_totals(mass, count, depth): Adds to the totals of the body and its primaries.
+        forget_subtree_totals(): Discards the totals of the body and its primaries.
     """
 
+    __slots__ = ("name", "primary", "mass", "distance", "rotational", "orbiting_objects", "deferred_objects",
+                 "derived", "subtree")
+
     def __init__(self, name, primary=None, mass=0.0, distance=0.0, rotational=0.0, orbiting_objects=None) -> None:
         """
         Initializes a celestial body with the given attributes.
@@ -39,7 +99,10 @@ class CelestialBody:
         self.mass = mass
         self.distance = distance
         self.rotational = rotational
-        self.orbiting_objects = orbiting_objects or []
+        self.orbiting_objects = list(orbiting_objects) if orbiting_objects else ()
+        self.deferred_objects = None
+        self.derived = None
+        self.subtree = None
 
     def __str__(self) -> str:
         """
@@ -104,7 +167,140 @@ class CelestialBody:
         Args:
             objects (list): A list of objects to add to the orbiting objects.
         """
-        self.orbiting_objects.extend(objects)
+        objects = list(objects)
+        if not objects:
+            return
+        self.attach_orbiting_objects(objects)
+        self.register_orbiting_objects(self, objects)
+        if self.subtree is not None:
+            totals = [orbiter.get_subtree_totals() for orbiter in objects]
+            self.update_subtree_totals(sum(total.mass for total in totals),
+                                       sum(total.descendants + 1 for total in totals),
+                                       max(total.depth + 1 for total in totals))
+
+    def attach_orbiting_objects(self, objects: list) -> None:
+        """
+        Appends objects to the list of orbiting objects without registering them.
+
+        Args:
+            objects (list): A non-empty list of objects to add.
+        """
+        self.forget_derived()
+        if self.orbiting_objects:
+            self.orbiting_objects.extend(objects)
+        else:
+            self.orbiting_objects = objects
+
+    def indexing_primary(self) -> "CelestialBody | None":
+        """
+        Returns the nearest primary up the chain that indexes the bodies below it, such as
+        the star of a system. The chain is followed in a loop rather than by each primary
+        calling the next, so hierarchies of any depth can be registered.
+
+        Returns:
+            CelestialBody | None: The primary, or None if no primary indexes its bodies.
+        """
+        body = self.primary
+        while body is not None and type(body).register_orbiting_objects is CelestialBody.register_orbiting_objects:
+            body = body.primary
+        return body
+
+    def register_orbiting_objects(self, parent, objects, changed=True) -> None:
+        """
+        Passes newly added orbiting objects up the chain of primaries so that the
+        star at the top of the system can index them by name.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were added to.
+            objects (list): The objects that were added.
+            changed (bool): False if the objects were already counted as deferred objects. Defaults to True.
+        """
+        primary = self.indexing_primary()
+        if primary is not None:
+            primary.register_orbiting_objects(parent, objects, changed)
+
+    def remove_orbiting_objects(self, objects) -> None:
+        """
+        Removes objects, and everything orbiting them, from the list of orbiting objects.
+        Objects that don't orbit this body are ignored.
+
+        Args:
+            objects (list): The objects to remove.
+        """
+        removing = {id(orbiter) for orbiter in objects}
+        removed = [orbiter for orbiter in self.orbiting_objects if id(orbiter) in removing]
+        if not removed:
+            return
+        self.orbiting_objects = [orbiter for orbiter in self.orbiting_objects if id(orbiter) not in removing] or ()
+        self.forget_derived()
+        self.forget_subtree_totals()
+        self.unregister_orbiting_objects(self, removed)
+
+    def unregister_orbiting_objects(self, parent, objects) -> None:
+        """
+        Passes removed orbiting objects up the chain of primaries so that the star at the
+        top of the system can drop them from its indexes.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were removed from.
+            objects (list): The objects that were removed.
+        """
+        primary = self.indexing_primary()
+        if primary is not None:
+            primary.unregister_orbiting_objects(parent, objects)
+
+    def defer_orbiting_objects(self, names, factory) -> None:
+        """
+        Records orbiting objects by name only. They are created by calling
+        factory(name, self) the first time the orbiting objects are needed, while their
+        count and names are available straight away.
+
+        Args:
+            names (list): The names of the orbiting objects.
+            factory (Callable): Creates an orbiting object from its name and primary, such as Moon.
+        """
+        names = tuple(names)
+        if not names:
+            return
+        if self.subtree is not None:
+            # Deferred objects count as bodies without mass until they are created
+            self.update_subtree_totals(0.0, len(names), 1)
+        if self.deferred_objects is not None:
+            if self.deferred_objects[0] is not factory:
+                self.materialise_orbiting_objects()
+            else:
+                names = self.deferred_objects[1] + names
+        self.forget_derived()
+        self.deferred_objects = (factory, names)
+        self.register_deferred_objects(self, names)
+
+    def register_deferred_objects(self, parent, names) -> None:
+        """
+        Passes the names of deferred orbiting objects up the chain of primaries so that
+        the star at the top of the system can find them by name.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were deferred on.
+            names (tuple): The names of the deferred objects.
+        """
+        primary = self.indexing_primary()
+        if primary is not None:
+            primary.register_deferred_objects(parent, names)
+
+    def materialise_orbiting_objects(self) -> None:
+        """
+        Creates any deferred orbiting objects and adds them to the list of orbiting objects.
+        """
+        if self.deferred_objects is None:
+            return
+        factory, names = self.deferred_objects
+        self.deferred_objects = None
+        objects = [factory(name, self) for name in names]
+        self.attach_orbiting_objects(objects)
+        self.register_orbiting_objects(self, objects, changed=False)
+        if self.subtree is not None:
+            # The objects were already counted, so only their mass is new
+            self.update_subtree_totals(sum(orbiter.get_subtree_totals().mass for orbiter in objects), 0, 1)
 
     def get_orbiting_objects(self) -> list:
         """
@@ -113,7 +309,8 @@ class CelestialBody:
         Returns:
             list: The list of orbiting objects.
         """
-        return self.orbiting_objects
+        self.materialise_orbiting_objects()
+        return self.orbiting_objects or []
 
     def get_num_orbiting_objects(self) -> int:
         """
@@ -122,6 +319,8 @@ class CelestialBody:
         Returns:
             int: The number of orbiting objects.
         """
+        if self.deferred_objects is not None:
+            return len(self.orbiting_objects) + len(self.deferred_objects[1])
         return len(self.orbiting_objects)
     
     def get_orbiting_object_names(self) -> str:
@@ -131,20 +330,318 @@ class CelestialBody:
         Returns:
             str: The names of orbiting objects, or 'None' if no objects orbit.
         """
-        if len(self.orbiting_objects) > 0:
-            return ', '.join(orbiter.get_name() for orbiter in self.orbiting_objects)
+        text = self.recall("names")
+        if text is not None:
+            return text
+        names = [orbiter.get_name() for orbiter in self.orbiting_objects]
+        if self.deferred_objects is not None:
+            names.extend(self.deferred_objects[1])  # Deferred objects are named without creating them
+        if len(names) > 0:
+            return self.remember("names", ', '.join(names))
         else:
             return 'None'
 
+    def recall(self, key: str) -> str | None:
+        """
+        Returns a derived string remembered by remember().
+
+        Args:
+            key (str): What the string is, such as "names" or "str".
+
+        Returns:
+            str | None: The remembered string, or None if it hasn't been built since the
+                orbiting objects last changed.
+        """
+        return self.derived.get(key) if self.derived is not None else None
+
+    def remember(self, key: str, value: str) -> str:
+        """
+        Remembers a derived string until orbiting objects are next added or deferred.
+
+        Args:
+            key (str): What the string is, such as "names" or "str".
+            value (str): The string.
+
+        Returns:
+            str: The string, so it can be returned straight away.
+        """
+        if self.derived is None:
+            self.derived = {}
+        self.derived[key] = value
+        return value
+
+    def forget_derived(self) -> None:
+        """
+        Forgets every remembered derived string, so they are rebuilt when next needed.
+        """
+        self.derived = None
+
+    def iter_depth_first(self, include_self: bool = True, materialise: bool = True) -> Iterator["CelestialBody"]:
+        """
+        Yields the bodies in this body's subtree depth-first, each body before the bodies
+        orbiting it and in the order they were added. An explicit stack is used instead of
+        recursion, so any depth of hierarchy can be walked.
+
+        Args:
+            include_self (bool): Yield this body first. Defaults to True.
+            materialise (bool): Create deferred orbiting objects so they are yielded too;
+                if False only objects that already exist are yielded. Defaults to True.
+
+        Yields:
+            CelestialBody: Each body in the subtree.
+        """
+        children = methodcaller("get_orbiting_objects") if materialise else attrgetter("orbiting_objects")
+        stack = [self] if include_self else list(reversed(children(self)))
+        while stack:
+            body = stack.pop()
+            yield body
+            stack.extend(reversed(children(body)))
+
+    def iter_breadth_first(self, include_self: bool = True, materialise: bool = True) -> Iterator["CelestialBody"]:
+        """
+        Yields the bodies in this body's subtree one level at a time, such as every planet
+        before any moon.
+
+        Args:
+            include_self (bool): Yield this body first. Defaults to True.
+            materialise (bool): Create deferred orbiting objects so they are yielded too;
+                if False only objects that already exist are yielded. Defaults to True.
+
+        Yields:
+            CelestialBody: Each body in the subtree.
+        """
+        children = methodcaller("get_orbiting_objects") if materialise else attrgetter("orbiting_objects")
+        queue = deque([self] if include_self else children(self))
+        while queue:
+            body = queue.popleft()
+            yield body
+            queue.extend(children(body))
+
+    def iter_bodies(self, kind: type | None = None, breadth_first: bool = False,
+                    include_self: bool = False) -> Iterator["CelestialBody"]:
+        """
+        Yields the bodies of a kind in this body's subtree, such as every Moon of a star.
+
+        Args:
+            kind (type, optional): The class of body wanted. Defaults to every body.
+            breadth_first (bool): Walk the subtree level by level instead of depth-first.
+                Defaults to False.
+            include_self (bool): Consider this body too. Defaults to False.
+
+        Yields:
+            CelestialBody: Each body of the kind in the subtree.
+        """
+        walk = self.iter_breadth_first if breadth_first else self.iter_depth_first
+        if kind is None:
+            yield from walk(include_self)
+        else:
+            yield from (body for body in walk(include_self) if isinstance(body, kind))
+
+    def get_subtree_totals(self) -> SubtreeTotals:
+        """
+        Returns the total mass, number of descendants and depth of this body's subtree.
+        They are worked out for the body and every descendant without totals the first
+        time they are asked for, children before parents, and kept up to date after that.
+        Deferred objects count as bodies without mass and aren't created.
+
+        Returns:
+            SubtreeTotals: The totals.
+        """
+        if self.subtree is not None:
+            return self.subtree
+        pending = [self]
+        order = []
+        while pending:
+            body = pending.pop()
+            order.append(body)
+            pending.extend(orbiter for orbiter in body.orbiting_objects if orbiter.subtree is None)
+
+        # Every body comes before its orbiters in order, so reversed it reaches the orbiters first
+        for body in reversed(order):
+            mass, count, depth = body.mass, 0, 0
+            if body.deferred_objects is not None:
+                count, depth = len(body.deferred_objects[1]), 1
+            for orbiter in body.orbiting_objects:
+                totals = orbiter.subtree
+                mass += totals.mass
+                count += totals.descendants + 1
+                depth = max(depth, totals.depth + 1)
+            body.subtree = SubtreeTotals(mass, count, depth)
+        return self.subtree
+
+    def update_subtree_totals(self, mass: float, count: int, depth: int) -> None:
+        """
+        Adds newly orbiting bodies to the totals of this body and each of its primaries,
+        stopping at the first primary whose totals haven't been worked out.
+
+        Args:
+            mass (float): The mass added to the subtree.
+            count (int): The number of bodies added to the subtree.
+            depth (int): The depth below this body that the subtree now reaches.
+        """
+        body = self
+        while body is not None and body.subtree is not None:
+            totals = body.subtree
+            body.subtree = SubtreeTotals(totals.mass + mass, totals.descendants + count, max(totals.depth, depth))
+            body = body.primary
+            depth += 1
+
+    def forget_subtree_totals(self) -> None:
+        """
+        Discards the totals of this body and each of its primaries, so they are worked out
+        again when next asked for. Used when bodies are removed or changed.
+        """
+        body = self
+        while body is not None and body.subtree is not None:
+            body.subtree = None
+            body = body.primary
+
+
+class SortedIndex:
+    """
+    A class to keep bodies sorted by one numeric attribute, so that range and top-k
+    queries can use bisect instead of sorting every time.
+
+    Bodies added after the index is built wait in a pending list and are merged in by the
+    next query: a few are inserted one at a time, and many are sorted and merged in one pass.
+
+    Attributes:
+        attribute (str): The attribute the bodies are sorted by: "mass", "distance" or "rotational".
+        kind (type | None): The class of body indexed, or None for every body.
+        values (list): The attribute values in ascending order.
+        bodies (list): The bodies, in the same order as their values.
+        pending (list): The bodies added since the last query.
+
+    Methods:
+        add(bodies): Adds bodies of the indexed kind to the index.
+        merge_pending(): Merges the pending bodies into the sorted lists.
+        range(low, high): Returns the bodies whose value lies within a range.
+        top(count, largest): Returns the bodies with the largest or smallest values.
+    """
+
+    __slots__ = ("attribute", "kind", "key", "values", "bodies", "pending")
+
+    def __init__(self, attribute: str, kind: type | None = None, bodies=()) -> None:
+        """
+        Initializes the SortedIndex.
+
+        Args:
+            attribute (str): The attribute to sort by: "mass", "distance" or "rotational".
+            kind (type, optional): The class of body to index. Defaults to every body.
+            bodies (Iterable): The bodies to index straight away. Defaults to none.
+        """
+        self.attribute = attribute
+        self.kind = kind
+        self.key = attrgetter(attribute)
+        self.values = []
+        self.bodies = []
+        self.pending = []
+        self.add(bodies)
+
+    def add(self, bodies) -> None:
+        """
+        Adds the bodies of the indexed kind. They are sorted in when the index is next queried.
+
+        Args:
+            bodies (Iterable): The bodies to add; bodies of other kinds are ignored.
+        """
+        if self.kind is None:
+            self.pending.extend(bodies)
+        else:
+            self.pending.extend(body for body in bodies if isinstance(body, self.kind))
+
+    def merge_pending(self) -> None:
+        """
+        Merges the pending bodies into the sorted lists.
+        """
+        if not self.pending:
+            return
+        key = self.key
+        if len(self.pending) <= 8:
+            for body in self.pending:
+                value = key(body)
+                position = bisect_right(self.values, value)
+                self.values.insert(position, value)
+                self.bodies.insert(position, body)
+        else:
+            # Timsort finds the two sorted runs and merges them in a single linear pass
+            merged = list(zip(self.values, self.bodies))
+            self.pending.sort(key=key)
+            merged.extend((key(body), body) for body in self.pending)
+            merged.sort(key=lambda pair: pair[0])
+            self.values = [value for value, _ in merged]
+            self.bodies = [body for _, body in merged]
+        self.pending = []
+
+    def range(self, low: float | None = None, high: float | None = None) -> list:
+        """
+        Returns the bodies whose value lies within a range, smallest value first.
+
+        Args:
+            low (float, optional): The smallest value to include. Defaults to no lower limit.
+            high (float, optional): The largest value to include. Defaults to no upper limit.
+
+        Returns:
+            list: The matching bodies in ascending order of value.
+        """
+        self.merge_pending()
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect_right(self.values, high)
+        return self.bodies[start:end]
+
+    def top(self, count: int, largest: bool = True) -> list:
+        """
+        Returns the bodies with the largest (or smallest) values.
+
+        Args:
+            count (int): The number of bodies to return.
+            largest (bool): True for the largest values, False for the smallest. Defaults to True.
+
+        Returns:
+            list: The bodies, best first.
+        """
+        self.merge_pending()
+        if count <= 0:
+            return []
+        if largest:
+            return self.bodies[:-count - 1:-1]
+        return self.bodies[:count]
+
 
 class Star(CelestialBody):
     """
     A class to represent a star, inheriting from CelestialBody.
 
+    Attributes:
+        planet_index (dict): The planets orbiting the star, keyed by case-folded name.
+        body_index (dict): Every body in the system (planets and moons), keyed by case-folded name.
+        deferred_index (dict): The bodies whose deferred orbiting objects have a given case-folded name.
+        catalog_version (int): A counter that increases every time the system's bodies change.
+        materialised_version (int): A counter that increases every time deferred bodies are created.
+        sorted_indexes (dict): The SortedIndex for each (kind, attribute) queried so far.
+        name_indexes (dict): The TrigramIndex of the names of each kind of body searched so far.
+
     Methods:
         __str__(): Returns a descriptive string about the star and its orbiting objects.
+        register_orbiting_objects(parent, objects, changed): Adds objects and their orbiters to the name indexes.
+        register_deferred_objects(parent, names): Records which body will create each deferred object.
+        unregister_orbiting_objects(parent, objects): Drops removed objects and their orbiters from the indexes.
+        update_body(body, values): Changes a body's values and discards what was derived from them.
+        forget_indexes(): Discards the sorted and name indexes and moves the catalog version on.
+        get_planet(name): Returns the planet with the given name, ignoring case.
+        get_body(name): Returns any body in the system with the given name, ignoring case.
+        get_name_index(kind): Returns the fuzzy search index of the names of a kind of body.
+        find_bodies(name, limit, kind): Returns the names closest to a possibly misspelled name.
+        get_catalog_version(): Returns the counter that increases whenever the system changes.
+        get_cache_version(): Returns what cached answers about the system depend on.
+        get_sorted_index(attribute, kind): Returns the bodies of a kind sorted by an attribute.
+        get_bodies_in_range(attribute, low, high, kind): Returns the bodies with values in a range.
+        get_top_bodies(attribute, count, kind, largest): Returns the bodies with the largest or smallest values.
     """
 
+    __slots__ = ("planet_index", "body_index", "deferred_index", "catalog_version", "materialised_version",
+                 "sorted_indexes", "name_indexes")
+
     def __init__(self, name="Unnamed") -> None:
         """
         Initializes a Star with the given name.
@@ -153,6 +650,13 @@ class Star(CelestialBody):
             name (str): The name of the star. Defaults to "Unnamed".
         """
         super().__init__(name)
+        self.planet_index = {}
+        self.body_index = {}
+        self.deferred_index = {}
+        self.catalog_version = 0
+        self.materialised_version = 0
+        self.sorted_indexes = {}
+        self.name_indexes = {}
 
     def __str__(self) -> str:
         """
@@ -161,7 +665,253 @@ class Star(CelestialBody):
         Returns:
             str: The star's name and its orbiting objects.
         """
-        return f"My name is {self.name} and my orbiting objects are {self.get_orbiting_object_names()}"
+        text = self.recall("str")
+        if text is None:
+            text = self.remember("str", f"My name is {self.name} and my orbiting objects are {self.get_orbiting_object_names()}")
+        return text
+
+    def register_orbiting_objects(self, parent, objects, changed=True) -> None:
+        """
+        Adds newly added objects, and anything already orbiting them, to the name indexes.
+        Objects added directly to the star are also indexed as planets.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were added to.
+            objects (list): The objects that were added.
+            changed (bool): False if the objects were already counted as deferred objects. Defaults to True.
+        """
+        if parent is self:
+            for planet in objects:
+                self.planet_index.setdefault(planet.get_name().casefold(), planet)
+
+        # Walk breadth-first so that planets take precedence over moons sharing a name
+        pending = list(objects)
+        for body in pending:
+            key = body.get_name().casefold()
+            self.body_index.setdefault(key, body)
+            self.deferred_index.pop(key, None)
+            pending.extend(body.orbiting_objects)
+            if body.deferred_objects is not None:
+                self.register_deferred_objects(body, body.deferred_objects[1])
+        for index in self.sorted_indexes.values():
+            index.add(pending)
+        for kind, index in self.name_indexes.items():
+            for body in pending:
+                if kind is None or isinstance(body, kind):
+                    index.add(body.get_name())
+        if changed:
+            self.catalog_version += 1
+        else:
+            self.materialised_version += 1
+
+    def register_deferred_objects(self, parent, names) -> None:
+        """
+        Records which body will create each deferred orbiting object, so it can be found
+        by name before it exists.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were deferred on.
+            names (tuple): The names of the deferred objects.
+        """
+        for name in names:
+            key = name.casefold()
+            if key not in self.body_index:
+                self.deferred_index.setdefault(key, parent)
+        if None in self.name_indexes:
+            for name in names:
+                self.name_indexes[None].add(name)
+        self.catalog_version += 1
+
+    def unregister_orbiting_objects(self, parent, objects) -> None:
+        """
+        Drops removed objects, and everything orbiting them, from the name indexes. The
+        sorted and name indexes are discarded, to be rebuilt when next needed.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were removed from.
+            objects (list): The objects that were removed.
+        """
+        for removed in objects:
+            if parent is self and self.planet_index.get(removed.get_name().casefold()) is removed:
+                del self.planet_index[removed.get_name().casefold()]
+            for body in removed.iter_breadth_first(materialise=False):
+                key = body.get_name().casefold()
+                if self.body_index.get(key) is body:
+                    del self.body_index[key]
+                for name in body.deferred_objects[1] if body.deferred_objects is not None else ():
+                    if self.deferred_index.get(name.casefold()) is body:
+                        del self.deferred_index[name.casefold()]
+        self.forget_indexes()
+
+    def update_body(self, body, values: dict) -> None:
+        """
+        Changes some of a body's values, such as its mass or facts, and discards everything
+        derived from them: the strings remembered by the body and the star, the subtree
+        totals above it and the sorted indexes.
+
+        Args:
+            body (CelestialBody): The body, which must be in this system.
+            values (dict): The new values, keyed by attribute name.
+        """
+        for attribute, value in values.items():
+            setattr(body, attribute, value)
+        body.forget_derived()
+        body.forget_subtree_totals()
+        if body.primary is not None:
+            body.primary.forget_derived()
+        self.forget_indexes()
+
+    def forget_indexes(self) -> None:
+        """
+        Discards the sorted and name indexes, which are rebuilt when next asked for, and moves
+        the catalog version on so anything derived from the catalog is rebuilt too.
+        """
+        self.sorted_indexes.clear()
+        self.name_indexes.clear()
+        self.forget_derived()
+        self.catalog_version += 1
+
+    def get_planet(self, name: str) -> "Planet | None":
+        """
+        Returns the planet orbiting the star with the given name, ignoring case.
+
+        Args:
+            name (str): The name of the planet.
+
+        Returns:
+            Planet | None: The matching planet, or None if the star has no such planet.
+        """
+        return self.planet_index.get(name.strip().casefold())
+
+    def get_body(self, name: str) -> CelestialBody | None:
+        """
+        Returns any body in the system (planet or moon) with the given name, ignoring case.
+
+        Args:
+            name (str): The name of the body.
+
+        Returns:
+            CelestialBody | None: The matching body, or None if there is no such body.
+        """
+        key = name.strip().casefold()
+        body = self.body_index.get(key)
+        if body is None and key in self.deferred_index:
+            self.deferred_index[key].materialise_orbiting_objects()
+            body = self.body_index.get(key)
+        return body
+
+    def get_name_index(self, kind: type | None = None) -> TrigramIndex:
+        """
+        Returns the fuzzy search index of the names of a kind of body, building it the first
+        time it is asked for. After that it is kept up to date as bodies are added. Deferred
+        objects are only in the index of every body until they are created.
+
+        Args:
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            TrigramIndex: The index.
+        """
+        index = self.name_indexes.get(kind)
+        if index is None:
+            if kind is None:
+                names = [body.get_name() for body in self.body_index.values()]
+                for parent in set(self.deferred_index.values()):
+                    names.extend(parent.deferred_objects[1] if parent.deferred_objects else ())
+            else:
+                names = [body.get_name() for body in self.body_index.values() if isinstance(body, kind)]
+            index = self.name_indexes[kind] = TrigramIndex(names)
+        return index
+
+    def find_bodies(self, name: str, limit: int = 5, kind: type | None = None) -> list:
+        """
+        Returns the names of the bodies closest to a possibly misspelled name, each with a
+        confidence score. An exact match, ignoring case, always comes first with a score of 1.
+
+        Args:
+            name (str): The name searched for.
+            limit (int): The most names to return. Defaults to 5.
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            list: A NameMatch for each name found, best first.
+        """
+        return self.get_name_index(kind).search(name, limit)
+
+    def get_catalog_version(self) -> int:
+        """
+        Returns the counter that increases every time bodies are added to the system, so that
+        anything derived from the catalog can tell when it needs rebuilding.
+
+        Returns:
+            int: The current catalog version.
+        """
+        return self.catalog_version
+
+    def get_cache_version(self) -> tuple:
+        """
+        Returns the versions that cached answers depend on. Creating deferred bodies doesn't
+        change the catalog, but it does change what is indexed, so answers cached before
+        then may be stale.
+
+        Returns:
+            tuple: The catalog version and the number of times deferred bodies were created.
+        """
+        return self.catalog_version, self.materialised_version
+
+    def get_sorted_index(self, attribute: str, kind: type | None = None) -> SortedIndex:
+        """
+        Returns the index of the system's bodies of a kind sorted by an attribute, building
+        it the first time it is asked for. After that it is kept up to date as bodies are
+        added. An index that can hold moons needs every moon, so any deferred ones are
+        created first.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            SortedIndex: The index.
+        """
+        if kind is not Planet:
+            for parent in set(self.deferred_index.values()):
+                parent.materialise_orbiting_objects()
+        index = self.sorted_indexes.get((kind, attribute))
+        if index is None:
+            bodies = self.iter_breadth_first(include_self=False, materialise=False)
+            index = self.sorted_indexes[(kind, attribute)] = SortedIndex(attribute, kind, bodies)
+        return index
+
+    def get_bodies_in_range(self, attribute: str, low: float | None = None, high: float | None = None,
+                            kind: type | None = None) -> list:
+        """
+        Returns the bodies whose value of an attribute lies within a range.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            low (float, optional): The smallest value to include. Defaults to no lower limit.
+            high (float, optional): The largest value to include. Defaults to no upper limit.
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            list: The matching bodies in ascending order of value.
+        """
+        return self.get_sorted_index(attribute, kind).range(low, high)
+
+    def get_top_bodies(self, attribute: str, count: int, kind: type | None = None, largest: bool = True) -> list:
+        """
+        Returns the bodies with the largest (or smallest) values of an attribute.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            count (int): The number of bodies to return.
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+            largest (bool): True for the largest values, False for the smallest. Defaults to True.
+
+        Returns:
+            list: The bodies, best first.
+        """
+        return self.get_sorted_index(attribute, kind).top(count, largest)
 
 
 class Planet(CelestialBody):
@@ -178,6 +928,8 @@ class Planet(CelestialBody):
         get_planet_facts(): Returns both fun facts.
     """
 
+    __slots__ = ("fact1", "fact2")
+
     def __init__(self, primary=None, name="Unnamed", mass=0.0, distance=0.0, rotational=0.0, f1="", f2="") -> None:
         """
         Initializes a Planet with specific attributes.
@@ -192,8 +944,9 @@ class Planet(CelestialBody):
             f2 (str): The second fun fact about the planet. Defaults to an empty string.
         """
         super().__init__(name, primary, mass, distance, rotational)
-        self.fact1 = f1
-        self.fact2 = f2
+        # Facts are often repeated across a catalog, so identical facts share one string
+        self.fact1 = sys.intern(f1) if type(f1) is str else f1
+        self.fact2 = sys.intern(f2) if type(f2) is str else f2
 
     def __str__(self) -> str:
         """
@@ -202,13 +955,16 @@ class Planet(CelestialBody):
         Returns:
             str: The planet's details and fun facts.
         """
-        return (
-            f"My name is {self.get_name()}, my mass is {self.get_mass()}e+24 kg, "
-            f"my distance from the Sun is {self.get_distance()} million km, I rotate at "
-            f"{self.get_rotational()} m/s, I orbit {self.get_primary()} and I have "
-            f"{self.get_num_orbiting_objects()} orbiting objects: {self.get_orbiting_object_names()}."
-            f"2 facts about me are: {self.get_planet_facts()}"
-        )
+        text = self.recall("str")
+        if text is None:
+            text = self.remember("str", (
+                f"My name is {self.get_name()}, my mass is {self.get_mass()}e+24 kg, "
+                f"my distance from the Sun is {self.get_distance()} million km, I rotate at "
+                f"{self.get_rotational()} m/s, I orbit {self.get_primary()} and I have "
+                f"{self.get_num_orbiting_objects()} orbiting objects: {self.get_orbiting_object_names()}."
+                f"2 facts about me are: {self.get_planet_facts()}"
+            ))
+        return text
 
     def get_planet_fact1(self) -> str:
         """
@@ -248,6 +1004,8 @@ class Moon(CelestialBody):
         __str__(): Returns a descriptive string about the moon and its primary.
     """
 
+    __slots__ = ()
+
     def __init__(self, name="Unnamed", primary=None) -> None:
         """
         Initializes a Moon with specific attributes.
@@ -266,3 +1024,67 @@ class Moon(CelestialBody):
             str: The moon's name and its primary celestial body.
         """
         return f"My name is {self.name} and I orbit {self.get_primary()}"
+
+
+class Galaxy(CelestialBody):
+    """
+    A class to represent a catalog of star systems, inheriting from CelestialBody.
+
+    Attributes:
+        star_index (dict): The stars in the galaxy, keyed by case-folded name.
+
+    Methods:
+        __str__(): Returns a descriptive string about the galaxy and its stars.
+        register_orbiting_objects(parent, objects, changed): Adds stars to the star index.
+        get_star(name): Returns the star with the given name, ignoring case.
+    """
+
+    __slots__ = ("star_index",)
+
+    def __init__(self, name="Unnamed") -> None:
+        """
+        Initializes a Galaxy with the given name.
+
+        Args:
+            name (str): The name of the galaxy. Defaults to "Unnamed".
+        """
+        super().__init__(name)
+        self.star_index = {}
+
+    def __str__(self) -> str:
+        """
+        Returns a descriptive string about the galaxy and its stars.
+
+        Returns:
+            str: The galaxy's name and its stars.
+        """
+        text = self.recall("str")
+        if text is None:
+            text = self.remember("str", f"My name is {self.name} and my stars are {self.get_orbiting_object_names()}")
+        return text
+
+    def register_orbiting_objects(self, parent, objects, changed=True) -> None:
+        """
+        Adds stars added directly to the galaxy to the star index. Each star indexes its
+        own planets and moons.
+
+        Args:
+            parent (CelestialBody): The celestial body the objects were added to.
+            objects (list): The objects that were added.
+            changed (bool): False if the objects were already counted as deferred objects. Defaults to True.
+        """
+        if parent is self:
+            for star in objects:
+                self.star_index.setdefault(star.get_name().casefold(), star)
+
+    def get_star(self, name: str) -> Star | None:
+        """
+        Returns the star in the galaxy with the given name, ignoring case.
+
+        Args:
+            name (str): The name of the star.
+
+        Returns:
+            Star | None: The matching star, or None if the galaxy has no such star.
+        """
+        return self.star_index.get(name.strip().casefold())
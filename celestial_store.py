@@ -0,0 +1,756 @@
+import heapq
+from bisect import bisect_left
+from array import array
+from itertools import compress
+from celestial import CelestialBody, Star, Planet, Moon, SortedIndex, SubtreeTotals
+from name_index import TrigramIndex
+
+
+STAR, PLANET, MOON = 0, 1, 2
+
+NUMERIC_COLUMNS = ("mass", "distance", "rotational")
+INTEGER_FLAGS = {"mass": 1, "distance": 2, "rotational": 4}
+
+
+class BodyStore:
+    """
+    A class to hold every body of a solar system as a struct of arrays rather than one
+    Python object per body.
+
+    Each body is a row number. Its numbers live in typed `array` columns, and its name and
+    facts are ids into a shared string table, so a body costs a few dozen bytes instead of
+    a full object with its own dictionary and list. The children of each body are stored
+    in consecutive rows, so a body only needs the first row and number of its children.
+
+    Attributes:
+        strings (list): The string table of names and facts.
+        string_ids (dict): Maps each fact in the string table to its id, so repeated facts are stored once.
+        kind (array): STAR, PLANET or MOON for each body.
+        name_id (array): The string id of each body's name.
+        primary (array): The row of each body's primary, or -1 for the star.
+        mass (array): The mass of each body.
+        distance (array): The distance of each body from its primary.
+        rotational (array): The rotational speed of each body.
+        integer_flags (array): Bit flags recording which numeric values were given as integers.
+        fact1_id (array): The string id of each body's first fact.
+        fact2_id (array): The string id of each body's second fact.
+        child_start (array): The row of each body's first orbiting object.
+        child_count (array): The number of objects orbiting each body.
+        name_order (array | None): The rows sorted by case-folded name, built on the first lookup.
+        name_indexes (dict): The TrigramIndex of the names of each kind of body searched so far.
+        subtree_totals (tuple | None): The subtree mass, descendant count and depth columns, worked out on the first request.
+
+    Methods:
+        add_body(kind, name, primary, mass, distance, rotational, fact1, fact2): Appends a body.
+        string(string_id): Returns a string from the string table.
+        value(column, row): Returns a numeric value as it was originally given.
+        find(name): Returns the row of the body with the given name, ignoring case.
+        get_name_index(kind): Returns the fuzzy search index of the names of a kind of body.
+        children(row): Returns the rows of the objects orbiting a body.
+        get_subtree_totals(row): Returns the total mass, descendant count and depth of a body's subtree.
+        view(row): Returns a Star, Planet or Moon view of a body.
+        get_root(): Returns a view of the star.
+        column(name): Returns a numeric column.
+        total(column, kind): Returns the sum of a numeric column.
+        select(column, low, high, kind): Returns the rows whose value lies in a range.
+        top(column, k, kind, largest): Returns the rows with the largest or smallest values.
+        from_records(star_name, planet_records, moon_records): Builds a store from catalog records.
+        from_star(star): Builds a store from an existing star tree.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty BodyStore.
+        """
+        self.strings = [""]
+        self.string_ids = {"": 0}
+        self.kind = array("b")
+        self.name_id = array("i")
+        self.primary = array("i")
+        self.mass = array("d")
+        self.distance = array("d")
+        self.rotational = array("d")
+        self.integer_flags = array("b")
+        self.fact1_id = array("i")
+        self.fact2_id = array("i")
+        self.child_start = array("i")
+        self.child_count = array("i")
+        self.name_order = None
+        self.name_indexes = {}
+        self.subtree_totals = None
+
+    def __len__(self) -> int:
+        """
+        Returns the number of bodies in the store.
+
+        Returns:
+            int: The number of bodies.
+        """
+        return len(self.kind)
+
+    def intern_string(self, text: str) -> int:
+        """
+        Returns the id of a string in the string table, adding it if needed.
+
+        Args:
+            text (str): The string.
+
+        Returns:
+            int: The string's id.
+        """
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def string(self, string_id: int) -> str:
+        """
+        Returns a string from the string table.
+
+        Args:
+            string_id (int): The string's id.
+
+        Returns:
+            str: The string.
+        """
+        return self.strings[string_id]
+
+    def value(self, column: str, row: int) -> float | int:
+        """
+        Returns a numeric value, as an int if it was given as one, so that bodies display
+        the same as they do when built from objects.
+
+        Args:
+            column (str): "mass", "distance" or "rotational".
+            row (int): The body's row.
+
+        Returns:
+            float | int: The value.
+        """
+        value = getattr(self, column)[row]
+        return int(value) if self.integer_flags[row] & INTEGER_FLAGS[column] else value
+
+    def add_body(self, kind: int, name: str, primary: int = -1, mass: float = 0.0, distance: float = 0.0,
+                 rotational: float = 0.0, fact1: str = "", fact2: str = "") -> int:
+        """
+        Appends a body to the store. All the objects orbiting a body must be added one
+        after another.
+
+        Args:
+            kind (int): STAR, PLANET or MOON.
+            name (str): The name of the body.
+            primary (int): The row of the body's primary, or -1 for none. Defaults to -1.
+            mass (float): The mass of the body. Defaults to 0.0.
+            distance (float): The distance from its primary. Defaults to 0.0.
+            rotational (float): The rotational speed. Defaults to 0.0.
+            fact1 (str): The first fun fact. Defaults to an empty string.
+            fact2 (str): The second fun fact. Defaults to an empty string.
+
+        Returns:
+            int: The row of the new body.
+
+        Raises:
+            ValueError: If the primary's other orbiting objects are not the rows just before.
+        """
+        row = len(self.kind)
+        if primary >= 0:
+            if self.child_count[primary] == 0:
+                self.child_start[primary] = row
+            elif self.child_start[primary] + self.child_count[primary] != row:
+                raise ValueError(f"The objects orbiting {self.string(self.name_id[primary])} must be added together")
+            self.child_count[primary] += 1
+
+        self.kind.append(kind)
+        # Names are nearly always unique, so they are appended rather than interned
+        self.name_id.append(len(self.strings))
+        self.strings.append(name)
+        self.primary.append(primary)
+        self.mass.append(mass)
+        self.distance.append(distance)
+        self.rotational.append(rotational)
+        values = {"mass": mass, "distance": distance, "rotational": rotational}
+        self.integer_flags.append(sum(flag for column, flag in INTEGER_FLAGS.items()
+                                      if isinstance(values[column], int)))
+        self.fact1_id.append(self.intern_string(fact1))
+        self.fact2_id.append(self.intern_string(fact2))
+        self.child_start.append(0)
+        self.child_count.append(0)
+        self.name_order = None
+        self.name_indexes = {}
+        self.subtree_totals = None
+        return row
+
+    def folded_name(self, row: int) -> str:
+        """
+        Returns a body's case-folded name.
+
+        Args:
+            row (int): The body's row.
+
+        Returns:
+            str: The case-folded name.
+        """
+        return self.string(self.name_id[row]).casefold()
+
+    def get_name_order(self) -> array:
+        """
+        Returns the rows sorted by case-folded name, sorting them if the store has changed.
+
+        Returns:
+            array: The sorted rows.
+        """
+        if self.name_order is None:
+            self.name_order = array("i", sorted(range(len(self.kind)), key=self.folded_name))
+        return self.name_order
+
+    def find(self, name: str) -> int:
+        """
+        Returns the row of the body with the given name, ignoring case. The rows are sorted
+        by name on the first lookup and searched with bisect after that, which costs four
+        bytes per body instead of a dictionary entry and a second copy of every name.
+
+        Args:
+            name (str): The name of the body.
+
+        Returns:
+            int: The first row with that name, or -1 if there is no such body.
+        """
+        name_order = self.get_name_order()
+        name = name.strip().casefold()
+        position = bisect_left(name_order, name, key=self.folded_name)
+        if position < len(name_order) and self.folded_name(name_order[position]) == name:
+            return name_order[position]
+        return -1
+
+    def get_name_index(self, kind: int | None = None) -> TrigramIndex:
+        """
+        Returns the fuzzy search index of the names of a kind of body, building it on the
+        first search and again after the store has changed.
+
+        Args:
+            kind (int, optional): STAR, PLANET or MOON. Defaults to every body.
+
+        Returns:
+            TrigramIndex: The index.
+        """
+        index = self.name_indexes.get(kind)
+        if index is None:
+            index = self.name_indexes[kind] = TrigramIndex(
+                self.string(self.name_id[row]) for row in self.rows_of_kind(kind))
+        return index
+
+    def children(self, row: int) -> range:
+        """
+        Returns the rows of the objects orbiting a body.
+
+        Args:
+            row (int): The body's row.
+
+        Returns:
+            range: The rows of its orbiting objects.
+        """
+        start = self.child_start[row]
+        return range(start, start + self.child_count[row])
+
+    def get_subtree_totals(self, row: int) -> SubtreeTotals:
+        """
+        Returns the total mass, number of descendants and depth of a body's subtree. The
+        totals of every body are worked out together on the first request, and again after
+        the store has changed, in one pass from the last row to the first: a body's orbiting
+        objects always come after it, so their totals are ready when it is reached.
+
+        Args:
+            row (int): The body's row.
+
+        Returns:
+            SubtreeTotals: The totals.
+        """
+        if self.subtree_totals is None:
+            size = len(self.kind)
+            mass, count, depth = array("d", bytes(8 * size)), array("i", bytes(4 * size)), array("i", bytes(4 * size))
+            for body in reversed(range(size)):
+                # Added up in the same order as CelestialBody.get_subtree_totals, so the totals match
+                body_mass, body_count, body_depth = self.value("mass", body), 0, 0
+                for child in self.children(body):
+                    body_mass += mass[child]
+                    body_count += count[child] + 1
+                    body_depth = max(body_depth, depth[child] + 1)
+                mass[body], count[body], depth[body] = body_mass, body_count, body_depth
+            self.subtree_totals = (mass, count, depth)
+        mass, count, depth = self.subtree_totals
+        return SubtreeTotals(mass[row], count[row], depth[row])
+
+    def view(self, row: int) -> CelestialBody:
+        """
+        Returns a Star, Planet or Moon view of a body.
+
+        Args:
+            row (int): The body's row.
+
+        Returns:
+            CelestialBody: A view that reads the body's values from the store.
+        """
+        return VIEW_CLASSES[self.kind[row]](self, row)
+
+    def get_root(self) -> "StarView":
+        """
+        Returns a view of the star the rest of the store orbits.
+
+        Returns:
+            StarView: The star.
+        """
+        return self.view(0)
+
+    def column(self, name: str) -> array:
+        """
+        Returns one of the numeric columns.
+
+        Args:
+            name (str): "mass", "distance" or "rotational".
+
+        Returns:
+            array: The column.
+        """
+        if name not in NUMERIC_COLUMNS:
+            raise KeyError(f"Unknown column '{name}'")
+        return getattr(self, name)
+
+    def rows_of_kind(self, kind: int | None) -> range | list:
+        """
+        Returns the rows of every body of the given kind.
+
+        Args:
+            kind (int | None): STAR, PLANET or MOON, or None for every body.
+
+        Returns:
+            range | list: The matching rows.
+        """
+        if kind is None:
+            return range(len(self.kind))
+        return list(compress(range(len(self.kind)), (body_kind == kind for body_kind in self.kind)))
+
+    def total(self, column: str, kind: int | None = None) -> float:
+        """
+        Returns the sum of a numeric column.
+
+        Args:
+            column (str): "mass", "distance" or "rotational".
+            kind (int | None): Only include bodies of this kind. Defaults to every body.
+
+        Returns:
+            float: The total.
+        """
+        values = self.column(column)
+        if kind is None:
+            return sum(values)
+        return sum(compress(values, (body_kind == kind for body_kind in self.kind)))
+
+    def select(self, column: str, low: float | None = None, high: float | None = None,
+               kind: int | None = None) -> list:
+        """
+        Returns the rows whose value in a numeric column lies within a range.
+
+        Args:
+            column (str): "mass", "distance" or "rotational".
+            low (float | None): The smallest value to include. Defaults to no lower limit.
+            high (float | None): The largest value to include. Defaults to no upper limit.
+            kind (int | None): Only include bodies of this kind. Defaults to every body.
+
+        Returns:
+            list: The matching rows, in store order.
+        """
+        values = self.column(column)
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        return [row for row in self.rows_of_kind(kind) if low <= values[row] <= high]
+
+    def top(self, column: str, k: int, kind: int | None = None, largest: bool = True) -> list:
+        """
+        Returns the rows with the largest (or smallest) values in a numeric column.
+
+        Args:
+            column (str): "mass", "distance" or "rotational".
+            k (int): The number of rows to return.
+            kind (int | None): Only include bodies of this kind. Defaults to every body.
+            largest (bool): True for the largest values, False for the smallest. Defaults to True.
+
+        Returns:
+            list: The rows, best first.
+        """
+        pick = heapq.nlargest if largest else heapq.nsmallest
+        return pick(k, self.rows_of_kind(kind), key=self.column(column).__getitem__)
+
+    def as_numpy(self, column: str):
+        """
+        Returns a numeric column as a NumPy array sharing the column's memory.
+
+        Args:
+            column (str): "mass", "distance" or "rotational".
+
+        Returns:
+            numpy.ndarray: The column, without copying.
+
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        import numpy
+        return numpy.frombuffer(self.column(column), dtype=numpy.float64)
+
+    @classmethod
+    def from_records(cls, star_name: str, planet_records, moon_records) -> "BodyStore":
+        """
+        Builds a store from planet records and per-planet moon name lists, such as those
+        streamed from planets.json and moons.json.
+
+        Args:
+            star_name (str): The name of the star.
+            planet_records (Iterable[dict]): The planet records.
+            moon_records (Iterable[tuple]): The (planet name, moon names) pairs.
+
+        Returns:
+            BodyStore: The new store.
+        """
+        store = cls()
+        root = store.add_body(STAR, star_name)
+        for item in planet_records:
+            store.add_body(PLANET, item["name"], root, item["mass"], item["distance"], item["rotational"],
+                           item["fact1"], item["fact2"])
+
+        # A temporary planet index, since the store's name order is rebuilt after each addition
+        planet_rows = {}
+        for row in store.children(root):
+            planet_rows.setdefault(store.folded_name(row), row)
+        for planet_name, moon_names in moon_records:
+            planet = planet_rows.get(planet_name.strip().casefold())
+            if planet is not None:
+                for moon_name in moon_names:
+                    store.add_body(MOON, moon_name, planet)
+        return store
+
+    @classmethod
+    def from_star(cls, star: Star) -> "BodyStore":
+        """
+        Builds a store from an existing star tree.
+
+        Args:
+            star (Star): The star object representing the solar system.
+
+        Returns:
+            BodyStore: The new store.
+        """
+        store = cls()
+        store.add_body(STAR, star.get_name(), mass=star.get_mass(), distance=star.get_distance(),
+                       rotational=star.get_rotational())
+
+        # Breadth-first, so that the objects orbiting each body are added together
+        pending = [(star, 0)]
+        for body, row in pending:
+            for orbiter in body.get_orbiting_objects():
+                kind = PLANET if isinstance(orbiter, Planet) else MOON
+                facts = (orbiter.get_planet_fact1(), orbiter.get_planet_fact2()) if kind == PLANET else ("", "")
+                child = store.add_body(kind, orbiter.get_name(), row, orbiter.get_mass(), orbiter.get_distance(),
+                                       orbiter.get_rotational(), *facts)
+                pending.append((orbiter, child))
+        return store
+
+
+class StoredBody:
+    """
+    A mixin that turns a celestial body class into a lightweight view of one row of a
+    BodyStore. The body's attributes are read from the store's columns, so the getters
+    and string representations of the viewed class work unchanged.
+
+    Attributes:
+        store (BodyStore): The store holding the body.
+        index (int): The body's row in the store.
+    """
+
+    __slots__ = ()
+
+    # Every orbiting object in a store already exists as a row, so nothing is ever deferred
+    deferred_objects = None
+    # Views are created on demand and don't keep state, so derived strings aren't remembered
+    derived = None
+
+    def __init__(self, store: BodyStore, index: int) -> None:
+        """
+        Initializes the view.
+
+        Args:
+            store (BodyStore): The store holding the body.
+            index (int): The body's row in the store.
+        """
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other) -> bool:
+        """
+        Returns whether two views are of the same body.
+
+        Returns:
+            bool: True if both view the same row of the same store.
+        """
+        if not isinstance(other, StoredBody):
+            return NotImplemented
+        return self.store is other.store and self.index == other.index
+
+    def __hash__(self) -> int:
+        """
+        Returns a hash for the viewed body.
+
+        Returns:
+            int: The hash.
+        """
+        return hash((id(self.store), self.index))
+
+    @property
+    def name(self) -> str:
+        """Returns the body's name from the string table."""
+        return self.store.string(self.store.name_id[self.index])
+
+    @property
+    def primary(self) -> CelestialBody | None:
+        """Returns a view of the body's primary, or None for the star."""
+        row = self.store.primary[self.index]
+        return self.store.view(row) if row >= 0 else None
+
+    @property
+    def mass(self) -> float:
+        """Returns the body's mass from the mass column."""
+        return self.store.value("mass", self.index)
+
+    @property
+    def distance(self) -> float:
+        """Returns the body's distance from the distance column."""
+        return self.store.value("distance", self.index)
+
+    @property
+    def rotational(self) -> float:
+        """Returns the body's rotational speed from the rotational column."""
+        return self.store.value("rotational", self.index)
+
+    @property
+    def orbiting_objects(self) -> list:
+        """Returns views of the objects orbiting the body."""
+        return [self.store.view(row) for row in self.store.children(self.index)]
+
+    @property
+    def subtree(self) -> SubtreeTotals:
+        """Returns the totals over the body's subtree from the store's subtree columns."""
+        return self.store.get_subtree_totals(self.index)
+
+    def get_num_orbiting_objects(self) -> int:
+        """
+        Returns the number of orbiting objects without creating views of them.
+
+        Returns:
+            int: The number of orbiting objects.
+        """
+        return self.store.child_count[self.index]
+
+    def remember(self, key: str, value: str) -> str:
+        """
+        Returns a derived string without remembering it, as views keep no state.
+
+        Args:
+            key (str): What the string is.
+            value (str): The string.
+
+        Returns:
+            str: The string.
+        """
+        return value
+
+    def add_orbiting_objects(self, objects) -> None:
+        """
+        Stored bodies are read-only; add bodies with BodyStore.add_body instead.
+
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Bodies in a BodyStore are read-only")
+
+    def remove_orbiting_objects(self, objects) -> None:
+        """
+        Stored bodies are read-only; build a new store instead.
+
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Bodies in a BodyStore are read-only")
+
+
+class StarView(StoredBody, Star):
+    """
+    A view of a star held in a BodyStore.
+    """
+
+    __slots__ = ("store", "index")
+
+    def get_planet(self, name: str) -> Planet | None:
+        """
+        Returns the planet orbiting the star with the given name, ignoring case.
+
+        Args:
+            name (str): The name of the planet.
+
+        Returns:
+            Planet | None: The matching planet, or None if the star has no such planet.
+        """
+        row = self.store.find(name)
+        if row < 0 or self.store.primary[row] != self.index:
+            return None
+        return self.store.view(row)
+
+    def get_body(self, name: str) -> CelestialBody | None:
+        """
+        Returns any body in the store with the given name, ignoring case.
+
+        Args:
+            name (str): The name of the body.
+
+        Returns:
+            CelestialBody | None: The matching body, or None if there is no such body.
+        """
+        row = self.store.find(name)
+        return self.store.view(row) if row >= 0 else None
+
+    def get_name_index(self, kind: type | None = None) -> TrigramIndex:
+        """
+        Returns the fuzzy search index of the names of a kind of body, which the store
+        keeps until it changes.
+
+        Args:
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            TrigramIndex: The index.
+        """
+        return self.store.get_name_index(self.store_kind(kind))
+
+    def get_sorted_index(self, attribute: str, kind: type | None = None) -> SortedIndex:
+        """
+        Returns an index of the star's bodies of a kind sorted by an attribute. It is built
+        from the store's column each time, as views keep no state; the range and top-k
+        questions scan the column instead and don't need it.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            SortedIndex: The index.
+        """
+        values = self.store.column(attribute)
+        rows = [row for row in self.store.select(attribute, kind=self.store_kind(kind)) if row != self.index]
+        rows.sort(key=values.__getitem__)
+        index = SortedIndex(attribute, kind)
+        index.values = [values[row] for row in rows]
+        index.bodies = [self.store.view(row) for row in rows]
+        return index
+
+    def get_catalog_version(self) -> int:
+        """
+        Returns the catalog version, which never changes because stored bodies are read-only.
+
+        Returns:
+            int: Always 0.
+        """
+        return 0
+
+    def get_cache_version(self) -> tuple:
+        """
+        Returns the versions that cached answers depend on, which never change because
+        stored bodies are read-only.
+
+        Returns:
+            tuple: Always (0, 0).
+        """
+        return 0, 0
+
+    def update_body(self, body, values: dict) -> None:
+        """
+        Stored bodies are read-only; build a new store instead.
+
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Bodies in a BodyStore are read-only")
+
+    def store_kind(self, kind: type | None) -> int | None:
+        """
+        Returns the store's kind code for a body class.
+
+        Args:
+            kind (type | None): Planet, Moon or Star, or None for every body.
+
+        Returns:
+            int | None: PLANET, MOON or STAR, or None for every body.
+        """
+        if kind is None:
+            return None
+        return PLANET if issubclass(kind, Planet) else MOON if issubclass(kind, Moon) else STAR
+
+    def get_bodies_in_range(self, attribute: str, low: float | None = None, high: float | None = None,
+                            kind: type | None = None) -> list:
+        """
+        Returns the bodies whose value of an attribute lies within a range, using a scan
+        of the store's column.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            low (float, optional): The smallest value to include. Defaults to no lower limit.
+            high (float, optional): The largest value to include. Defaults to no upper limit.
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            list: The matching bodies in ascending order of value.
+        """
+        rows = self.store.select(attribute, low, high, self.store_kind(kind))
+        rows.sort(key=self.store.column(attribute).__getitem__)
+        return [self.store.view(row) for row in rows]
+
+    def get_top_bodies(self, attribute: str, count: int, kind: type | None = None, largest: bool = True) -> list:
+        """
+        Returns the bodies with the largest (or smallest) values of an attribute.
+
+        Args:
+            attribute (str): "mass", "distance" or "rotational".
+            count (int): The number of bodies to return.
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+            largest (bool): True for the largest values, False for the smallest. Defaults to True.
+
+        Returns:
+            list: The bodies, best first.
+        """
+        return [self.store.view(row) for row in self.store.top(attribute, count, self.store_kind(kind), largest)]
+
+
+class PlanetView(StoredBody, Planet):
+    """
+    A view of a planet held in a BodyStore.
+    """
+
+    __slots__ = ("store", "index")
+
+    @property
+    def fact1(self) -> str:
+        """Returns the planet's first fact from the string table."""
+        return self.store.string(self.store.fact1_id[self.index])
+
+    @property
+    def fact2(self) -> str:
+        """Returns the planet's second fact from the string table."""
+        return self.store.string(self.store.fact2_id[self.index])
+
+
+class MoonView(StoredBody, Moon):
+    """
+    A view of a moon held in a BodyStore.
+    """
+
+    __slots__ = ("store", "index")
+
+
+VIEW_CLASSES = {STAR: StarView, PLANET: PlanetView, MOON: MoonView}
@@ -0,0 +1,387 @@
+import logging
+import math
+import os
+from datetime import date
+from typing import Iterator
+from celestial import CelestialBody
+from json_stream import iter_json_array, iter_json_object
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed to compute positions
+    np = None
+
+
+G = 6.674e-11                 # Gravitational constant, m^3 kg^-1 s^-2
+SOLAR_MASS = 1.989e6          # In the catalog's mass unit of 10^24 kg
+MASS_UNIT = 1e24              # Kilograms per catalog mass unit
+DISTANCE_UNIT = 1e9           # Metres per catalog distance unit (million km)
+SECONDS_PER_DAY = 86_400.0
+EPOCH_DATE = date(2000, 1, 1)  # Times are days since this date
+
+# The orbital elements a body may give in its "orbit" object, with their defaults.
+# Angles are in degrees, the semi-major axis is in million km and times are in days.
+ORBIT_DEFAULTS = {
+    "semi_major_axis": None,  # Defaults to the body's distance, giving a circular orbit
+    "eccentricity": 0.0,
+    "inclination": 0.0,
+    "ascending_node": 0.0,
+    "argument_of_periapsis": 0.0,
+    "mean_anomaly": 0.0,      # At the epoch
+    "epoch": 0.0,
+    "period": None,           # Defaults to Kepler's third law around the primary
+}
+
+
+def require_numpy() -> None:
+    """
+    Checks that NumPy is available.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+    if np is None:
+        raise ImportError("The ephemeris needs NumPy; install it with 'pip install -r requirements.txt'")
+
+
+def days_since_epoch(when: date) -> float:
+    """
+    Returns the time of a date in the ephemeris, counted in days since EPOCH_DATE.
+
+    Args:
+        when (date): The date.
+
+    Returns:
+        float: The number of days since EPOCH_DATE.
+    """
+    return float((when - EPOCH_DATE).days)
+
+
+def load_orbital_elements(planets_file: str = "planets.json", orbits_file: str | None = "orbits.json") -> dict:
+    """
+    Reads the orbital elements given in the catalog files.
+
+    A planet record in planets.json may hold an "orbit" object, and an optional orbits
+    file maps any body's name (planet or moon) to an "orbit" object in the same form,
+    overriding planets.json. Each orbit object may give any of the keys in ORBIT_DEFAULTS.
+
+    Args:
+        planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+        orbits_file (str, optional): The path to the orbits JSON file, which need not exist.
+            Defaults to "orbits.json".
+
+    Returns:
+        dict: Maps case-folded body names to their orbit objects.
+
+    Raises:
+        ValueError: If an orbit gives an unknown element.
+    """
+    elements = {}
+    for record in iter_json_array(planets_file):
+        if isinstance(record, dict) and "orbit" in record:
+            elements[record["name"].casefold()] = record["orbit"]
+
+    if orbits_file and os.path.exists(orbits_file):
+        for name, orbit in iter_json_object(orbits_file):
+            elements[name.casefold()] = orbit
+    elif orbits_file:
+        logging.info(f"No orbits file '{orbits_file}'; bodies without an orbit in '{planets_file}' are circular")
+
+    for name, orbit in elements.items():
+        unknown = set(orbit) - set(ORBIT_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown orbital elements for '{name}': {', '.join(sorted(unknown))}")
+    return elements
+
+
+def load_catalog_elements(catalog_folder: str = os.curdir) -> dict:
+    """
+    Reads the orbital elements in planets.json and orbits.json in the folder a system was
+    loaded from.
+
+    Args:
+        catalog_folder (str): The folder holding the catalog files. Defaults to the current directory.
+
+    Returns:
+        dict: Maps case-folded body names to their orbit objects, or is empty if the folder
+            has no planets.json.
+
+    Raises:
+        ValueError: If an orbit gives an unknown element.
+    """
+    planets_file = os.path.join(catalog_folder, "planets.json")
+    if not os.path.exists(planets_file):
+        return {}
+    return load_orbital_elements(planets_file, os.path.join(catalog_folder, "orbits.json"))
+
+
+class Ephemeris:
+    """
+    A class to compute where every body in a system is at one or many times.
+
+    Each body follows a Keplerian orbit around its primary. The orbital elements of all the
+    bodies are held in arrays, and Kepler's equation is solved with Halley's method for
+    every body and every time at once, so there are no per-body Python loops. A body's
+    position is its offset from its primary plus the primary's position, added one level
+    of the tree at a time. Positions are in million km from the root body, in the frame of
+    its orbits, and times are in days since EPOCH_DATE.
+
+    Attributes:
+        names (list): The name of each body, root first and every body after its primary.
+        parents (numpy.ndarray): The row of each body's primary, or -1 for the root.
+        depth (numpy.ndarray): Each body's depth below the root.
+        levels (list): The rows at each depth below the root.
+        semi_major_axis (numpy.ndarray): Each orbit's semi-major axis, in million km.
+        eccentricity (numpy.ndarray): Each orbit's eccentricity.
+        mean_motion (numpy.ndarray): Each body's mean motion, in radians per day.
+        mean_anomaly (numpy.ndarray): Each body's mean anomaly at its epoch, in radians.
+        epoch (numpy.ndarray): The time each mean anomaly is given for, in days.
+        p_axis (numpy.ndarray): The unit vector towards each orbit's periapsis.
+        q_axis (numpy.ndarray): The unit vector 90 degrees ahead of p_axis in each orbit.
+
+    Methods:
+        from_star(star, elements): Builds the ephemeris of a star and everything orbiting it.
+        solve_kepler(mean_anomaly, eccentricity): Solves Kepler's equation.
+        relative_positions(times, rows): Returns the bodies' offsets from their primaries.
+        with_primaries(rows): Returns the rows of some bodies and all their primaries.
+        positions(times, rows): Returns the position of every body, or some, at each time.
+        iter_positions(times, chunk_size): Yields positions a few times at a time.
+    """
+
+    def __init__(self, names, parents, semi_major_axis, eccentricity, inclination, ascending_node,
+                 argument_of_periapsis, mean_anomaly, epoch, mean_motion) -> None:
+        """
+        Initializes the Ephemeris from per-body arrays, with the root body first and every
+        body after its primary. Angles are in radians.
+
+        Args:
+            names (list): The name of each body.
+            parents (Sequence[int]): The row of each body's primary, or -1 for the root.
+            semi_major_axis (Sequence[float]): Each orbit's semi-major axis, in million km.
+            eccentricity (Sequence[float]): Each orbit's eccentricity, from 0 up to (not including) 1.
+            inclination (Sequence[float]): Each orbit's inclination.
+            ascending_node (Sequence[float]): The longitude of each orbit's ascending node.
+            argument_of_periapsis (Sequence[float]): Each orbit's argument of periapsis.
+            mean_anomaly (Sequence[float]): Each body's mean anomaly at its epoch.
+            epoch (Sequence[float]): The time each mean anomaly is given for, in days.
+            mean_motion (Sequence[float]): Each body's mean motion, in radians per day.
+
+        Raises:
+            ValueError: If an eccentricity is outside [0, 1) or a body comes before its primary.
+        """
+        require_numpy()
+        self.names = list(names)
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.semi_major_axis = np.asarray(semi_major_axis, dtype=np.float64)
+        self.eccentricity = np.asarray(eccentricity, dtype=np.float64)
+        self.mean_anomaly = np.asarray(mean_anomaly, dtype=np.float64)
+        self.epoch = np.asarray(epoch, dtype=np.float64)
+        self.mean_motion = np.asarray(mean_motion, dtype=np.float64)
+
+        if np.any((self.eccentricity < 0) | (self.eccentricity >= 1)):
+            raise ValueError("Only elliptical orbits (eccentricity from 0 up to 1) are supported")
+        rows = np.arange(len(self.parents))
+        if np.any(self.parents >= rows):
+            raise ValueError("Every body must come after its primary")
+
+        # Each body's depth below the root; every pass settles one more level of the tree
+        has_parent = self.parents >= 0
+        primaries = np.maximum(self.parents, 0)
+        depth = np.zeros(len(self.parents), dtype=np.int64)
+        while True:
+            updated = np.where(has_parent, depth[primaries] + 1, 0)
+            if np.array_equal(updated, depth):
+                break
+            depth = updated
+        self.depth = depth
+        self.levels = [np.flatnonzero(depth == number) for number in range(1, int(depth.max(initial=0)) + 1)]
+
+        # The perifocal axes of each orbit in the root body's frame
+        inclination = np.asarray(inclination, dtype=np.float64)
+        node = np.asarray(ascending_node, dtype=np.float64)
+        periapsis = np.asarray(argument_of_periapsis, dtype=np.float64)
+        cos_node, sin_node = np.cos(node), np.sin(node)
+        cos_peri, sin_peri = np.cos(periapsis), np.sin(periapsis)
+        cos_inc, sin_inc = np.cos(inclination), np.sin(inclination)
+        self.p_axis = np.stack([cos_node * cos_peri - sin_node * sin_peri * cos_inc,
+                                sin_node * cos_peri + cos_node * sin_peri * cos_inc,
+                                sin_peri * sin_inc], axis=1)
+        self.q_axis = np.stack([-cos_node * sin_peri - sin_node * cos_peri * cos_inc,
+                                -sin_node * sin_peri + cos_node * cos_peri * cos_inc,
+                                cos_peri * sin_inc], axis=1)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of bodies, including the root.
+
+        Returns:
+            int: The number of bodies.
+        """
+        return len(self.names)
+
+    @classmethod
+    def from_star(cls, star: CelestialBody, elements: dict | None = None) -> "Ephemeris":
+        """
+        Builds the ephemeris of a star and every body orbiting it. Bodies without orbital
+        elements follow a circular orbit at their distance, with a period from Kepler's
+        third law around their primary. Deferred moons are created.
+
+        Args:
+            star (CelestialBody): The root of the system.
+            elements (dict, optional): Maps case-folded body names to orbit objects, as
+                returned by load_orbital_elements(). Defaults to none.
+
+        Returns:
+            Ephemeris: The ephemeris.
+        """
+        elements = elements or {}
+        bodies = [star]
+        parents = [-1]
+        for row, body in enumerate(bodies):
+            for orbiter in body.get_orbiting_objects():
+                bodies.append(orbiter)
+                parents.append(row)
+
+        columns = {name: [] for name in ("semi_major_axis", "eccentricity", "inclination", "ascending_node",
+                                         "argument_of_periapsis", "mean_anomaly", "epoch", "mean_motion")}
+        for body, parent in zip(bodies, parents):
+            orbit = {**ORBIT_DEFAULTS, **elements.get(body.get_name().casefold(), {})}
+            axis = body.get_distance() if orbit["semi_major_axis"] is None else orbit["semi_major_axis"]
+            if orbit["period"]:
+                motion = 2 * math.pi / orbit["period"]
+            elif parent < 0 or not axis:
+                motion = 0.0
+            else:
+                primary_mass = bodies[parent].get_mass() or (SOLAR_MASS if parent == 0 else 0.0)
+                gm = G * primary_mass * MASS_UNIT
+                motion = math.sqrt(gm / (axis * DISTANCE_UNIT) ** 3) * SECONDS_PER_DAY
+
+            columns["semi_major_axis"].append(axis if parent >= 0 else 0.0)
+            columns["eccentricity"].append(orbit["eccentricity"])
+            columns["inclination"].append(math.radians(orbit["inclination"]))
+            columns["ascending_node"].append(math.radians(orbit["ascending_node"]))
+            columns["argument_of_periapsis"].append(math.radians(orbit["argument_of_periapsis"]))
+            columns["mean_anomaly"].append(math.radians(orbit["mean_anomaly"]))
+            columns["epoch"].append(orbit["epoch"])
+            columns["mean_motion"].append(motion)
+
+        return cls([body.get_name() for body in bodies], parents, **columns)
+
+    @staticmethod
+    def solve_kepler(mean_anomaly, eccentricity, tolerance: float = 1e-12, max_iterations: int = 50) -> tuple:
+        """
+        Solves Kepler's equation E - e sin E = M for the eccentric anomaly E with Halley's
+        method, for whole arrays of mean anomalies at once. The sine and cosine of E are
+        returned too, since positions need them and they are the costly part of each step.
+
+        Args:
+            mean_anomaly (numpy.ndarray): The mean anomalies, in radians.
+            eccentricity (numpy.ndarray): The eccentricities, broadcastable against mean_anomaly.
+            tolerance (float): The largest correction accepted as converged. Defaults to 1e-12.
+            max_iterations (int): The most steps taken. Defaults to 50.
+
+        Returns:
+            tuple: The eccentric anomalies in radians, and their sines and cosines.
+        """
+        mean_anomaly = np.remainder(mean_anomaly, 2 * np.pi)
+        # Starting from pi for high eccentricities keeps the iteration from overshooting
+        anomaly = np.where(eccentricity < 0.8, mean_anomaly, np.pi)
+        for _ in range(max_iterations):
+            sine, cosine = np.sin(anomaly), np.cos(anomaly)
+            e_sine = eccentricity * sine
+            error = anomaly - e_sine - mean_anomaly
+            slope = 1 - eccentricity * cosine
+            step = error / (slope - 0.5 * error * e_sine / slope)
+            anomaly -= step
+            if np.abs(step).max(initial=0.0) < tolerance:
+                break
+        # The last step is tiny, so the sine and cosine only need a first-order correction
+        return anomaly, sine - cosine * step, cosine + sine * step
+
+    def relative_positions(self, times, rows=None):
+        """
+        Returns the bodies' offsets from their primaries at each time.
+
+        Args:
+            times (numpy.ndarray): The times, in days.
+            rows (numpy.ndarray, optional): The rows of the bodies wanted. Defaults to every body.
+
+        Returns:
+            numpy.ndarray: The offsets, shaped (times, bodies, 3), in million km.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        rows = slice(None) if rows is None else rows
+        eccentricity = self.eccentricity[rows]
+        mean_anomaly = self.mean_anomaly[rows] + self.mean_motion[rows] * (times[:, None] - self.epoch[rows])
+        _, sine, cosine = self.solve_kepler(mean_anomaly, eccentricity)
+
+        axis = self.semi_major_axis[rows]
+        x = axis * (cosine - eccentricity)
+        y = axis * np.sqrt(1 - eccentricity ** 2) * sine
+        return x[..., None] * self.p_axis[rows] + y[..., None] * self.q_axis[rows]
+
+    def with_primaries(self, rows):
+        """
+        Returns the rows of some bodies together with the rows of all their primaries, up
+        to the root.
+
+        Args:
+            rows (numpy.ndarray): The rows of the bodies.
+
+        Returns:
+            numpy.ndarray: The rows, sorted, so every body comes after its primary.
+        """
+        needed = np.unique(rows)
+        while True:
+            primaries = self.parents[needed]
+            added = np.setdiff1d(primaries[primaries >= 0], needed, assume_unique=True)
+            if not len(added):
+                return needed
+            needed = np.union1d(needed, added)
+
+    def positions(self, times, rows=None):
+        """
+        Returns the position of every body at each time. If only some bodies are wanted,
+        just they and their primaries are computed.
+
+        Args:
+            times (numpy.ndarray): The times, in days.
+            rows (numpy.ndarray, optional): The rows of the bodies wanted. Defaults to every body.
+
+        Returns:
+            numpy.ndarray: The positions, shaped (times, bodies, 3), in million km from the root.
+        """
+        if rows is None:
+            positions = self.relative_positions(times)
+            # Each level's primaries already have their full positions
+            for level in self.levels:
+                positions[:, level] += positions[:, self.parents[level]]
+            return positions
+
+        rows = np.asarray(rows, dtype=np.int64)
+        needed = self.with_primaries(rows)
+        positions = self.relative_positions(times, needed)
+        # The primaries' places among the needed rows, with the root pointing at itself
+        local_parents = np.searchsorted(needed, np.maximum(self.parents[needed], 0))
+        depth = self.depth[needed]
+        for number in range(1, int(depth.max(initial=0)) + 1):
+            level = np.flatnonzero(depth == number)
+            positions[:, level] += positions[:, local_parents[level]]
+        return positions[:, np.searchsorted(needed, rows)]
+
+    def iter_positions(self, times, chunk_size: int = 16) -> Iterator[tuple]:
+        """
+        Yields the positions of every body a few times at a time, so long time series can
+        be processed without holding them all in memory.
+
+        Args:
+            times (numpy.ndarray): The times, in days.
+            chunk_size (int): The number of times per chunk. Defaults to 16.
+
+        Yields:
+            tuple: The times in the chunk and their positions, shaped (times, bodies, 3).
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        for start in range(0, len(times), chunk_size):
+            chunk = times[start:start + chunk_size]
+            yield chunk, self.positions(chunk)
@@ -0,0 +1,227 @@
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from ephemeris import Ephemeris, np, require_numpy
+
+FORMATS = ("binary", "csv")
+
+# The ephemeris used by each worker process, set once when the worker starts
+worker_ephemeris = None
+
+
+def init_worker(ephemeris: Ephemeris) -> None:
+    """
+    Keeps the ephemeris in a worker process, so it is sent to each worker only once
+    rather than with every chunk.
+
+    Args:
+        ephemeris (Ephemeris): The ephemeris to compute positions with.
+    """
+    global worker_ephemeris
+    worker_ephemeris = ephemeris
+
+
+def compute_chunk(times, row_start: int, row_stop: int):
+    """
+    Computes the positions of one block of bodies at a few times in a worker process.
+    This runs in the worker processes of export_positions, so it must stay a module-level
+    function.
+
+    Args:
+        times (numpy.ndarray): The times in the chunk, in days.
+        row_start (int): The first body's row.
+        row_stop (int): The row after the last body.
+
+    Returns:
+        numpy.ndarray: The positions, shaped (times, bodies, 3).
+    """
+    return worker_ephemeris.positions(times, np.arange(row_start, row_stop))
+
+
+def iter_chunks(num_times: int, num_bodies: int, time_chunk: int, body_chunk: int) -> Iterator[tuple]:
+    """
+    Yields the blocks of times and bodies an export is computed in, a time chunk at a
+    time and every body chunk within it.
+
+    Args:
+        num_times (int): The number of times.
+        num_bodies (int): The number of bodies.
+        time_chunk (int): The most times in a block.
+        body_chunk (int): The most bodies in a block.
+
+    Yields:
+        tuple: The block's first time, time after the last, first row and row after the last.
+    """
+    for time_start in range(0, num_times, time_chunk):
+        for row_start in range(0, num_bodies, body_chunk):
+            yield time_start, min(time_start + time_chunk, num_times), row_start, min(row_start + body_chunk, num_bodies)
+
+
+class PositionWriter:
+    """
+    A class to stream blocks of positions to a file as they are computed.
+
+    The binary format is a NumPy .npy file of float64 positions shaped (times, bodies, 3),
+    in million km, which np.load(..., mmap_mode="r") opens without reading it. The file
+    is sized up front and each block is written at its place, and the body names and
+    times are written next to it in a .json file. The CSV format has one line per body
+    and time: time, name, x, y and z.
+
+    Attributes:
+        path (str): The path of the output file.
+        file_format (str): "binary" or "csv".
+        names (list): The name of each body.
+        times (numpy.ndarray): The times, in days.
+        file (BinaryIO | TextIO): The open output file.
+        csv_writer (csv.writer): Writes the CSV lines, or None for a binary file.
+        data_offset (int): Where the positions start in a binary file.
+
+    Methods:
+        write(time_start, row_start, positions): Writes one block of positions.
+        close(): Closes the file.
+    """
+
+    def __init__(self, path: str, names: list, times, file_format: str = "binary") -> None:
+        """
+        Initializes the PositionWriter and opens the output file.
+
+        Args:
+            path (str): The path of the output file.
+            names (list): The name of each body.
+            times (numpy.ndarray): The times, in days.
+            file_format (str): "binary" or "csv". Defaults to "binary".
+
+        Raises:
+            ValueError: If the format isn't known.
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format '{file_format}', expected one of {', '.join(FORMATS)}")
+        self.path = path
+        self.file_format = file_format
+        self.names = names
+        self.times = times
+        self.data_offset = 0
+        self.csv_writer = None
+
+        if file_format == "csv":
+            self.file = open(path, "w", encoding="utf-8", newline="")
+            self.csv_writer = csv.writer(self.file, lineterminator="\n")
+            self.csv_writer.writerow(("time", "name", "x", "y", "z"))
+            return
+
+        shape = (len(times), len(names), 3)
+        self.file = open(path, "wb")
+        np.lib.format.write_array_header_1_0(self.file, {"descr": "<f8", "fortran_order": False, "shape": shape})
+        self.data_offset = self.file.tell()
+        self.file.truncate(self.data_offset + int(np.prod(shape)) * 8)
+        index_path = os.path.splitext(path)[0] + ".json"
+        with open(index_path if index_path != path else path + ".json", "w", encoding="utf-8") as index_file:
+            json.dump({"names": names, "times": times.tolist()}, index_file)
+
+    def write(self, time_start: int, row_start: int, positions) -> None:
+        """
+        Writes one block of positions.
+
+        Args:
+            time_start (int): The index of the block's first time.
+            row_start (int): The row of the block's first body.
+            positions (numpy.ndarray): The positions, shaped (times, bodies, 3).
+        """
+        if self.file_format == "csv":
+            names = self.names[row_start:row_start + positions.shape[1]]
+            for offset, block in enumerate(positions):
+                when = float(self.times[time_start + offset])
+                self.csv_writer.writerows((when, name, *position) for name, position in zip(names, block.tolist()))
+            return
+
+        row_bytes = len(self.names) * 3 * 8
+        for offset, block in enumerate(positions):
+            self.file.seek(self.data_offset + (time_start + offset) * row_bytes + row_start * 3 * 8)
+            self.file.write(np.ascontiguousarray(block, dtype="<f8").tobytes())
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        self.file.close()
+
+
+def export_positions(ephemeris: Ephemeris, times, path: str, file_format: str = "binary", time_chunk: int = 16,
+                     body_chunk: int = 100_000, workers: int = 1, report_interval: float = 10.0) -> dict:
+    """
+    Computes the position of every body at each time and streams them to a file, a block
+    of times and bodies at a time, so peak memory depends on the chunk sizes rather than
+    on the number of bodies and times. Blocks may be computed on a pool of worker
+    processes; at most two blocks per worker are in flight, and blocks are written in
+    order as they finish. Progress and throughput are logged as the export runs.
+
+    Args:
+        ephemeris (Ephemeris): The ephemeris to compute positions with.
+        times (numpy.ndarray): The times, in days.
+        path (str): The path of the output file.
+        file_format (str): "binary" or "csv". Defaults to "binary".
+        time_chunk (int): The most times in a block. Defaults to 16.
+        body_chunk (int): The most bodies in a block. Defaults to 100000.
+        workers (int): The number of worker processes; 1 computes every block in this
+            process, and None or 0 uses one per CPU. Defaults to 1.
+        report_interval (float): Seconds between progress reports. Defaults to 10.
+
+    Returns:
+        dict: The number of positions written, the seconds taken and the positions per second.
+
+    Raises:
+        ValueError: If workers is negative.
+    """
+    require_numpy()
+    if not workers:
+        workers = os.cpu_count() or 1
+    elif workers < 1:
+        raise ValueError(f"The number of export workers must be at least 1, not {workers}")
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    chunks = iter_chunks(len(times), len(ephemeris), max(time_chunk, 1), max(body_chunk, 1))
+    total = len(times) * len(ephemeris)
+    writer = PositionWriter(path, ephemeris.names, times, file_format)
+    written = 0
+    start = last_report = time.perf_counter()
+
+    def blocks() -> Iterator[tuple]:
+        if workers == 1:
+            for time_start, time_stop, row_start, row_stop in chunks:
+                positions = ephemeris.positions(times[time_start:time_stop], np.arange(row_start, row_stop))
+                yield time_start, row_start, positions
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(ephemeris,)) as pool:
+            pending = deque()
+            for time_start, time_stop, row_start, row_stop in chunks:
+                pending.append((time_start, row_start,
+                                pool.submit(compute_chunk, times[time_start:time_stop], row_start, row_stop)))
+                # Waiting for the oldest block keeps the finished blocks held in memory bounded
+                if len(pending) >= 2 * workers:
+                    time_start, row_start, future = pending.popleft()
+                    yield time_start, row_start, future.result()
+            while pending:
+                time_start, row_start, future = pending.popleft()
+                yield time_start, row_start, future.result()
+
+    try:
+        for time_start, row_start, positions in blocks():
+            writer.write(time_start, row_start, positions)
+            written += positions.shape[0] * positions.shape[1]
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                last_report = now
+                logging.info(f"Exported {written}/{total} positions ({written / total:.0%}), "
+                             f"{written / (now - start):.0f} positions/s")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else float("inf")
+    logging.info(f"Exported {written} positions of {len(ephemeris)} bodies at {len(times)} times to '{path}' "
+                 f"in {elapsed:.3f}s ({rate:.0f} positions/s)")
+    return {"positions": written, "seconds": round(elapsed, 3), "positions_per_second": round(rate)}
@@ -0,0 +1,286 @@
+import logging
+import os
+import threading
+from typing import NamedTuple
+from celestial import Star, Planet, Moon
+from json_stream import iter_json_array, iter_json_object
+
+# The planet record fields that can change, which are also the Planet attributes they set
+PLANET_FIELDS = ("mass", "distance", "rotational", "fact1", "fact2")
+
+
+class CatalogDiff(NamedTuple):
+    """
+    The records that differ between two versions of the catalog files.
+
+    Attributes:
+        added_planets (list): The records of planets that are new.
+        removed_planets (list): The names of planets that are gone.
+        changed_planets (list): The records of planets whose values changed.
+        added_moons (dict): Maps a planet name to the names of its new moons.
+        removed_moons (dict): Maps a planet name to the names of its moons that are gone.
+    """
+
+    added_planets: list
+    removed_planets: list
+    changed_planets: list
+    added_moons: dict
+    removed_moons: dict
+
+    def is_empty(self) -> bool:
+        """
+        Returns whether nothing changed.
+
+        Returns:
+            bool: True if the two versions hold the same records.
+        """
+        return not any(self)
+
+    def describe(self) -> str:
+        """
+        Returns a short description of the changes for the log.
+
+        Returns:
+            str: The number of planets and moons added, removed and changed.
+        """
+        return (f"{len(self.added_planets)} planet(s) added, {len(self.removed_planets)} removed, "
+                f"{len(self.changed_planets)} changed; {sum(map(len, self.added_moons.values()))} moon(s) added, "
+                f"{sum(map(len, self.removed_moons.values()))} removed")
+
+
+def read_catalog(planets_file: str = "planets.json", moons_file: str = "moons.json") -> tuple:
+    """
+    Reads and checks the catalog files, keying the planet records and moon lists by name.
+
+    Args:
+        planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+        moons_file (str): The path to the moons JSON file. Defaults to "moons.json".
+
+    Returns:
+        tuple: A dictionary of planet records by name, and one of moon name lists by planet name.
+
+    Raises:
+        ValueError: If a record is missing a field or a moon name isn't a string.
+    """
+    planets = {}
+    for record in iter_json_array(planets_file):
+        if not isinstance(record, dict) or not isinstance(record.get("name"), str):
+            raise ValueError(f"Invalid planet in data structure in {planets_file}")
+        missing = [field for field in PLANET_FIELDS if field not in record]
+        if missing:
+            raise ValueError(f"Planet {record['name']} in {planets_file} is missing {', '.join(missing)}")
+        planets.setdefault(record["name"], record)
+
+    moons = {}
+    if os.path.exists(moons_file):
+        for planet_name, moon_names in iter_json_object(moons_file):
+            if not isinstance(moon_names, list) or not all(isinstance(name, str) for name in moon_names):
+                raise ValueError(f"Invalid moon in data structure in {moons_file}")
+            moons[planet_name] = moon_names
+    return planets, moons
+
+
+def diff_catalog(old: tuple, new: tuple) -> CatalogDiff:
+    """
+    Compares two versions of the catalog record by record. Moons are compared by name, so
+    only moons that were added or removed count as changes, not a new order.
+
+    Args:
+        old (tuple): The planet records and moon lists returned by read_catalog before.
+        new (tuple): The planet records and moon lists returned by read_catalog now.
+
+    Returns:
+        CatalogDiff: The records that differ.
+    """
+    old_planets, old_moons = old
+    new_planets, new_moons = new
+    diff = CatalogDiff(
+        added_planets=[record for name, record in new_planets.items() if name not in old_planets],
+        removed_planets=[name for name in old_planets if name not in new_planets],
+        changed_planets=[record for name, record in new_planets.items()
+                         if name in old_planets and any(record[field] != old_planets[name][field]
+                                                        for field in PLANET_FIELDS)],
+        added_moons={},
+        removed_moons={},
+    )
+    for planet_name in new_planets:
+        before = old_moons.get(planet_name, []) if planet_name in old_planets else []
+        after = new_moons.get(planet_name, [])
+        known = set(before)
+        added = [name for name in after if name not in known]
+        if added:
+            diff.added_moons[planet_name] = added
+        kept = set(after)
+        removed = [name for name in before if name not in kept]
+        if removed:
+            diff.removed_moons[planet_name] = removed
+    return diff
+
+
+def apply_diff(star: Star, diff: CatalogDiff, lazy_moons: bool = False) -> None:
+    """
+    Applies the changed records to a live star tree, leaving the unchanged bodies, and
+    anything derived from them, alone. The new planets and moons are all built before the
+    tree is touched, so a record that can't be built leaves the tree as it was, and the
+    changes themselves can't fail part way through.
+
+    Args:
+        star (Star): The star the catalog was loaded into.
+        diff (CatalogDiff): The records that differ.
+        lazy_moons (bool): Defer the moons of new planets until they are needed, as the
+            system was loaded. Defaults to False.
+    """
+    # Build everything first, so nothing has changed if a record is bad
+    added = [Planet(star, name=record["name"], mass=record["mass"], distance=record["distance"],
+                    rotational=record["rotational"], f1=record["fact1"], f2=record["fact2"])
+             for record in diff.added_planets]
+    changed = []
+    for record in diff.changed_planets:
+        planet = star.get_planet(record["name"])
+        if planet is not None:
+            changed.append((planet, {field: record[field] for field in PLANET_FIELDS}))
+    planets = {planet.get_name(): planet for planet in added}
+    moon_changes = []
+    for planet_name in diff.added_moons.keys() | diff.removed_moons.keys():
+        planet = planets.get(planet_name) or star.get_planet(planet_name)
+        if planet is None:
+            continue
+        removed = set(diff.removed_moons.get(planet_name, ()))
+        names = diff.added_moons.get(planet_name, [])
+        moons = [] if lazy_moons and planet_name in planets else [Moon(name, planet) for name in names]
+        moon_changes.append((planet, removed, names, moons))
+
+    removed_planets = [planet for planet in map(star.get_planet, diff.removed_planets) if planet is not None]
+    star.remove_orbiting_objects(removed_planets)
+    star.add_orbiting_objects(added)
+    for planet, values in changed:
+        star.update_body(planet, values)
+    # Every removal comes before any addition, so a moon moved between planets is indexed again
+    for planet, removed, _, _ in moon_changes:
+        if removed:
+            planet.materialise_orbiting_objects()
+            planet.remove_orbiting_objects([moon for moon in planet.orbiting_objects if moon.get_name() in removed])
+    for planet, _, names, moons in moon_changes:
+        if moons:
+            planet.add_orbiting_objects(moons)
+        elif names:
+            planet.defer_orbiting_objects(names, Moon)
+
+
+class CatalogWatcher:
+    """
+    A class to notice changes to the catalog files and apply them to a live star tree.
+
+    Checking is split in two. poll() looks at the files' sizes and modification times and,
+    if they changed, reads the files and works out which records differ, without touching
+    the tree, so it may run on any thread. apply() then changes the tree in one go, and is
+    run by whatever answers questions about it (the Tk event loop, or the server's asyncio
+    loop through query_server.watch_catalog) between two questions, so no question ever
+    sees a half-applied catalog. The lock keeps two threads from applying changes at once.
+
+    Attributes:
+        star (Star): The star the catalog was loaded into.
+        planets_file (str): The path to the planets JSON file.
+        moons_file (str): The path to the moons JSON file.
+        lazy_moons (bool): Whether the moons of new planets are deferred.
+        signature (tuple): The size and modification time of each file when last read.
+        catalog (tuple): The planet records and moon lists last applied.
+        lock (threading.Lock): Held while changes are applied.
+
+    Methods:
+        get_signature(): Returns the current size and modification time of each file.
+        poll(): Returns the changes made to the files since they were last read, if any.
+        apply(pending): Applies the changes returned by poll to the star tree.
+        check(): Polls and applies any changes.
+    """
+
+    def __init__(self, star: Star, planets_file: str = "planets.json", moons_file: str = "moons.json",
+                 lazy_moons: bool = False) -> None:
+        """
+        Initializes the CatalogWatcher and reads the catalog the star was loaded from.
+
+        Args:
+            star (Star): The star the catalog was loaded into.
+            planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+            moons_file (str): The path to the moons JSON file. Defaults to "moons.json".
+            lazy_moons (bool): Defer the moons of new planets. Defaults to False.
+        """
+        self.star = star
+        self.planets_file = planets_file
+        self.moons_file = moons_file
+        self.lazy_moons = lazy_moons
+        self.signature = self.get_signature()
+        self.catalog = read_catalog(planets_file, moons_file)
+        self.lock = threading.Lock()
+
+    def get_signature(self) -> tuple:
+        """
+        Returns the size and modification time of each catalog file.
+
+        Returns:
+            tuple: A (size, mtime) pair for each file, or None for a missing file.
+        """
+        signature = []
+        for filename in (self.planets_file, self.moons_file):
+            try:
+                stat = os.stat(filename)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def poll(self) -> tuple | None:
+        """
+        Reads the catalog files if they have changed since they were last read and works
+        out which records differ. The tree isn't touched. Files that can't be read, such as
+        one saved half way, are logged and read again when they next change.
+
+        Returns:
+            tuple | None: The signature, catalog and CatalogDiff to pass to apply(), or None
+                if nothing changed.
+        """
+        signature = self.get_signature()
+        if signature == self.signature:
+            return None
+        try:
+            catalog = read_catalog(self.planets_file, self.moons_file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Catalog not reloaded: {e}")
+            self.signature = signature
+            return None
+        return signature, catalog, diff_catalog(self.catalog, catalog)
+
+    def apply(self, pending: tuple | None) -> CatalogDiff | None:
+        """
+        Applies changes returned by poll() to the star tree.
+
+        Args:
+            pending (tuple, optional): What poll() returned.
+
+        Returns:
+            CatalogDiff | None: The changes applied, or None if there were none.
+        """
+        if pending is None:
+            return None
+        signature, catalog, diff = pending
+        with self.lock:
+            if not diff.is_empty():
+                try:
+                    apply_diff(self.star, diff, self.lazy_moons)
+                except (KeyError, TypeError, ValueError) as e:
+                    logging.error(f"Catalog not reloaded: {e}")
+                    self.signature = signature
+                    return None
+                logging.info(f"Catalog reloaded: {diff.describe()}")
+            self.signature = signature
+            self.catalog = catalog
+        return diff if not diff.is_empty() else None
+
+    def check(self) -> CatalogDiff | None:
+        """
+        Reads the catalog files if they have changed and applies the changes to the tree.
+
+        Returns:
+            CatalogDiff | None: The changes applied, or None if there were none.
+        """
+        return self.apply(self.poll())
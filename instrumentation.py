@@ -0,0 +1,347 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# The upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "celestial"
+
+
+class Histogram:
+    """
+    A class to count how many timings fell into each latency bucket.
+
+    Attributes:
+        counts (list): The number of timings in each bucket, with one more for slower timings.
+        count (int): The number of timings.
+        total (float): The sum of the timings, in seconds.
+        maximum (float): The slowest timing, in seconds.
+
+    Methods:
+        observe(seconds): Records a timing.
+        quantile(fraction): Returns the bucket bound below which a fraction of timings fell.
+    """
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty Histogram.
+        """
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """
+        Records a timing.
+
+        Args:
+            seconds (float): The timing, in seconds.
+        """
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Returns the upper bound of the bucket holding a quantile, such as 0.95 for the
+        95th percentile. Timings slower than every bucket report the slowest timing.
+
+        Args:
+            fraction (float): The quantile, from 0 to 1.
+
+        Returns:
+            float: The bucket's upper bound in seconds, or 0 if nothing has been timed.
+        """
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return bound
+        return self.maximum
+
+
+def format_labels(labels: tuple) -> str:
+    """
+    Returns labels in the Prometheus text format.
+
+    Args:
+        labels (tuple): The (name, value) pairs.
+
+    Returns:
+        str: The labels in braces, or an empty string if there are none.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metrics:
+    """
+    A class to record timing spans, counters and latency histograms of the load and query
+    paths, and export them as a log line or as Prometheus text.
+
+    Nothing is recorded until it is enabled, and the checks made while it is disabled are a
+    single attribute lookup, so instrumented code runs at full speed by default.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+        counters (dict): Maps (name, labels) to a count.
+        histograms (dict): Maps each span name to the Histogram of its timings.
+        lock (threading.Lock): Guards the records against a reporting thread.
+
+    Methods:
+        enable(enabled): Turns recording on or off.
+        reset(): Discards everything recorded.
+        count(name, amount, **labels): Adds to a counter.
+        observe(name, seconds): Records a span's timing.
+        span(name): Returns a context manager timing the code inside it.
+        format_log_line(): Returns a one-line summary of everything recorded.
+        format_prometheus(): Returns everything recorded in the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the Metrics, disabled.
+        """
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def enable(self, enabled: bool = True) -> None:
+        """
+        Turns recording on or off. What was recorded is kept.
+
+        Args:
+            enabled (bool): True to record. Defaults to True.
+        """
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        """
+        Discards every counter and timing.
+        """
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def count(self, name: str, amount: int = 1, **labels) -> None:
+        """
+        Adds to a counter, if recording is enabled.
+
+        Args:
+            name (str): The counter's name.
+            amount (int): The amount to add. Defaults to 1.
+            **labels: Labels telling apart counts of the same thing, such as status="ok".
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Records a span's timing, if recording is enabled.
+
+        Args:
+            name (str): The span's name.
+            seconds (float): How long it took.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def span(self, name: str) -> "Span":
+        """
+        Returns a context manager that times the code inside it as a span.
+
+        Args:
+            name (str): The span's name.
+
+        Returns:
+            Span: The context manager.
+        """
+        return Span(self, name)
+
+    def format_log_line(self) -> str:
+        """
+        Returns a one-line summary: the count, mean, 95th percentile and slowest time of
+        each span, then each counter.
+
+        Returns:
+            str: The summary, or a note that nothing has been recorded.
+        """
+        with self.lock:
+            parts = [f"{name} n={histogram.count} mean={histogram.total / histogram.count * 1000:.2f}ms "
+                     f"p95<={histogram.quantile(0.95) * 1000:.2f}ms max={histogram.maximum * 1000:.2f}ms"
+                     for name, histogram in sorted(self.histograms.items())]
+            parts.extend(f"{name}{format_labels(labels)}={value}"
+                         for (name, labels), value in sorted(self.counters.items()))
+        return "; ".join(parts) if parts else "nothing recorded"
+
+    def format_prometheus(self) -> str:
+        """
+        Returns every span and counter in the Prometheus text exposition format. Spans are
+        one histogram, labelled by span name, and each counter is its own metric.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = []
+        with self.lock:
+            if self.histograms:
+                metric = f"{PREFIX}_span_seconds"
+                lines += [f"# HELP {metric} Time spent in each instrumented span.", f"# TYPE {metric} histogram"]
+                for name, histogram in sorted(self.histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{span="{name}"}} {histogram.total}')
+                    lines.append(f'{metric}_count{{span="{name}"}} {histogram.count}')
+
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{name}_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class Span:
+    """
+    A context manager that records how long the code inside it took, if recording is enabled.
+
+    Attributes:
+        metrics (Metrics): The metrics the timing is recorded in.
+        name (str): The span's name.
+        start (float | None): The time.perf_counter() value when the span started, or None
+            if recording was disabled then.
+    """
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: Metrics, name: str) -> None:
+        """
+        Initializes the Span.
+
+        Args:
+            metrics (Metrics): The metrics the timing is recorded in.
+            name (str): The span's name.
+        """
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self) -> "Span":
+        if self.metrics.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.start is not None:
+            self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+# The metrics every instrumented function records into
+metrics = Metrics()
+
+
+def timed(name: str):
+    """
+    Returns a decorator that times every call of a function as a span. While recording is
+    disabled the function is called straight away after one attribute check.
+
+    Args:
+        name (str): The span's name.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class MetricsReporter:
+    """
+    A class to log a summary of the metrics, and optionally write a Prometheus text dump,
+    every so often from a background thread.
+
+    Attributes:
+        interval (float): Seconds between reports.
+        dump_file (str | None): The file rewritten with the Prometheus text each report, if any.
+        stopped (threading.Event): Set to stop reporting.
+        thread (threading.Thread): The daemon thread reporting.
+
+    Methods:
+        report(): Logs the summary and writes the dump once.
+        stop(): Stops the thread and reports one last time.
+    """
+
+    def __init__(self, interval: float = 60.0, dump_file: str | None = None) -> None:
+        """
+        Initializes the MetricsReporter and starts its thread.
+
+        Args:
+            interval (float): Seconds between reports. Defaults to 60.
+            dump_file (str, optional): The file to write the Prometheus text to. Defaults to None.
+        """
+        self.interval = interval
+        self.dump_file = dump_file
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="metrics-reporter", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        """
+        Reports every interval until stopped.
+        """
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self) -> None:
+        """
+        Logs the summary of the metrics and writes the Prometheus dump, if there is one.
+        The dump is written to a temporary file and renamed, so it is never read half written.
+        """
+        logging.info(f"Metrics: {metrics.format_log_line()}")
+        if self.dump_file:
+            partial = self.dump_file + ".tmp"
+            with open(partial, "w", encoding="utf-8") as file:
+                file.write(metrics.format_prometheus())
+            os.replace(partial, self.dump_file)
+
+    def stop(self) -> None:
+        """
+        Stops the reporting thread and reports one last time.
+        """
+        self.stopped.set()
+        self.thread.join()
+        self.report()
@@ -0,0 +1,222 @@
+import json
+import logging
+import re
+from typing import Any, Iterator, TextIO
+
+
+WHITESPACE = re.compile(r"\s*")
+# Characters that can continue a number, so a number followed by one may have been cut short
+NUMBER_CHARACTERS = frozenset("0123456789.eE+-")
+CHUNK_SIZE = 64 * 1024
+
+
+class JsonStreamReader:
+    """
+    A class to read the values inside a top-level JSON array or object one at a time,
+    without holding the whole document in memory.
+
+    The reader keeps a small text buffer that is refilled from the file as values are
+    decoded, so peak memory is about one value plus one chunk. A value too large for the
+    buffer is read in ever larger pieces, each at least as long as what is already
+    buffered, so the value is decoded again only a logarithmic number of times.
+
+    Attributes:
+        file (TextIO): The open JSON file.
+        chunk_size (int): The number of characters read from the file at a time.
+        buffer (str): The text read from the file that hasn't been decoded yet.
+        pos (int): The position of the next undecoded character in the buffer.
+        eof (bool): Whether the whole file has been read.
+
+    Methods:
+        iter_array(): Yields each value of a top-level JSON array.
+        iter_object(): Yields each (key, value) pair of a top-level JSON object.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> None:
+        """
+        Initializes the JsonStreamReader.
+
+        Args:
+            file (TextIO): The open JSON file.
+            chunk_size (int): The number of characters read at a time. Defaults to 64 KiB.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = 0) -> bool:
+        """
+        Reads the next chunk of the file into the buffer, dropping what has been decoded.
+
+        Args:
+            size (int): The least number of characters to read, if more than a chunk.
+                Defaults to 0.
+
+        Returns:
+            bool: False if the end of the file has been reached.
+        """
+        chunk = self.file.read(max(self.chunk_size, size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it.
+
+        Returns:
+            str: The next character, or an empty string at the end of the file.
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, characters: str) -> str:
+        """
+        Consumes the next character, which must be one of the given characters.
+
+        Args:
+            characters (str): The characters allowed next.
+
+        Returns:
+            str: The character consumed.
+
+        Raises:
+            json.JSONDecodeError: If the next character is not one of those allowed.
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(f"Expecting one of {characters!r}", self.buffer, self.pos)
+        self.pos += 1
+        return character
+
+    def decode(self) -> Any:
+        """
+        Decodes the next complete JSON value, reading more of the file as needed.
+
+        Returns:
+            Any: The decoded value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Doubling what is buffered keeps the number of attempts at a large value small
+                if self.eof or not self.fill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # A number that runs to the end of the buffer may continue in the next chunk, and
+            # one cut inside it (such as "1." of "1.5") decodes as a shorter number. Any
+            # other value is complete once it decodes.
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buffer) or self.buffer[end] in NUMBER_CHARACTERS) and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Yields each value of a top-level JSON array.
+
+        Yields:
+            Any: The next value in the array.
+
+        Raises:
+            TypeError: If the document is not a JSON array.
+        """
+        if self.peek() != "[":
+            raise TypeError("expected a JSON array at the top level")
+        self.pos += 1
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(",]") == "]":
+                return
+
+    def iter_object(self) -> Iterator[tuple]:
+        """
+        Yields each (key, value) pair of a top-level JSON object.
+
+        Yields:
+            tuple: The next key and value in the object.
+
+        Raises:
+            TypeError: If the document is not a JSON object.
+        """
+        if self.peek() != "{":
+            raise TypeError("expected a JSON object at the top level")
+        self.pos += 1
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", self.buffer, self.pos)
+            key = self.decode()
+            self.expect(":")
+            yield key, self.decode()
+            if self.expect(",}") == "}":
+                return
+
+
+def stream_json(filename: str, top_level: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Streams the entries of a JSON file's top-level array or object, logging errors in the
+    same way as main.load_json_data.
+
+    Args:
+        filename (str): The path to the JSON file.
+        top_level (str): "array" to yield values, or "object" to yield (key, value) pairs.
+        chunk_size (int): The number of characters read at a time. Defaults to 64 KiB.
+
+    Yields:
+        Any: The next entry in the file.
+    """
+    try:
+        with open(filename, "r") as file:
+            reader = JsonStreamReader(file, chunk_size)
+            yield from reader.iter_array() if top_level == "array" else reader.iter_object()
+    except FileNotFoundError as e:
+        logging.error(f"The file '{filename}' was not found.")
+        raise e
+    except json.JSONDecodeError as e:
+        logging.error(f"The file '{filename}' does not contain valid JSON.")
+        raise e
+
+
+def iter_json_array(filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yields the records of a JSON file whose top level is an array, one at a time.
+
+    Args:
+        filename (str): The path to the JSON file.
+        chunk_size (int): The number of characters read at a time. Defaults to 64 KiB.
+
+    Yields:
+        Any: The next record in the array.
+    """
+    return stream_json(filename, "array", chunk_size)
+
+
+def iter_json_object(filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Yields the (key, value) pairs of a JSON file whose top level is an object, one at a time.
+
+    Args:
+        filename (str): The path to the JSON file.
+        chunk_size (int): The number of characters read at a time. Defaults to 64 KiB.
+
+    Yields:
+        tuple: The next key and value in the object.
+    """
+    return stream_json(filename, "object", chunk_size)
@@ -31,14 +31,31 @@ Key references used in the coding of this application:
     
 """
 
-import sys, json, logging
-from typing import Any
-from celestial import Star, Planet, Moon
-from system_menu import SystemMenu
+import sys, os, json, logging, argparse, time, hashlib, pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Any, Iterable, TextIO
+from celestial import Galaxy, Star, Planet, Moon, SortedIndex, SubtreeTotals
+from binary_catalog import open_binary_catalog, write_binary_catalog
+from celestial_store import BodyStore, StarView
+from json_stream import iter_json_array, iter_json_object
+from name_index import TrigramIndex
+from query_engine import QueryEngine
+from instrumentation import MetricsReporter, metrics, timed
+from hot_reload import CatalogWatcher
+
+CATALOG_FILES = ("planets.json", "moons.json")
+SNAPSHOT_FILE = "system_snapshot.pickle"
+# The formats ephemeris_export.FORMATS can write, repeated so that parsing the command
+# line doesn't import NumPy
+EXPORT_FORMATS = ("binary", "csv")
+# The classes a snapshot pickles, whose attributes are part of the snapshot format
+SNAPSHOT_CLASSES = (Star, Planet, Moon, SortedIndex, TrigramIndex, SubtreeTotals)
 
 # ------------------- Helper Functions ----------------
 
 
+@timed("load_json_data")
 def load_json_data(filename: str) -> Any:
     """
     Load data from a JSON file.
@@ -67,18 +84,21 @@ def load_json_data(filename: str) -> Any:
 # ------------------- Solar System Creation ----------------
 
 
-def create_planets(star: Star) -> None:
+@timed("create_planets")
+def create_planets(star: Star, filename: str = "planets.json") -> None:
     """
-    Create planet objects from JSON data and add them to the solar system.
+    Create planet objects from JSON data and add them to the solar system. The planet
+    records are streamed from the file one at a time, so only the planets themselves are
+    held in memory.
 
     Args:
         star (Star): The star object representing the solar system.
+        filename (str): The path to the planets JSON file. Defaults to "planets.json".
     """
     try:
-        filename = "planets.json"
-        planet_data = load_json_data(filename)
-        planets = [Planet(star, name=item["name"], mass=item["mass"], distance=item["distance"],
-                        rotational=item['rotational'], f1=item["fact1"], f2=item["fact2"],) for item in planet_data]
+        planets = (Planet(star, name=item["name"], mass=item["mass"], distance=item["distance"],
+                          rotational=item['rotational'], f1=item["fact1"], f2=item["fact2"],)
+                   for item in iter_json_array(filename))
         star.add_orbiting_objects(planets)
     except (KeyError, TypeError) as e:
         logging.error(f"Error in {filename} data structure: {e}")
@@ -88,20 +108,29 @@ def create_planets(star: Star) -> None:
         raise
                  
 
-def create_moons(star: Star) -> None:
+@timed("create_moons")
+def create_moons(star: Star, filename: str = "moons.json", lazy: bool = False) -> None:
     """
     Create moon objects from JSON data and associate them with their respective planets.
+    Each planet's list of moon names is streamed from the file in turn.
 
     Args:
         star (Star): The star object representing the solar system.
+        filename (str): The path to the moons JSON file. Defaults to "moons.json".
+        lazy (bool): Only record each planet's moon names, creating the Moon objects the
+            first time that planet's moons are needed. Defaults to False.
     """
     try:
-        filename = "moons.json"
-        moon_data = load_json_data(filename)
-        for planet in star.get_orbiting_objects():
-                moon_names = moon_data.get(planet.get_name(), [])
-                planet.add_orbiting_objects([Moon(name, planet)
-                                        for name in moon_names])
+        for planet_name, moon_names in iter_json_object(filename):
+            planet = star.get_planet(planet_name)
+            if planet is None:
+                continue
+            if lazy:
+                if not all(isinstance(name, str) for name in moon_names):
+                    raise TypeError(f"moon names for {planet_name} must be strings")
+                planet.defer_orbiting_objects(moon_names, Moon)
+            else:
+                planet.add_orbiting_objects(Moon(name, planet) for name in moon_names)
     except (KeyError, TypeError) as e:
         logging.error(f"Error in {filename} data structure: {e}")
         raise ValueError(f"Invalid moon in data structure in {filename}")
@@ -109,42 +138,567 @@ def create_moons(star: Star) -> None:
         logging.error(f"Failed to create moons {e}")
         raise
 
-def create_system(star_name: str) -> Star:
+def create_system(star_name: str, planets_file: str = "planets.json", moons_file: str = "moons.json",
+                  lazy_moons: bool = False) -> Star:
     """
     Instantiate the star, planets, and moons for the solar system.
 
     Args:
         star_name (str): The name of the star in the solar system.
+        planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+        moons_file (str): The path to the moons JSON file. Defaults to "moons.json".
+        lazy_moons (bool): Create each planet's moons on first access. Defaults to False.
 
     Returns:
         Star: The star object representing the solar system.
     """
 
     star = Star(name=star_name)
-    create_planets(star)
-    create_moons(star)
+    create_planets(star, planets_file)
+    create_moons(star, moons_file, lazy_moons)
+    return star
+
+def create_columnar_system(star_name: str, planets_file: str = "planets.json", moons_file: str = "moons.json") -> StarView:
+    """
+    Build the solar system into a columnar BodyStore instead of one object per body. The
+    star, planets and moons returned are lightweight views with the same getters.
+
+    Args:
+        star_name (str): The name of the star in the solar system.
+        planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+        moons_file (str): The path to the moons JSON file. Defaults to "moons.json".
+
+    Returns:
+        StarView: A view of the star representing the solar system.
+    """
+    try:
+        store = BodyStore.from_records(star_name, iter_json_array(planets_file), iter_json_object(moons_file))
+    except (KeyError, TypeError) as e:
+        logging.error(f"Error in {planets_file} or {moons_file} data structure: {e}")
+        raise ValueError(f"Invalid body in data structure in {planets_file} or {moons_file}")
+    except Exception as e:
+        logging.error(f"Failed to create columnar system {e}")
+        raise
+    return store.get_root()
+
+
+def convert_to_binary_catalog(output_file: str, star_name: str, planets_file: str = "planets.json",
+                              moons_file: str = "moons.json") -> None:
+    """
+    Convert the JSON planet and moon files into a memory-mappable binary catalog.
+
+    Args:
+        output_file (str): The path of the binary catalog to write.
+        star_name (str): The name of the star in the solar system.
+        planets_file (str): The path to the planets JSON file. Defaults to "planets.json".
+        moons_file (str): The path to the moons JSON file. Defaults to "moons.json".
+    """
+    start = time.perf_counter()
+    store = create_columnar_system(star_name, planets_file, moons_file).store
+    write_binary_catalog(store, output_file)
+    logging.info(f"Converted {len(store)} bodies to binary catalog '{output_file}' in {time.perf_counter() - start:.3f}s")
+
+
+# ------------------- Multi-Star Catalogs ----------------
+
+
+def find_star_folders(catalog_dir: str) -> list:
+    """
+    Find the star system folders in a catalog directory. Each folder is named after its
+    star and holds that system's planets.json and moons.json.
+
+    Args:
+        catalog_dir (str): The catalog directory.
+
+    Returns:
+        list: The paths of the star system folders, sorted by name.
+    """
+    folders = []
+    for entry in sorted(os.scandir(catalog_dir), key=lambda entry: entry.name):
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, CATALOG_FILES[0])):
+            folders.append(entry.path)
+    return folders
+
+
+def load_star_system(folder: str, lazy_moons: bool = False) -> Star:
+    """
+    Build the star system held in one catalog folder. This runs in the worker processes
+    of create_catalog, so it must stay a module-level function.
+
+    Args:
+        folder (str): The star system folder, named after its star.
+        lazy_moons (bool): Create each planet's moons on first access. Defaults to False.
+
+    Returns:
+        Star: The star object representing the star system.
+    """
+    planets_file, moons_file = (os.path.join(folder, filename) for filename in CATALOG_FILES)
+    if not os.path.exists(moons_file):
+        star = Star(name=os.path.basename(folder))
+        create_planets(star, planets_file)
+        return star
+    return create_system(os.path.basename(folder), planets_file, moons_file, lazy_moons)
+
+
+def load_star_store(folder: str, lazy_moons: bool = False) -> BodyStore:
+    """
+    Build the star system held in one catalog folder into a columnar BodyStore. A store
+    is a handful of arrays, so it is far cheaper to send back from a worker process than
+    a tree of objects.
+
+    Args:
+        folder (str): The star system folder, named after its star.
+        lazy_moons (bool): Ignored, since a store has no moon objects to defer.
+
+    Returns:
+        BodyStore: The store holding the star system.
+    """
+    planets_file, moons_file = (os.path.join(folder, filename) for filename in CATALOG_FILES)
+    if not os.path.exists(moons_file):
+        return BodyStore.from_records(os.path.basename(folder), iter_json_array(planets_file), [])
+    return create_columnar_system(os.path.basename(folder), planets_file, moons_file).store
+
+
+def create_catalog(catalog_dir: str, workers: int | None = None, chunk_size: int = 1,
+                   lazy_moons: bool = False, name: str = "Catalog", columnar: bool = False) -> Galaxy:
+    """
+    Build every star system in a catalog directory on a pool of worker processes and
+    combine them into one galaxy.
+
+    Each star system built as objects has to be pickled back from its worker, which costs
+    about as much as building it, so only the columnar mode gains much from extra workers.
+
+    Args:
+        catalog_dir (str): The catalog directory, holding one folder per star system.
+        workers (int, optional): The number of worker processes. Defaults to one per CPU;
+            1 builds every system in this process.
+        chunk_size (int): The number of star systems sent to a worker at a time. Defaults to 1.
+        lazy_moons (bool): Create each planet's moons on first access. Defaults to False.
+        name (str): The name of the galaxy. Defaults to "Catalog".
+        columnar (bool): Build each star system into a BodyStore and add views of the stars
+            to the galaxy. Defaults to False.
+
+    Returns:
+        Galaxy: The galaxy holding every star system.
+    """
+    folders = find_star_folders(catalog_dir)
+    loader = load_star_store if columnar else load_star_system
+    start = time.perf_counter()
+
+    if workers == 1 or len(folders) < 2:
+        systems = [loader(folder, lazy_moons) for folder in folders]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            systems = list(pool.map(loader, folders, repeat(lazy_moons), chunksize=chunk_size))
+
+    galaxy = Galaxy(name=name)
+    if columnar:
+        stars = [store.get_root() for store in systems]
+    else:
+        stars = systems
+        for star in stars:
+            star.primary = galaxy
+    galaxy.add_orbiting_objects(stars)
+    logging.info(f"Loaded {len(stars)} star systems from '{catalog_dir}' in {time.perf_counter() - start:.3f}s "
+                 f"using {workers or os.cpu_count()} worker(s)")
+    return galaxy
+
+
+# ------------------- System Snapshot ----------------
+
+
+def catalog_fingerprint(filenames: Iterable[str] = CATALOG_FILES) -> list:
+    """
+    Describe the catalog files by size, modification time and content hash, so a snapshot
+    built from them can tell whether they have changed.
+
+    Args:
+        filenames (Iterable[str]): The catalog files. Defaults to the planet and moon files.
+
+    Returns:
+        list: A (filename, size, mtime, sha256) tuple for each file.
+    """
+    fingerprint = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        # Hashed a block at a time, so a large catalog is never held in memory whole
+        with open(filename, "rb") as file:
+            digest = hashlib.file_digest(file, "sha256").hexdigest()
+        fingerprint.append((filename, stat.st_size, stat.st_mtime_ns, digest))
+    return fingerprint
+
+
+def class_attributes(cls: type) -> tuple:
+    """
+    Returns the attributes an instance of a pickled class holds: the fields of a named
+    tuple, or the slots of the class and its bases.
+
+    Args:
+        cls (type): The class.
+
+    Returns:
+        tuple: The attribute names, base classes' first.
+    """
+    return getattr(cls, "_fields", None) or tuple(
+        slot for base in reversed(cls.__mro__) for slot in base.__dict__.get("__slots__", ()))
+
+
+def snapshot_format() -> tuple:
+    """
+    Describe how a snapshot's objects are laid out: the Python version, the pickle protocol
+    and the module, name and attributes of each class pickled. A snapshot saved before any
+    of them changed is rebuilt rather than loaded with missing or misplaced attributes.
+
+    Returns:
+        tuple: The Python version, pickle protocol and a (module, name, attributes) tuple per class.
+    """
+    layouts = tuple((cls.__module__, cls.__qualname__, class_attributes(cls)) for cls in SNAPSHOT_CLASSES)
+    return sys.version_info[:2], pickle.HIGHEST_PROTOCOL, layouts
+
+
+def save_snapshot(star: Star, key: dict, filename: str = SNAPSHOT_FILE) -> None:
+    """
+    Save the built star tree to a binary snapshot file. The file is written to a temporary
+    name first and then moved into place, so a half-written snapshot is never read.
+
+    Args:
+        star (Star): The star object representing the solar system.
+        key (dict): The star name and catalog fingerprint the snapshot was built from.
+        filename (str): The path of the snapshot file. Defaults to SNAPSHOT_FILE.
+    """
+    temp_filename = f"{filename}.tmp"
+    try:
+        with open(temp_filename, "wb") as file:
+            pickle.dump({"format": snapshot_format(), "key": key, "star": star}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, filename)
+    except Exception as e:
+        logging.warning(f"Could not save the solar system snapshot '{filename}': {e}")
+
+
+def load_snapshot(key: dict, filename: str = SNAPSHOT_FILE) -> Star | None:
+    """
+    Load the star tree from a binary snapshot file if it was built from the same catalog
+    with the same snapshot format. Anything else, including a star missing one of its
+    attributes, is treated as stale so the system is rebuilt.
+
+    Args:
+        key (dict): The star name and catalog fingerprint the snapshot must match.
+        filename (str): The path of the snapshot file. Defaults to SNAPSHOT_FILE.
+
+    Returns:
+        Star | None: The star object, or None if there is no valid snapshot.
+    """
+    try:
+        with open(filename, "rb") as file:
+            snapshot = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable solar system snapshot '{filename}': {e}")
+        return None
+
+    star = snapshot.get("star") if isinstance(snapshot, dict) else None
+    if (not isinstance(star, Star) or snapshot.get("format") != snapshot_format() or snapshot.get("key") != key
+            or not all(hasattr(star, attribute) for attribute in class_attributes(Star))):
+        logging.info(f"Solar system snapshot '{filename}' is stale")
+        return None
+    return star
+
+
+def load_system(star_name: str, snapshot_file: str | None = SNAPSHOT_FILE, lazy_moons: bool = False) -> Star:
+    """
+    Load the solar system from its snapshot if the catalog files haven't changed since it
+    was saved, otherwise build it from the catalog files and save a fresh snapshot.
+
+    Args:
+        star_name (str): The name of the star in the solar system.
+        snapshot_file (str, optional): The path of the snapshot file, or None to always
+            build from the catalog files. Defaults to SNAPSHOT_FILE.
+        lazy_moons (bool): Create each planet's moons on first access. Defaults to False.
+
+    Returns:
+        Star: The star object representing the solar system.
+    """
+    start = time.perf_counter()
+    if snapshot_file is None:
+        star = create_system(star_name, lazy_moons=lazy_moons)
+        logging.info(f"Built solar system from the catalog files in {time.perf_counter() - start:.3f}s")
+        return star
+
+    key = {"star_name": star_name, "lazy_moons": lazy_moons, "catalog": catalog_fingerprint()}
+    star = load_snapshot(key, snapshot_file)
+    if star is not None:
+        logging.info(f"Loaded solar system from snapshot '{snapshot_file}' in {time.perf_counter() - start:.3f}s")
+        return star
+
+    star = create_system(star_name, lazy_moons=lazy_moons)
+    built = time.perf_counter()
+    save_snapshot(star, key, snapshot_file)
+    logging.info(f"Built solar system from the catalog files in {built - start:.3f}s "
+                 f"and saved snapshot '{snapshot_file}' in {time.perf_counter() - built:.3f}s")
     return star
 
+
+# ------------------- Batch Queries ----------------
+
+
+def run_batch(star: Star, questions: Iterable[str], output: TextIO, chunk_size: int = 1000,
+              cache_size: int = 1024, catalog_folder: str = os.curdir) -> int:
+    """
+    Answer free text questions without the GUI, writing one JSON answer per line (NDJSON).
+    Questions are read and answered in chunks so memory use stays bounded however many
+    questions there are. A question that can't be answered gets an "error" answer and the
+    batch carries on.
+
+    Args:
+        star (Star): The star object representing the solar system.
+        questions (Iterable[str]): The questions, one per line.
+        output (TextIO): The stream the answers are written to.
+        chunk_size (int): The number of questions answered per chunk. Defaults to 1000.
+        cache_size (int): The most questions and answers cached; 0 disables caching. Defaults to 1024.
+        catalog_folder (str): The folder the system was loaded from. Defaults to the current directory.
+
+    Returns:
+        int: The number of questions answered.
+    """
+    engine = QueryEngine(star, cache_size, catalog_folder)
+    lines = (line.rstrip("\r\n") for line in questions)
+    total = 0
+    start = time.perf_counter()
+
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+        output.write("".join(json.dumps(engine.answer_safely(question)) + "\n" for question in chunk))
+        output.flush()
+        total += len(chunk)
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    logging.info(f"Answered {total} questions in {elapsed:.3f}s ({rate:.0f} questions/s)")
+    logging.info(f"Answer cache: {engine.get_cache_stats()}")
+    return total
+
+
+# ------------------- Ephemeris Export ----------------
+
+
+def run_export(star: Star, path: str, start: float, stop: float, steps: int, file_format: str | None = None,
+               time_chunk: int = 16, body_chunk: int = 100_000, workers: int = 1,
+               catalog_folder: str = os.curdir) -> dict:
+    """
+    Write the position of every body in the system at evenly spaced times to a file,
+    streaming it a chunk of times and bodies at a time.
+
+    Args:
+        star (Star): The star object representing the solar system.
+        path (str): The path of the output file.
+        start (float): The first time, in days.
+        stop (float): The last time, in days.
+        steps (int): The number of times.
+        file_format (str, optional): "binary" or "csv". Defaults to csv for a .csv path,
+            otherwise binary.
+        time_chunk (int): The most times computed per chunk. Defaults to 16.
+        body_chunk (int): The most bodies computed per chunk. Defaults to 100000.
+        workers (int): The number of worker processes; 0 uses one per CPU. Defaults to 1.
+        catalog_folder (str): The folder the system was loaded from, where its orbits are
+            read from. Defaults to the current directory.
+
+    Returns:
+        dict: The number of positions written, the seconds taken and the positions per second.
+    """
+    # Imported here, like the GUI, so that only exports and proximity questions load NumPy
+    from ephemeris import Ephemeris, load_catalog_elements, np
+    from ephemeris_export import export_positions
+
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "binary")
+    ephemeris = Ephemeris.from_star(star, load_catalog_elements(catalog_folder))
+    return export_positions(ephemeris, np.linspace(start, stop, steps), path, file_format, time_chunk, body_chunk,
+                            workers)
+
+
 # ------------------- Main ----------------
 
 
-def main() -> None:
+def parse_args(argv: list | None = None) -> argparse.Namespace:
     """
-    Initialize the solar system and run the application menu.
-    
+    Parse the command line arguments.
+
+    Args:
+        argv (list, optional): The arguments to parse. Defaults to the program's arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
     """
-    
+    parser = argparse.ArgumentParser(description="Explore a model of the solar system.")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always build the solar system from the catalog files instead of the snapshot")
+    parser.add_argument("--catalog-dir", metavar="DIR",
+                        help="load every star system in DIR (one folder per star) instead of planets.json/moons.json")
+    parser.add_argument("--star", default="Sol",
+                        help="the star system to explore from --catalog-dir (default: Sol, or the first star)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes used to load --catalog-dir (default: one per CPU)")
+    parser.add_argument("--load-chunk-size", type=int, default=1,
+                        help="number of star systems sent to each loading process at a time (default: 1)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="build each --catalog-dir star system into a columnar store")
+    parser.add_argument("--binary-catalog", metavar="FILE",
+                        help="explore the memory-mapped binary catalog FILE instead of the JSON files")
+    parser.add_argument("--convert-binary", metavar="FILE",
+                        help="convert planets.json and moons.json into the binary catalog FILE and exit")
+    parser.add_argument("--lazy-moons", action="store_true",
+                        help="create each planet's moons the first time they are needed")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer the questions in FILE (one per line, '-' for stdin) without the GUI")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write batch answers as NDJSON to FILE instead of stdout")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="number of batch questions answered per chunk (default: 1000)")
+    parser.add_argument("--serve", metavar="HOST:PORT", nargs="?", const="127.0.0.1:8765",
+                        help="answer questions for socket clients on HOST:PORT without the GUI (default: 127.0.0.1:8765)")
+    parser.add_argument("--serve-unix", metavar="PATH",
+                        help="answer questions for socket clients on the Unix socket PATH without the GUI")
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="number of questions queued per server client before reading pauses (default: 64)")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="number of recent questions and answers cached by --batch and --serve (default: 1024, 0 disables)")
+    parser.add_argument("--export-positions", metavar="FILE",
+                        help="write every body's position at --steps times from --start to --stop days to FILE and exit")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS,
+                        help="the --export-positions file format (default: csv for a .csv FILE, otherwise binary .npy)")
+    parser.add_argument("--start", type=float, default=0.0, help="the first exported time in days (default: 0)")
+    parser.add_argument("--stop", type=float, default=365.0, help="the last exported time in days (default: 365)")
+    parser.add_argument("--steps", type=int, default=366, help="the number of exported times (default: 366)")
+    parser.add_argument("--time-chunk", type=int, default=16,
+                        help="number of times computed per export chunk (default: 16)")
+    parser.add_argument("--body-chunk", type=int, default=100_000,
+                        help="number of bodies computed per export chunk (default: 100000)")
+    parser.add_argument("--export-workers", type=int, default=1,
+                        help="number of processes computing export chunks; 0 uses one per CPU (default: 1)")
+    parser.add_argument("--reload", action="store_true",
+                        help="apply changes to planets.json and moons.json to the GUI or --serve while it runs")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record timings and counters of loading and answering, and log them periodically")
+    parser.add_argument("--metrics-interval", type=float, default=60.0,
+                        help="seconds between --metrics reports (default: 60)")
+    parser.add_argument("--metrics-dump", metavar="FILE",
+                        help="also write the --metrics in the Prometheus text format to FILE at each report")
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    """
+    Initialize the solar system and run the application menu, or answer a batch of questions.
+
+    Args:
+        argv (list, optional): The command line arguments. Defaults to the program's arguments.
+    """
+    args = parse_args(argv)
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+    reporter = None
+    if args.metrics or args.metrics_dump:
+        metrics.enable()
+        reporter = MetricsReporter(args.metrics_interval, args.metrics_dump)
+    try:
+        run_app(args)
+    finally:
+        if reporter is not None:
+            reporter.stop()
+
+
+def get_catalog_folder(args: argparse.Namespace, star: Star) -> str:
+    """
+    Return the folder the system was loaded from, where files that go with the catalog,
+    such as orbits.json, are read from.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        star (Star): The star object representing the loaded solar system.
+
+    Returns:
+        str: The star's folder in --catalog-dir, the binary catalog's folder, or the
+            current directory.
+    """
+    if args.binary_catalog:
+        return os.path.dirname(os.path.abspath(args.binary_catalog))
+    if args.catalog_dir:
+        return os.path.join(args.catalog_dir, star.get_name())
+    return os.curdir
+
+
+def run_app(args: argparse.Namespace) -> None:
+    """
+    Load the solar system and run what the command line asked for: a conversion, a batch,
+    an export, the query server or the application menu.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
     try:
-        star_name = "Sol"
-        star = create_system(star_name)
+        if args.convert_binary:
+            convert_to_binary_catalog(args.convert_binary, "Sol")
+            return
+        if args.binary_catalog:
+            start = time.perf_counter()
+            star = open_binary_catalog(args.binary_catalog).get_root()
+            logging.info(f"Opened binary catalog '{args.binary_catalog}' in {time.perf_counter() - start:.3f}s")
+        elif args.catalog_dir:
+            galaxy = create_catalog(args.catalog_dir, args.workers, args.load_chunk_size, args.lazy_moons,
+                                    columnar=args.columnar)
+            star = galaxy.get_star(args.star) or next(iter(galaxy.get_orbiting_objects()))
+        else:
+            star_name = "Sol"
+            star = load_system(star_name, None if args.no_snapshot else SNAPSHOT_FILE, args.lazy_moons)
         logging.info("Solar system created successfully")
+        catalog_folder = get_catalog_folder(args, star)
     except Exception as e:
         logging.critical(f"Critical error creating solar system {e}")
         sys.exit(1)
-        
-    app = SystemMenu(star)
+
+    watcher = None
+    if args.reload:
+        if args.binary_catalog or args.catalog_dir:
+            logging.warning("--reload only watches planets.json and moons.json, so it is ignored")
+        else:
+            watcher = CatalogWatcher(star, *CATALOG_FILES, lazy_moons=args.lazy_moons)
+
+    if args.batch:
+        questions = sys.stdin if args.batch == "-" else open(args.batch, "r")
+        output = open(args.output, "w") if args.output else sys.stdout
+        try:
+            run_batch(star, questions, output, args.chunk_size, args.cache_size, catalog_folder)
+        finally:
+            if questions is not sys.stdin:
+                questions.close()
+            if output is not sys.stdout:
+                output.close()
+        return
+
+    if args.export_positions:
+        run_export(star, args.export_positions, args.start, args.stop, args.steps, args.export_format,
+                   args.time_chunk, args.body_chunk, args.export_workers, catalog_folder)
+        return
+
+    if args.serve or args.serve_unix:
+        # The server and the GUI are imported only when they are started, so that headless
+        # uses of this module don't pay for asyncio or tkinter
+        import asyncio
+        from query_server import serve
+
+        host, _, port = (args.serve or "").rpartition(":")
+        try:
+            asyncio.run(serve(star, host or "127.0.0.1", int(port or 8765), args.serve_unix, args.max_pending,
+                              cache_size=args.cache_size, watcher=watcher, catalog_folder=catalog_folder))
+        except KeyboardInterrupt:
+            logging.info("Query server stopped")
+        return
+
+    from system_menu import SystemMenu
+
+    app = SystemMenu(star, watcher, catalog_folder=catalog_folder)
     app.run()
 
         
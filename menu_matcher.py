@@ -0,0 +1,456 @@
+import math
+import re
+from collections import deque
+from datetime import date
+from typing import NamedTuple
+
+
+MENU_CHOICES = {
+    # Listed first so its keywords win over the "how many", "mass" and "everything" they contain
+    11: ["count everything", "how many bodies", "how many objects", "number of bodies", "total mass", "summary"],
+    1: ["tell me about", "details about", "planet details", "planet info", "display planet", "show planet"],
+    2: ["mass", "weight", "heavy", "weigh"],
+    3: ["check planet", "in the list", "exists", "exist", "list of planets", "in list", "a planet"],
+    4: ["moons", "how many", "how many moons", "planet's moons", "number of moons", "show number"],
+    5: ["show all", "all information", "all info", "everything", "complete system", "solar system"],
+    6: ["exit", "quit", "leave", "close", "bye"],
+}
+
+
+class PhraseAutomaton:
+    """
+    A class to find every occurrence of many phrases in a piece of text in one pass, with
+    the Aho-Corasick algorithm, so the time taken depends on the length of the text and not
+    on the number of phrases.
+
+    The phrases are stored in a trie of character transitions. Each state also has a
+    failure link to the state for the longest suffix of its text that is a prefix of some
+    phrase, and the phrases ending at that state or at any state along its failure links.
+
+    Attributes:
+        transitions (list): Maps each state to a dictionary of next states by character.
+        failures (list): The failure link of each state.
+        outputs (list): The phrases that end at each state.
+
+    Methods:
+        add(phrase): Adds a phrase to find.
+        build(): Links the states once every phrase has been added.
+        find(text): Returns the set of phrases found in a text.
+    """
+
+    __slots__ = ("transitions", "failures", "outputs")
+
+    def __init__(self, phrases=()) -> None:
+        """
+        Initializes the PhraseAutomaton and builds it from the phrases given.
+
+        Args:
+            phrases (Iterable): The phrases to find. Defaults to none.
+        """
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [()]
+        for phrase in phrases:
+            self.add(phrase)
+        self.build()
+
+    def add(self, phrase: str) -> None:
+        """
+        Adds a phrase to find. build() must be called again before find().
+
+        Args:
+            phrase (str): The phrase; empty phrases are ignored.
+        """
+        if not phrase:
+            return
+        state = 0
+        for character in phrase:
+            following = self.transitions[state].get(character)
+            if following is None:
+                following = self.transitions[state][character] = len(self.transitions)
+                self.transitions.append({})
+                self.failures.append(0)
+                self.outputs.append(())
+            state = following
+        self.outputs[state] = (phrase,)
+
+    def build(self) -> None:
+        """
+        Sets each state's failure link and the phrases ending there, level by level.
+        """
+        queue = deque(self.transitions[0].values())
+        for state in queue:
+            self.failures[state] = 0
+        while queue:
+            state = queue.popleft()
+            for character, following in self.transitions[state].items():
+                failure = self.failures[state]
+                while failure and character not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                link = self.transitions[failure].get(character, 0)
+                self.failures[following] = link if link != following else 0
+                self.outputs[following] = self.outputs[following][:1] + self.outputs[self.failures[following]]
+                queue.append(following)
+
+    def find(self, text: str) -> set:
+        """
+        Returns the phrases found anywhere in a text.
+
+        Args:
+            text (str): The text to search.
+
+        Returns:
+            set: The phrases found.
+        """
+        transitions, failures, outputs = self.transitions, self.failures, self.outputs
+        found = set()
+        state = 0
+        for character in text:
+            while state and character not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(character, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class MenuMatcher:
+    """
+    A class to match free text against the menu keywords and planet names in a single pass.
+
+    The keywords and planet names are put in one PhraseAutomaton when the matcher is
+    created, so a question is scanned once however many planets there are, and each phrase
+    found is looked up in a dictionary of priorities. As in a plain substring search, a
+    phrase matches anywhere in the input, including inside a longer word.
+
+    Attributes:
+        keyword_ranks (dict): Maps each lower-case keyword to its (priority, menu choice).
+        planet_ranks (dict): Maps each lower-case planet name to its (priority, planet name).
+        automaton (PhraseAutomaton): Finds the keywords and planet names in the input.
+
+    Methods:
+        match(user_input): Returns the menu choice and planet choice for the user's input.
+    """
+
+    def __init__(self, planet_names, choices=None) -> None:
+        """
+        Initializes the MenuMatcher and builds its automaton.
+
+        Args:
+            planet_names (list): The planet names, in the order they should be preferred.
+            choices (dict, optional): The menu choices mapped to their keywords, in the order
+                they should be preferred. Defaults to MENU_CHOICES.
+        """
+        choices = MENU_CHOICES if choices is None else choices
+
+        self.keyword_ranks = {}
+        for rank, (choice, keywords) in enumerate(choices.items()):
+            for keyword in keywords:
+                self.keyword_ranks.setdefault(keyword.lower(), (rank, choice))
+
+        self.planet_ranks = {}
+        for rank, name in enumerate(planet_names):
+            if name:
+                self.planet_ranks.setdefault(name.lower(), (rank, name))
+
+        self.automaton = PhraseAutomaton([*self.keyword_ranks, *self.planet_ranks])
+
+    def match(self, user_input: str) -> tuple:
+        """
+        Returns the menu choice and planet choice for the user's input.
+
+        Args:
+            user_input (str): The user's input string.
+
+        Returns:
+            tuple: The menu choice and planet name, or (None, None) if no menu choice matches.
+        """
+        user_input = user_input.lower()
+        found = self.automaton.find(user_input)
+        best_keyword = min((self.keyword_ranks[phrase] for phrase in found if phrase in self.keyword_ranks),
+                           default=None)
+        best_planet = min((self.planet_ranks[phrase] for phrase in found if phrase in self.planet_ranks),
+                          default=None)
+        planet_choice = best_planet[1] if best_planet else None
+
+        # Determine if a single word is entered by the user that is the name of a planet
+        if len(user_input.split()) < 2 and planet_choice is not None:
+            return 1, planet_choice  # Default to the menu choice showing the information related to that planet only
+
+        if best_keyword is not None:
+            return best_keyword[1], planet_choice
+        return None, None
+
+
+COUNT_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+               "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+# Times further than this many days from the epoch are not understood
+MAX_EPOCH_DAYS = 10_000_000
+# Counts longer than this are not understood, which also keeps int() off huge digit strings
+MAX_COUNT_DIGITS = 6
+
+# Superlatives ask for the top bodies: (words, attribute, largest first)
+SUPERLATIVES = [
+    ("heaviest|most massive|biggest|largest", "mass", True),
+    ("lightest|least massive|smallest", "mass", False),
+    ("furthest|farthest|most distant|outermost", "distance", True),
+    ("closest|nearest|innermost", "distance", False),
+    ("fastest", "rotational", True),
+    ("slowest", "rotational", False),
+]
+
+# Comparatives followed by "than <number>" ask for a range: (words, attribute, bound)
+COMPARATIVES = [
+    ("heavier|more massive|bigger|larger", "mass", "low"),
+    ("lighter|less massive|smaller", "mass", "high"),
+    ("further|farther|more distant", "distance", "low"),
+    ("closer|nearer", "distance", "high"),
+    ("faster", "rotational", "low"),
+    ("slower", "rotational", "high"),
+]
+
+# Words that say which attribute a plain "more than" or "between" question is about
+ATTRIBUTE_WORDS = [
+    ("mass|massive|heav|weigh", "mass"),
+    ("distan|far |away|from the sun", "distance"),
+    ("rotat|spin", "rotational"),
+]
+
+
+def parse_count(count: str | None) -> int | None:
+    """
+    Returns the number of results asked for, given as digits or a word.
+
+    Args:
+        count (str, optional): The count matched in the question, or None if there was none.
+
+    Returns:
+        int | None: The count, 1 if none was given, or None if it has too many digits.
+    """
+    if not count:
+        return 1
+    if count in COUNT_WORDS:
+        return COUNT_WORDS[count]
+    return int(count) if len(count) <= MAX_COUNT_DIGITS else None
+
+
+class RankingQuery(NamedTuple):
+    """
+    A question about the bodies with the largest or smallest values of an attribute, or
+    with values in a range.
+
+    Attributes:
+        attribute (str): "mass", "distance" or "rotational".
+        kind (str): "planet" or "moon".
+        count (int | None): The number of bodies wanted, or None for a range question.
+        largest (bool): True for the largest values first, False for the smallest.
+        low (float | None): The smallest value wanted in a range, if any.
+        high (float | None): The largest value wanted in a range, if any.
+    """
+
+    attribute: str
+    kind: str
+    count: int | None
+    largest: bool
+    low: float | None
+    high: float | None
+
+
+class ProximityQuery(NamedTuple):
+    """
+    A question about the bodies nearest another body, or within a distance of it, at a time.
+
+    Attributes:
+        body (str): The name of the body the question is about, as typed.
+        count (int | None): The number of nearest bodies wanted, or None for a distance question.
+        radius (float | None): The distance in million km, or None for a nearest question.
+        epoch (float | None): The time, in days since the ephemeris epoch, or None if the
+            time given isn't a valid date or day.
+        when (str): The time as it should be described in the answer, or as it was typed
+            if it isn't valid.
+    """
+
+    body: str
+    count: int | None
+    radius: float | None
+    epoch: float | None
+    when: str
+
+
+class ProximityMatcher:
+    """
+    A class to recognise free text questions such as "which body is closest to Mars on
+    2024-03-01", "three nearest bodies to Earth" or "everything within 50 million km of
+    Jupiter on day 100".
+
+    Attributes:
+        nearest_pattern (re.Pattern): Matches an optional count, "closest to" and a body.
+        within_pattern (re.Pattern): Matches "within <number> million km of" and a body.
+        when_pattern (re.Pattern): Matches "on day <number>" or "on <date>".
+
+    Methods:
+        parse_when(user_input): Returns the time a question is asked about.
+        match(user_input): Returns the proximity question asked, or None.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the ProximityMatcher and compiles its patterns.
+        """
+        counts = "|".join(COUNT_WORDS)
+        body = r"(?P<body>[a-z][\w'/-]*(?:\s+[\w'/-]+)*?)"
+        end = r"(?=\s+(?:on|at)\s|\s*[?.!]*\s*$)"
+        self.nearest_pattern = re.compile(
+            rf"(?:\b(?P<count>\d+|{counts})\s+)?(?:\w+\s+)?\b(?:closest|nearest)\s+(?:\w+\s+)?to\s+{body}{end}")
+        self.within_pattern = re.compile(rf"\bwithin\s+{NUMBER}\s*(?:million\s+km|mkm)?\s+of\s+{body}{end}")
+        # The whole word after "day" or the date is taken, so "day 1e5" isn't read as day 1
+        self.when_pattern = re.compile(
+            r"\b(?:on|at)\s+(?:day\s+(?P<day>[^\s?!,]+?)|(?P<date>\d{4}-\d\d-\d\d\S*?))(?=[.?!,]*(?:\s|$))")
+
+    def parse_when(self, user_input: str) -> tuple:
+        """
+        Returns the time a question is asked about: a day number or a YYYY-MM-DD date, or
+        day 0 if it names none. Days must be plain decimal numbers no further than
+        MAX_EPOCH_DAYS from the epoch.
+
+        Args:
+            user_input (str): The lowercased question.
+
+        Returns:
+            tuple: The days since the epoch, or None if the time isn't valid, and the time
+                as it should be described in the answer.
+        """
+        found = self.when_pattern.search(user_input)
+        if found is None:
+            return 0.0, "day 0"
+        if found.group("day"):
+            day = found.group("day")
+            if re.fullmatch(r"-?\d+(?:\.\d+)?", day):
+                epoch = float(day)
+                if math.isfinite(epoch) and abs(epoch) <= MAX_EPOCH_DAYS:
+                    return epoch, f"day {day}"
+            return None, f"day {day}"
+        # Imported here so that only questions giving a date load the ephemeris and NumPy
+        from ephemeris import days_since_epoch
+
+        try:
+            return days_since_epoch(date.fromisoformat(found.group("date"))), found.group("date")
+        except ValueError:
+            return None, found.group("date")
+
+    def match(self, user_input: str) -> ProximityQuery | None:
+        """
+        Returns the proximity question asked in the user's input.
+
+        Args:
+            user_input (str): The user's input string.
+
+        Returns:
+            ProximityQuery | None: The question, or None if the input isn't a proximity question.
+        """
+        user_input = user_input.lower()
+        found = self.within_pattern.search(user_input)
+        if found:
+            return ProximityQuery(found.group("body"), None, float(found.group(1).replace(",", "")),
+                                  *self.parse_when(user_input))
+        found = self.nearest_pattern.search(user_input)
+        if found is None:
+            return None
+        count = parse_count(found.group("count"))
+        if count is None:
+            return None
+        return ProximityQuery(found.group("body"), count, None, *self.parse_when(user_input))
+
+
+class RankingMatcher:
+    """
+    A class to recognise free text questions such as "heaviest planet", "three fastest
+    rotating planets" or "planets further than 1000 million km".
+
+    Attributes:
+        superlative_pattern (re.Pattern): Matches an optional count and a superlative.
+        comparative_pattern (re.Pattern): Matches a comparative followed by "than <number>".
+        bound_pattern (re.Pattern): Matches "more than", "less than" and "between" with numbers.
+        attribute_pattern (re.Pattern): Matches the words naming each attribute.
+
+    Methods:
+        alternative(found, prefix): Returns which numbered alternative matched.
+        match(user_input): Returns the ranking question asked, or None.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the RankingMatcher and compiles its patterns.
+        """
+        counts = "|".join(COUNT_WORDS)
+        superlatives = "|".join(f"(?P<s{number}>{words})" for number, (words, _, _) in enumerate(SUPERLATIVES))
+        self.superlative_pattern = re.compile(rf"(?:\b(?:top\s+)?(?P<count>\d+|{counts})\s+)?\b(?:{superlatives})")
+        comparatives = "|".join(f"(?P<c{number}>{words})" for number, (words, _, _) in enumerate(COMPARATIVES))
+        self.comparative_pattern = re.compile(rf"\b(?:{comparatives})\s+than\s+{NUMBER}")
+        self.bound_pattern = re.compile(
+            rf"\b(?:(?P<above>more|greater|over|above)|(?P<below>less|under|below))\s+(?:than\s+)?{NUMBER}"
+            rf"|\bbetween\s+{NUMBER}\s+and\s+{NUMBER}")
+        self.attribute_pattern = re.compile(
+            "|".join(f"(?P<a{number}>{words})" for number, (words, _) in enumerate(ATTRIBUTE_WORDS)))
+
+    @staticmethod
+    def alternative(found: re.Match, prefix: str) -> int:
+        """
+        Returns which of a pattern's numbered alternatives matched.
+
+        Args:
+            found (re.Match): The match.
+            prefix (str): The letter the alternatives' group names start with.
+
+        Returns:
+            int: The number of the alternative that matched.
+        """
+        return next(int(name[1:]) for name, value in found.groupdict().items() if name[0] == prefix and value)
+
+    def match(self, user_input: str) -> RankingQuery | None:
+        """
+        Returns the ranking question asked in the user's input.
+
+        Args:
+            user_input (str): The user's input string.
+
+        Returns:
+            RankingQuery | None: The question, or None if the input isn't a ranking question.
+        """
+        user_input = user_input.lower()
+        kind = "moon" if re.search(r"\bmoons?\b", user_input) else "planet"
+
+        attribute = low = high = None
+        for found in self.comparative_pattern.finditer(user_input):
+            _, found_attribute, bound = COMPARATIVES[self.alternative(found, "c")]
+            if attribute not in (None, found_attribute):
+                continue
+            attribute = found_attribute
+            value = float(found.group(found.lastindex).replace(",", ""))
+            low, high = (value, high) if bound == "low" else (low, value)
+
+        if attribute is None:
+            named = self.attribute_pattern.search(user_input)
+            found = self.bound_pattern.search(user_input) if named else None
+            if found:
+                attribute = ATTRIBUTE_WORDS[self.alternative(named, "a")][1]
+                numbers = [float(number.replace(",", "")) for number in found.groups()[2:] if number]
+                if found.group("above"):
+                    low = numbers[0]
+                elif found.group("below"):
+                    high = numbers[0]
+                else:
+                    low, high = sorted(numbers)
+
+        if attribute is not None:
+            return RankingQuery(attribute, kind, None, True, low, high)
+
+        found = self.superlative_pattern.search(user_input)
+        if found is None:
+            return None
+        _, attribute, largest = SUPERLATIVES[self.alternative(found, "s")]
+        count = parse_count(found.group("count"))
+        if count is None:
+            return None
+        return RankingQuery(attribute, kind, count, largest, None, None)
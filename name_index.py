@@ -0,0 +1,202 @@
+from collections import Counter
+from typing import Iterator, NamedTuple
+
+
+class NameMatch(NamedTuple):
+    """
+    A name found by a fuzzy search.
+
+    Attributes:
+        name (str): The name, as it is spelled in the catalog.
+        score (float): The confidence from 0 to 1 that it is the name searched for; 1 is an
+            exact match, ignoring case.
+    """
+
+    name: str
+    score: float
+
+
+class NameResolution(NamedTuple):
+    """
+    The body name a piece of free text was resolved to.
+
+    Attributes:
+        typed (str): The words in the text that were matched.
+        name (str): The name they were resolved to.
+        confidence (float): The confidence from 0 to 1 that the match is right.
+        candidates (tuple): The best matching names, best first.
+    """
+
+    typed: str
+    name: str
+    confidence: float
+    candidates: tuple
+
+
+def trigrams(key: str) -> set:
+    """
+    Returns the three letter sequences in a name, padded so that its start and end are
+    sequences too and short names still have some.
+
+    Args:
+        key (str): The case-folded name.
+
+    Returns:
+        set: The name's trigrams.
+    """
+    padded = f"  {key} "
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+def edit_distance(first: str, second: str, limit: int | None = None) -> int:
+    """
+    Returns the Levenshtein distance between two strings: the number of single character
+    insertions, deletions and substitutions that turn one into the other.
+
+    Args:
+        first (str): The first string.
+        second (str): The second string.
+        limit (int, optional): Stop early once the distance is known to be above this.
+            Defaults to no limit.
+
+    Returns:
+        int: The distance, or a number above limit if it is above limit.
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    if limit is not None and len(first) - len(second) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (first_char != second_char)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def text_spans(text: str, max_words: int = 3) -> Iterator[str]:
+    """
+    Yields every run of up to a few consecutive words in a piece of text, longest first,
+    so that a name can be looked for wherever it appears.
+
+    Args:
+        text (str): The text.
+        max_words (int): The most words in a run. Defaults to 3.
+
+    Yields:
+        str: Each run of words, joined by single spaces.
+    """
+    words = text.split()
+    for length in range(min(max_words, len(words)), 0, -1):
+        for start in range(len(words) - length + 1):
+            yield " ".join(words[start:start + length])
+
+
+class TrigramIndex:
+    """
+    A class to find the names closest to a possibly misspelled name without comparing it
+    to every name.
+
+    Each name is broken into its trigrams, and each trigram maps to the names containing
+    it. A search counts the trigrams each name shares with the query, so only names with
+    something in common are looked at, and only the few sharing the most have their edit
+    distance to the query worked out. Trigrams found in a large share of the names say
+    little about which name is meant, so they are skipped when the query has rarer ones.
+
+    Attributes:
+        names (list): Each name, as it is spelled in the catalog.
+        keys (list): Each name case-folded.
+        ids (dict): Maps each case-folded name to its position in the lists.
+        postings (dict): Maps each trigram to the positions of the names containing it.
+
+    Methods:
+        add(name): Adds a name to the index.
+        search(name, limit, min_score): Returns the names closest to a name.
+    """
+
+    __slots__ = ("names", "keys", "ids", "postings")
+
+    def __init__(self, names=()) -> None:
+        """
+        Initializes the TrigramIndex.
+
+        Args:
+            names (Iterable): The names to index straight away. Defaults to none.
+        """
+        self.names = []
+        self.keys = []
+        self.ids = {}
+        self.postings = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of names in the index.
+
+        Returns:
+            int: The number of names.
+        """
+        return len(self.names)
+
+    def add(self, name: str) -> None:
+        """
+        Adds a name to the index. Names that only differ in case are indexed once.
+
+        Args:
+            name (str): The name.
+        """
+        key = name.strip().casefold()
+        if not key or key in self.ids:
+            return
+        position = self.ids[key] = len(self.names)
+        self.names.append(name)
+        self.keys.append(key)
+        for trigram in trigrams(key):
+            self.postings.setdefault(trigram, []).append(position)
+
+    def search(self, name: str, limit: int = 5, min_score: float = 0.0) -> list:
+        """
+        Returns the names closest to a name, best first. The score is one minus the edit
+        distance divided by the length of the longer name.
+
+        Args:
+            name (str): The name searched for, possibly misspelled.
+            limit (int): The most names to return. Defaults to 5.
+            min_score (float): The lowest score worth returning. Defaults to 0.
+
+        Returns:
+            list: A NameMatch for each name found.
+        """
+        key = name.strip().casefold()
+        if not key or limit <= 0:
+            return []
+
+        position = self.ids.get(key)
+        matches = [NameMatch(self.names[position], 1.0)] if position is not None else []
+        if len(matches) >= limit:
+            return matches
+
+        postings = sorted((self.postings[trigram] for trigram in trigrams(key) if trigram in self.postings), key=len)
+        common = len(self.names) // 10
+        if postings and len(postings[0]) <= common:
+            postings = [posting for posting in postings if len(posting) <= common]
+        shared = Counter()
+        for posting in postings:
+            shared.update(posting)
+
+        scored = []
+        for candidate, _ in shared.most_common(max(4 * limit, 32)):
+            if candidate == position:
+                continue
+            length = max(len(key), len(self.keys[candidate]))
+            limit_distance = int(length * (1.0 - min_score))
+            distance = edit_distance(key, self.keys[candidate], limit_distance)
+            if distance <= limit_distance:
+                scored.append(NameMatch(self.names[candidate], round(1.0 - distance / length, 3)))
+        scored.sort(key=lambda match: -match.score)
+        return (matches + [match for match in scored if match.score >= min_score])[:limit]
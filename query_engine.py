@@ -0,0 +1,691 @@
+import logging
+import os
+import re
+from collections import OrderedDict
+from celestial import Star, Planet, Moon
+from menu_matcher import MENU_CHOICES, MenuMatcher, ProximityMatcher, ProximityQuery, RankingMatcher, RankingQuery
+from name_index import NameResolution, text_spans
+from instrumentation import metrics, timed
+
+
+CHOICE_NAMES = {
+    1: "planet_info",
+    2: "planet_mass",
+    3: "planet_exists",
+    4: "planet_moons",
+    5: "show_all",
+    6: "exit",
+    7: "ranking",
+    8: "range",
+    9: "nearest",
+    10: "within",
+    11: "summary",
+}
+
+RANKING_KINDS = {"planet": Planet, "moon": Moon}
+# The attributes the catalog gives for each kind; moons.json only names the moons
+MEASURED_ATTRIBUTES = {"planet": ("mass", "distance", "rotational"), "moon": ()}
+UNITS = {"mass": "x 10^24 kg", "distance": "million km", "rotational": "m/s"}
+SUPERLATIVE_WORDS = {
+    ("mass", True): "heaviest", ("mass", False): "lightest",
+    ("distance", True): "furthest", ("distance", False): "closest",
+    ("rotational", True): "fastest rotating", ("rotational", False): "slowest rotating",
+}
+COMPARATIVE_WORDS = {
+    ("mass", "low"): "heavier than", ("mass", "high"): "lighter than",
+    ("distance", "low"): "further than", ("distance", "high"): "closer than",
+    ("rotational", "low"): "rotating faster than", ("rotational", "high"): "rotating slower than",
+}
+ATTRIBUTE_NAMES = {"mass": "a mass", "distance": "a distance", "rotational": "a rotational speed"}
+
+# Misspelled names are accepted at this confidence, and suggested at the lower one
+MIN_CONFIDENCE = 0.75
+SUGGEST_CONFIDENCE = 0.5
+NAME_CANDIDATES = 5
+NOT_NAME_PATTERN = re.compile(r"[^\w\s'/-]+")
+# Words that are only taken as a name if they spell one exactly, so that "mass" isn't read as Mars
+FILLER_WORDS = {word for keywords in MENU_CHOICES.values() for keyword in keywords for word in keyword.split()} | {
+    "what", "which", "who", "is", "are", "was", "the", "a", "an", "of", "about", "me", "to", "on", "in", "and",
+    "does", "do", "planet", "planets", "moon", "body", "bodies", "please", "there", "orbit", "orbits", "its"}
+
+
+def planet_details(planet) -> list:
+    """
+    Returns the lines of text describing every detail of a planet.
+
+    Args:
+        planet (Planet): The planet to describe.
+
+    Returns:
+        list: The planet's details, one line per detail.
+    """
+    return [
+        f"Name: {planet.get_name()}",
+        f"Orbits: {planet.get_primary()}",
+        f"Mass: {planet.get_mass()} x 10^24 kg",
+        f"Distance from Sun: {planet.get_distance()} million km",
+        f"Rotational speed: {planet.get_rotational()} m/s",
+        f"Fact 1: {planet.get_planet_fact1()}",
+        f"Fact 2: {planet.get_planet_fact2()}",
+        f"Number of moons: {planet.get_num_orbiting_objects()}",
+        f"Moon names: {planet.get_orbiting_object_names()}",
+    ]
+
+
+def describe_planet(planet, choice: int) -> str:
+    """
+    Returns the answer text for a question about a single planet.
+
+    Args:
+        planet (Planet): The planet the question is about.
+        choice (int): The menu choice number (1 to 4).
+
+    Returns:
+        str: The answer text.
+    """
+    if choice == 1:
+        return "\n".join(text for text in planet_details(planet)
+                         if not (text[:10] == "Moon names" and planet.get_num_orbiting_objects() == 0))
+    elif choice == 2:
+        return f"The mass of planet {planet.get_name()} is: {planet.get_mass()} x 10^24 kg."
+    elif choice == 3:
+        return f"Yes! Planet {planet.get_name()} exists."
+    elif choice == 4:
+        if planet.get_orbiting_object_names() != "None":
+            return (f"The number of moons orbiting planet {planet.get_name()} is: {planet.get_num_orbiting_objects()}."
+                    f"\n\nThey are {planet.get_orbiting_object_names()}")
+        return f"{planet.get_name()} has no moons."
+    raise ValueError(f"Menu choice {choice} is not a planet question")
+
+
+def describe_ranking(ranking: RankingQuery, bodies: list) -> str:
+    """
+    Returns the answer text for a ranking or range question.
+
+    Args:
+        ranking (RankingQuery): The question.
+        bodies (list): The bodies that answer it, in the order they should be listed.
+
+    Returns:
+        str: The answer text.
+    """
+    unit = UNITS[ranking.attribute]
+    plural = f"{ranking.kind}s"
+    listed = ", ".join(f"{body.get_name()} ({getattr(body, 'get_' + ranking.attribute)()} {unit})"
+                       for body in bodies)
+
+    if ranking.count is not None:
+        word = SUPERLATIVE_WORDS[(ranking.attribute, ranking.largest)]
+        if not bodies:
+            return f"There are no {plural}."
+        if len(bodies) == 1:
+            return f"The {word} {ranking.kind} is {listed}."
+        return f"The {len(bodies)} {word} {plural} are: {listed}."
+
+    if ranking.low is not None and ranking.high is not None:
+        condition = f"with {ATTRIBUTE_NAMES[ranking.attribute]} between {ranking.low:g} and {ranking.high:g} {unit}"
+    elif ranking.low is not None:
+        condition = f"{COMPARATIVE_WORDS[(ranking.attribute, 'low')]} {ranking.low:g} {unit}"
+    else:
+        condition = f"{COMPARATIVE_WORDS[(ranking.attribute, 'high')]} {ranking.high:g} {unit}"
+    if not bodies:
+        return f"No {plural} are {condition}."
+    return f"The {plural} {condition} are: {listed}."
+
+
+def describe_summary(body, totals) -> str:
+    """
+    Returns the answer text for a question about everything orbiting a body.
+
+    Args:
+        body (CelestialBody): The body the question is about.
+        totals (SubtreeTotals): The totals over the body's subtree.
+
+    Returns:
+        str: The answer text.
+    """
+    if not totals.descendants:
+        return f"Nothing orbits {body.get_name()}. Its mass is {totals.mass:g} x 10^24 kg."
+    levels = "level" if totals.depth == 1 else "levels"
+    return (f"{body.get_name()} has {totals.descendants} bodies orbiting it, {totals.depth} {levels} deep. "
+            f"Together with {body.get_name()} they have a total mass of {totals.mass:g} x 10^24 kg.")
+
+
+def describe_proximity(proximity: ProximityQuery, name: str, bodies: list | None) -> str:
+    """
+    Returns the answer text for a nearest body or distance question.
+
+    Args:
+        proximity (ProximityQuery): The question.
+        name (str): The name of the body the question is about.
+        bodies (list, optional): (name, distance) pairs of the bodies that answer it,
+            nearest first, or None if the body wasn't found.
+
+    Returns:
+        str: The answer text.
+    """
+    if bodies is None:
+        return f"There's no body called '{name}'."
+    listed = ", ".join(f"{body} ({distance:,.3f} million km)" for body, distance in bodies)
+    if proximity.count is not None:
+        if not bodies:
+            return f"There are no other bodies near {name}."
+        if len(bodies) == 1:
+            return f"On {proximity.when} the closest body to {name} is {listed}."
+        return f"On {proximity.when} the {len(bodies)} closest bodies to {name} are: {listed}."
+    if not bodies:
+        return f"On {proximity.when} no bodies are within {proximity.radius:g} million km of {name}."
+    return f"On {proximity.when} the bodies within {proximity.radius:g} million km of {name} are: {listed}."
+
+
+def find_planet(solar_system, name: str) -> tuple:
+    """
+    Returns the planet with a possibly misspelled name. A name that doesn't match exactly
+    is resolved to the closest planet name if the confidence is high enough.
+
+    Args:
+        solar_system (Star): The solar system object containing planets and moons.
+        name (str): The planet name, as typed.
+
+    Returns:
+        tuple: The Planet, or None if no name is close enough, and the NameMatch of each
+            closest planet name, best first.
+    """
+    planet = solar_system.get_planet(name)
+    if planet is not None or not isinstance(solar_system, Star):
+        return planet, []
+    matches = solar_system.find_bodies(name, NAME_CANDIDATES, Planet)
+    if matches and matches[0].score >= MIN_CONFIDENCE:
+        planet = solar_system.get_planet(matches[0].name)
+    return planet, [match for match in matches if match.score >= SUGGEST_CONFIDENCE]
+
+
+def describe_suggestions(names) -> str:
+    """
+    Returns the text suggesting the names that might have been meant.
+
+    Args:
+        names (Iterable): The names, best first.
+
+    Returns:
+        str: The suggestion, or an empty string if there are no names.
+    """
+    names = list(names)
+    if not names:
+        return ""
+    if len(names) == 1:
+        return f" Did you mean {names[0]}?"
+    return f" Did you mean {', '.join(names[:-1])} or {names[-1]}?"
+
+
+def describe_match(resolution: NameResolution | None) -> dict:
+    """
+    Returns the fields added to a result when a name was resolved by a fuzzy search.
+
+    Args:
+        resolution (NameResolution, optional): The name the question was resolved to.
+
+    Returns:
+        dict: The confidence and the closest names, or nothing if the name was spelled exactly.
+    """
+    if resolution is None or (resolution.confidence == 1.0 and len(resolution.candidates) <= 1):
+        return {}
+    return {"confidence": resolution.confidence, "candidates": list(resolution.candidates)}
+
+
+def normalise_question(user_input: str) -> str:
+    """
+    Returns the form of a question used as its cache key. Matching ignores case and the
+    keywords and planet names never start or end with spaces, so questions that differ
+    only in case or surrounding whitespace always get the same answer.
+
+    Args:
+        user_input (str): The user's question.
+
+    Returns:
+        str: The question in lower case without surrounding whitespace.
+    """
+    return user_input.strip().lower()
+
+
+class AnswerCache:
+    """
+    A class to hold a bounded number of recent results, discarding the least recently used
+    result when it is full.
+
+    Attributes:
+        max_size (int): The most results held; 0 disables the cache.
+        entries (OrderedDict): The cached results, least recently used first.
+        hits (int): The number of lookups that found a result.
+        misses (int): The number of lookups that didn't.
+
+    Methods:
+        get(key): Returns a cached result, or None.
+        put(key, value): Caches a result.
+        clear(): Discards every cached result.
+        get_stats(): Returns the hit and miss statistics.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """
+        Initializes the AnswerCache.
+
+        Args:
+            max_size (int): The most results held; 0 disables the cache. Defaults to 1024.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns a cached result and marks it as the most recently used.
+
+        Args:
+            key (Hashable): The result's key.
+
+        Returns:
+            Any: The cached result, or None if it isn't cached.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """
+        Caches a result, discarding the least recently used result if the cache is full.
+
+        Args:
+            key (Hashable): The result's key.
+            value (Any): The result.
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Discards every cached result. The statistics are kept.
+        """
+        self.entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the cache's hit and miss statistics.
+
+        Returns:
+            dict: The hits, misses, hit rate, current size and maximum size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+        }
+
+
+class QueryEngine:
+    """
+    A class to answer free text questions about a solar system without any GUI.
+
+    Attributes:
+        solar_system (Star): The solar system object containing planets and moons.
+        matcher (MenuMatcher): The compiled keyword and planet name matcher.
+        matcher_version (int): The catalog version the matcher was built from.
+        ranking_matcher (RankingMatcher): Recognises ranking and range questions.
+        proximity_matcher (ProximityMatcher): Recognises nearest body and distance questions.
+        locator (BodyLocator): Finds nearby bodies, created when first needed.
+        question_cache (AnswerCache): Maps normalised questions to their (choice, planet, query).
+        answer_cache (AnswerCache): Maps (choice, planet, query) to the rendered result.
+        cache_version (tuple): The cache version of the system the cached results were built from.
+
+    Methods:
+        get_matcher(): Returns the matcher, rebuilding it if the catalog has changed.
+        get_locator(): Returns the locator of nearby bodies.
+        find_name(text, kind): Finds the body name in free text, allowing for misspellings.
+        check_cache(): Discards the cached results if the catalog has changed.
+        get_cache_stats(): Returns the hit and miss statistics of both caches.
+        resolve(user_input): Determines the menu choice, planet and ranking or proximity question asked.
+        determine_menu_choice(user_input): Determines the menu choice based on user input.
+        render(choice, planet_choice, query): Returns the result for a menu choice and planet.
+        answer(user_input): Answers a free text question with a structured result.
+        answer_safely(user_input): Answers a question, turning any error into an "error" result.
+    """
+
+    def __init__(self, solar_system, cache_size: int = 1024, catalog_folder: str = os.curdir) -> None:
+        """
+        Initializes the QueryEngine and builds its matcher.
+
+        Args:
+            solar_system (Star): The solar system object containing planets and moons.
+            cache_size (int): The most questions and answers cached; 0 disables caching.
+                Defaults to 1024.
+            catalog_folder (str): The folder the system was loaded from, where its orbits
+                are read from. Defaults to the current directory.
+        """
+        self.solar_system = solar_system
+        self.catalog_folder = catalog_folder
+        self.matcher = None
+        self.matcher_version = None
+        self.ranking_matcher = RankingMatcher()
+        self.proximity_matcher = ProximityMatcher()
+        self.locator = None
+        self.question_cache = AnswerCache(cache_size)
+        self.answer_cache = AnswerCache(cache_size)
+        self.cache_version = solar_system.get_cache_version()
+        self.get_matcher()
+
+    def get_matcher(self) -> MenuMatcher:
+        """
+        Returns the keyword and planet name matcher, rebuilding it only if the catalog has
+        changed since it was last built.
+
+        Returns:
+            MenuMatcher: The matcher for the current catalog.
+        """
+        version = self.solar_system.get_catalog_version()
+        if self.matcher is None or version != self.matcher_version:
+            # Get the planet names so the user can type the name of one in their input
+            planet_names = [name.strip() for name in self.solar_system.get_orbiting_object_names().split(",")]
+            self.matcher = MenuMatcher(planet_names)
+            self.matcher_version = version
+        return self.matcher
+
+    def get_locator(self) -> "BodyLocator":
+        """
+        Returns the locator of nearby bodies, creating it the first time it is needed. The
+        locator rebuilds its ephemeris itself if bodies are added.
+
+        Returns:
+            BodyLocator: The locator.
+        """
+        if self.locator is None:
+            # Imported here because the ephemeris needs NumPy, which only these questions use
+            from spatial_index import BodyLocator
+
+            self.locator = BodyLocator(self.solar_system, catalog_folder=self.catalog_folder)
+        return self.locator
+
+    def find_name(self, text: str, kind: type | None = None) -> NameResolution | None:
+        """
+        Finds the body name in free text, allowing for misspellings. Every run of up to three
+        words is looked up in the star's name index, longest first, and the run closest to a
+        name wins. Runs made only of menu keywords and common words must spell a name exactly.
+
+        Args:
+            text (str): The text, such as "tell me about jupitor".
+            kind (type, optional): The class of body, such as Planet. Defaults to every body.
+
+        Returns:
+            NameResolution | None: The best match and the closest names, or None if no run
+                of words is close enough to a name to be suggested, or if the system has no
+                name index to search.
+        """
+        # Only stars (and the views of stored stars) keep an index of their bodies' names
+        if not isinstance(self.solar_system, Star):
+            return None
+        best = None
+        for span in text_spans(NOT_NAME_PATTERN.sub(" ", text.lower())):
+            if len(span) < 3:
+                continue
+            matches = self.solar_system.find_bodies(span, NAME_CANDIDATES, kind)
+            if not matches or matches[0].score < SUGGEST_CONFIDENCE or (
+                    matches[0].score < 1.0 and all(word in FILLER_WORDS for word in span.split())):
+                continue
+            if best is None or matches[0].score > best.confidence:
+                best = NameResolution(span, matches[0].name, matches[0].score,
+                                      tuple(match.name for match in matches if match.score >= SUGGEST_CONFIDENCE))
+                if best.confidence == 1.0:
+                    break
+        return best
+
+    def check_cache(self) -> None:
+        """
+        Discards the cached questions and answers if bodies have been added to the catalog,
+        or deferred bodies created, since they were cached.
+        """
+        version = self.solar_system.get_cache_version()
+        if version != self.cache_version:
+            self.question_cache.clear()
+            self.answer_cache.clear()
+            self.cache_version = version
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns the hit and miss statistics of the question and answer caches.
+
+        Returns:
+            dict: The statistics of each cache, keyed "questions" and "answers".
+        """
+        return {"questions": self.question_cache.get_stats(), "answers": self.answer_cache.get_stats()}
+
+    def resolve(self, user_input: str) -> tuple:
+        """
+        Determines the menu choice, planet and ranking or proximity question asked in the
+        user's input. Questions about the bodies closest to another body (menu choice 9) or
+        within a distance of it (menu choice 10) are recognised first, since they may
+        contain menu keywords such as "everything". Questions that don't name a planet are
+        checked for ranking questions such as "heaviest planet" (menu choice 7) or range
+        questions such as "planets further than 1000 million km" (menu choice 8), and then
+        for a misspelled planet name, which is resolved with find_name.
+
+        Args:
+            user_input (str): The user's input string.
+
+        Returns:
+            tuple: The menu choice, the planet or body name and the RankingQuery,
+                ProximityQuery or NameResolution, each None if not found.
+        """
+        self.check_cache()
+        key = normalise_question(user_input)
+        resolved = self.question_cache.get(key)
+        if resolved is None:
+            proximity = self.proximity_matcher.match(key)
+            if proximity is not None:
+                resolved = (9 if proximity.count is not None else 10, proximity.body, proximity)
+            else:
+                choice, planet_choice = self.get_matcher().match(key)
+                ranking = None if planet_choice else self.ranking_matcher.match(key)
+                if ranking is not None:
+                    choice = 7 if ranking.count is not None else 8
+                    resolved = (choice, planet_choice, ranking)
+                elif planet_choice is None and choice not in (5, 6):
+                    resolved = self.resolve_misspelled(key, choice)
+                else:
+                    resolved = (choice, planet_choice, None)
+            self.question_cache.put(key, resolved)
+        return resolved
+
+    def resolve_misspelled(self, key: str, choice: int | None) -> tuple:
+        """
+        Resolves a question that names no planet exactly. A close enough planet name is
+        taken as the planet asked about, and the closest names are kept as suggestions
+        otherwise. Input that is nothing but a planet name asks for that planet's details,
+        in the same way as an exactly spelled name.
+
+        Args:
+            key (str): The normalised question.
+            choice (int, optional): The menu choice matched, if any.
+
+        Returns:
+            tuple: The menu choice, the planet name and the NameResolution, if any.
+        """
+        resolution = self.find_name(key, Planet)
+        if resolution is None or (choice is None and resolution.typed != " ".join(NOT_NAME_PATTERN.sub(" ", key).split())):
+            return choice, None, None
+        if resolution.confidence < MIN_CONFIDENCE:
+            # Nothing was understood, or the whole system was asked about, so there is nothing to suggest
+            return (choice, None, resolution) if choice not in (None, 11) else (choice, None, None)
+        return choice or 1, resolution.name, resolution
+
+    @timed("determine_menu_choice")
+    def determine_menu_choice(self, user_input: str) -> tuple:
+        """
+        Determines the menu choice based on user input.
+
+        Args:
+            user_input (str): The user's input string.
+
+        Returns:
+            tuple: The menu choice and planet name, or (None, None) if no match is found.
+        """
+        return self.resolve(user_input)[:2]
+
+    def render(self, choice: int | None, planet_choice: str | None,
+               query: RankingQuery | ProximityQuery | NameResolution | None = None) -> dict:
+        """
+        Returns the result for a menu choice and planet, without the question.
+
+        Args:
+            choice (int, optional): The menu choice number, or None if it wasn't understood.
+            planet_choice (str, optional): The planet name, if one was given.
+            query (RankingQuery | ProximityQuery | NameResolution, optional): The ranking
+                question for menu choices 7 and 8, the proximity question for menu choices 9
+                and 10, or how a misspelled planet name was resolved.
+
+        Returns:
+            dict: The menu choice and its name, the planet, the status and the answer text.
+        """
+        self.check_cache()
+        key = (choice, planet_choice.lower() if planet_choice else None, query)
+        result = self.answer_cache.get(key)
+        if result is None:
+            result = self.render_uncached(choice, planet_choice, query)
+            self.answer_cache.put(key, result)
+        return result
+
+    def render_uncached(self, choice: int | None, planet_choice: str | None,
+                        query: RankingQuery | ProximityQuery | NameResolution | None = None) -> dict:
+        """
+        Builds the result for a menu choice and planet.
+
+        Args:
+            choice (int, optional): The menu choice number, or None if it wasn't understood.
+            planet_choice (str, optional): The planet name, if one was given.
+            query (RankingQuery | ProximityQuery | NameResolution, optional): The ranking
+                question for menu choices 7 and 8, the proximity question for menu choices 9
+                and 10, or how a misspelled planet name was resolved.
+
+        Returns:
+            dict: The menu choice and its name, the planet, the status and the answer text.
+        """
+        result = {"choice": None, "intent": None, "planet": None}
+        if not choice:
+            return {**result, "status": "not_understood",
+                    "answer": "Could not understand what you asked for. Please try again."}
+
+        result.update(choice=choice, intent=CHOICE_NAMES[choice], planet=planet_choice)
+        if choice == 5:
+            answer = "\n\n".join(describe_planet(planet, 1) for planet in self.solar_system.get_orbiting_objects())
+            return {**result, "status": "ok", "answer": answer}
+        elif choice == 6:
+            return {**result, "status": "ok", "answer": "Goodbye."}
+        elif choice in (7, 8):
+            if query.attribute not in MEASURED_ATTRIBUTES[query.kind]:
+                return {**result, "status": "no_data",
+                        "answer": f"The catalog has no {query.attribute} data for {query.kind}s."}
+            kind = RANKING_KINDS[query.kind]
+            if choice == 7:
+                bodies = self.solar_system.get_top_bodies(query.attribute, query.count, kind, query.largest)
+            else:
+                bodies = self.solar_system.get_bodies_in_range(query.attribute, query.low, query.high, kind)
+            return {**result, "status": "ok", "answer": describe_ranking(query, bodies)}
+        elif choice in (9, 10):
+            if query.epoch is None:
+                return {**result, "status": "not_understood",
+                        "answer": f"'{query.when}' is not a valid time. Please give a date as YYYY-MM-DD "
+                                  f"or a number of days, such as 'on day 100'."}
+            resolution = None
+            if self.solar_system.get_body(query.body) is None:
+                resolution = self.find_name(query.body)
+                if resolution is not None and resolution.confidence >= MIN_CONFIDENCE:
+                    query = query._replace(body=resolution.name)
+            try:
+                locator = self.get_locator()
+                if choice == 9:
+                    bodies = locator.nearest(query.body, query.epoch, query.count)
+                else:
+                    bodies = locator.within(query.body, query.radius, query.epoch)
+            except ImportError as e:
+                return {**result, "status": "unavailable", "answer": str(e)}
+            row = locator.find_row(query.body)
+            name = query.body if row is None else locator.ephemeris.names[row]
+            return {**result, "planet": name, "status": "ok" if bodies is not None else "not_found",
+                    "answer": describe_proximity(query, name, bodies), **describe_match(resolution)}
+
+        elif choice == 11 and not planet_choice:
+            # The totals are kept up to date as bodies are added, so the tree isn't walked
+            totals = self.solar_system.get_subtree_totals()
+            return {**result, "status": "ok", "answer": describe_summary(self.solar_system, totals)}
+
+        body, matches = find_planet(self.solar_system, planet_choice) if planet_choice else (None, [])
+
+        if isinstance(query, NameResolution):
+            resolution = query
+        elif matches:
+            resolution = NameResolution(planet_choice, matches[0].name, matches[0].score,
+                                        tuple(match.name for match in matches))
+        else:
+            resolution = None
+        if body is None:
+            suggestions = describe_suggestions(resolution.candidates if resolution else ())
+            return {**result, "status": "not_found", "answer": "Planet can't be found." + suggestions,
+                    **describe_match(resolution)}
+        if choice == 11:
+            answer = describe_summary(body, body.get_subtree_totals())
+        else:
+            answer = describe_planet(body, choice)
+        return {**result, "planet": body.get_name(), "status": "ok", "answer": answer, **describe_match(resolution)}
+
+    def answer(self, user_input: str) -> dict:
+        """
+        Answers a free text question in the same way as the GUI menu, returning a structured
+        result instead of opening a window.
+
+        Args:
+            user_input (str): The user's question.
+
+        Returns:
+            dict: The question, the menu choice and its name, the planet, a status of "ok",
+                "blank", "not_understood", "not_found", "no_data" or "unavailable", and the answer text.
+        """
+        # Checks for empty or whitespace-only input in the same way as the menu
+        if not user_input.strip():
+            metrics.count("answers", status="blank")
+            return {"question": user_input, "choice": None, "intent": None, "planet": None,
+                    "status": "blank", "answer": "Input cannot be blank. Please enter a valid command."}
+
+        with metrics.span("answer"):
+            result = {"question": user_input, **self.render(*self.resolve(user_input))}
+        metrics.count("answers", status=result["status"])
+        return result
+
+    def answer_safely(self, user_input: str) -> dict:
+        """
+        Answers a free text question like answer(), but turns any error into a result with
+        the status "error", so that one bad question, or a bad catalog file only some
+        questions read, can't stop a batch or a connection.
+
+        Args:
+            user_input (str): The user's question.
+
+        Returns:
+            dict: The result of answer(), or an "error" result if answering raised.
+        """
+        try:
+            return self.answer(user_input)
+        except Exception:
+            logging.exception(f"Could not answer {user_input!r}")
+            metrics.count("answers", status="error")
+            return {"question": user_input, "choice": None, "intent": None, "planet": None,
+                    "status": "error", "answer": "Something went wrong answering this question."}
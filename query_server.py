@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from query_engine import QueryEngine
+
+
+class QueryServer:
+    """
+    A class to answer free text questions for many clients over a local socket.
+
+    The solar system is loaded once and shared by every connection. Clients send one
+    question per line and may send many before reading any answers (pipelining); each
+    answer is written back in order as one JSON line with its latency added. Each
+    connection has a bounded queue of questions waiting to be answered, and the server
+    stops reading from a client while its queue is full or while the client isn't reading
+    its answers, so a fast sender can't make the server buffer without limit.
+
+    Attributes:
+        engine (QueryEngine): The engine that answers the questions.
+        max_pending (int): The most questions queued per connection before reading pauses.
+        max_line (int): The longest question accepted, in bytes.
+        latencies (deque): The latencies in seconds of the most recent answers.
+        answered (int): The number of questions answered since the server started.
+        connections (int): The number of clients currently connected.
+
+    Methods:
+        handle_connection(reader, writer): Reads questions from a client and queues them.
+        write_answers(queue, writer): Answers queued questions in order.
+        latency_summary(): Returns latency statistics for the recent answers.
+        start(host, port, path): Starts listening on a TCP or Unix socket.
+    """
+
+    def __init__(self, solar_system, max_pending: int = 64, max_line: int = 4096, history: int = 10_000,
+                 cache_size: int = 1024, catalog_folder: str = os.curdir) -> None:
+        """
+        Initializes the QueryServer.
+
+        Args:
+            solar_system (Star): The solar system object containing planets and moons.
+            max_pending (int): The most questions queued per connection. Defaults to 64.
+            max_line (int): The longest question accepted, in bytes. Defaults to 4096.
+            history (int): The number of recent latencies kept for statistics. Defaults to 10000.
+            cache_size (int): The most questions and answers cached; 0 disables caching.
+                Defaults to 1024.
+            catalog_folder (str): The folder the system was loaded from. Defaults to the
+                current directory.
+        """
+        self.engine = QueryEngine(solar_system, cache_size, catalog_folder)
+        self.max_pending = max_pending
+        self.max_line = max_line
+        self.latencies = deque(maxlen=history)
+        self.answered = 0
+        self.connections = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Reads questions from a client and queues them to be answered in order.
+
+        Args:
+            reader (asyncio.StreamReader): The client's input stream.
+            writer (asyncio.StreamWriter): The client's output stream.
+        """
+        peer = writer.get_extra_info("peername") or "local client"
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        answering = asyncio.create_task(self.write_answers(queue, writer))
+        self.connections += 1
+        logging.info(f"Client {peer} connected ({self.connections} connected)")
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await queue.put((None, time.perf_counter()))  # The question was too long
+                    break
+                if not line:
+                    break
+                # Waits here while the queue is full, which stops reading from the client
+                await queue.put((line.decode("utf-8", errors="replace").rstrip("\r\n"), time.perf_counter()))
+        except ConnectionError:
+            pass
+        finally:
+            await queue.put(None)
+            await answering
+            writer.close()
+            self.connections -= 1
+            logging.info(f"Client {peer} disconnected ({self.connections} connected)")
+
+    async def write_answers(self, queue: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers queued questions in the order they arrived and writes each answer as a
+        JSON line, waiting for the client to read its answers before continuing. If the
+        client goes away the remaining questions are discarded, so the reader never waits
+        on a full queue.
+
+        Args:
+            queue (asyncio.Queue): The queued (question, arrival time) pairs, ending with None.
+            writer (asyncio.StreamWriter): The client's output stream.
+        """
+        disconnected = False
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if disconnected:
+                continue
+            question, received = item
+            if question is None:
+                answer = {"question": None, "status": "too_long",
+                          "answer": f"Questions can't be longer than {self.max_line} bytes."}
+            else:
+                answer = self.engine.answer_safely(question)
+            latency = time.perf_counter() - received
+            answer["latency_ms"] = round(latency * 1000, 3)
+            self.latencies.append(latency)
+            self.answered += 1
+            logging.debug(f"Answered {question!r} in {latency * 1000:.3f}ms")
+
+            try:
+                writer.write((json.dumps(answer) + "\n").encode("utf-8"))
+                await writer.drain()
+            except ConnectionError:
+                disconnected = True
+
+    def latency_summary(self) -> dict:
+        """
+        Returns latency statistics for the most recent answers.
+
+        Returns:
+            dict: The number answered and the mean, median, 95th percentile and maximum
+                latency in milliseconds.
+        """
+        if not self.latencies:
+            return {"answered": self.answered}
+        ordered = sorted(self.latencies)
+        return {
+            "answered": self.answered,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, path: str | None = None) -> asyncio.AbstractServer:
+        """
+        Starts listening on a TCP socket, or on a Unix socket if a path is given.
+
+        Args:
+            host (str): The TCP host. Defaults to "127.0.0.1".
+            port (int): The TCP port, or 0 to choose a free one. Defaults to 8765.
+            path (str, optional): The Unix socket path. Defaults to None.
+
+        Returns:
+            asyncio.AbstractServer: The listening server.
+        """
+        if path:
+            return await asyncio.start_unix_server(self.handle_connection, path=path, limit=self.max_line)
+        return await asyncio.start_server(self.handle_connection, host, port, limit=self.max_line)
+
+
+async def watch_catalog(watcher, interval: float = 2.0) -> None:
+    """
+    Checks the catalog files every interval seconds until cancelled. The files are read on
+    a worker thread and the changes applied on the loop, between two answers.
+
+    Args:
+        watcher (CatalogWatcher): The watcher of the catalog files.
+        interval (float): Seconds between checks. Defaults to 2.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        watcher.apply(await loop.run_in_executor(None, watcher.poll))
+
+
+async def serve(solar_system, host: str = "127.0.0.1", port: int = 8765, path: str | None = None,
+                max_pending: int = 64, report_interval: float = 60.0, cache_size: int = 1024,
+                watcher=None, reload_interval: float = 2.0, catalog_folder: str = os.curdir) -> None:
+    """
+    Runs a QueryServer until it is cancelled, logging latency statistics periodically. If a
+    watcher is given, changes to the catalog files are applied on the server's loop between
+    two answers.
+
+    Args:
+        solar_system (Star): The solar system object containing planets and moons.
+        host (str): The TCP host. Defaults to "127.0.0.1".
+        port (int): The TCP port. Defaults to 8765.
+        path (str, optional): The Unix socket path, used instead of TCP. Defaults to None.
+        max_pending (int): The most questions queued per connection. Defaults to 64.
+        report_interval (float): Seconds between latency reports. Defaults to 60.
+        cache_size (int): The most questions and answers cached; 0 disables caching. Defaults to 1024.
+        watcher (CatalogWatcher, optional): Reloads the catalog files when they change. Defaults to None.
+        reload_interval (float): Seconds between checks of the catalog files. Defaults to 2.
+        catalog_folder (str): The folder the system was loaded from. Defaults to the current directory.
+    """
+    query_server = QueryServer(solar_system, max_pending=max_pending, cache_size=cache_size,
+                               catalog_folder=catalog_folder)
+    server = await query_server.start(host, port, path)
+    logging.info(f"Answering questions on {path or f'{host}:{port}'}")
+    watching = asyncio.create_task(watch_catalog(watcher, reload_interval)) if watcher is not None else None
+    async with server:
+        try:
+            while True:
+                await asyncio.sleep(report_interval)
+                logging.info(f"Query latency: {query_server.latency_summary()}, "
+                             f"cache: {query_server.engine.get_cache_stats()}")
+        finally:
+            if watching is not None:
+                watching.cancel()
+            logging.info(f"Query latency: {query_server.latency_summary()}, "
+                             f"cache: {query_server.engine.get_cache_stats()}")
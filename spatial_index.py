@@ -0,0 +1,370 @@
+import heapq
+import logging
+import os
+import time
+from ephemeris import Ephemeris, load_catalog_elements, np, require_numpy
+
+
+class KDTree:
+    """
+    A class to find the points nearest a position, or within a distance of it, without
+    checking every point.
+
+    The tree splits the points in half along their widest axis until each leaf holds at
+    most leaf_size points. Every node covers a contiguous run of the order array and keeps
+    the bounding box of its points, and searches skip any node whose box is too far away.
+    When the points move a little, refit() recomputes the boxes for the new positions
+    while keeping the same splits, which is much cheaper than building the tree again;
+    searches stay exact, only the pruning gets less effective as the boxes grow.
+
+    Attributes:
+        points (numpy.ndarray): The points, shaped (points, 3).
+        leaf_size (int): The most points in a leaf.
+        order (numpy.ndarray): The point indices, grouped so every node covers a run of them.
+        starts (numpy.ndarray): The first position in order covered by each node.
+        stops (numpy.ndarray): The position after the last covered by each node.
+        children (numpy.ndarray): Each node's two children, or -1 for a leaf. Node 0 is the root.
+        lower (numpy.ndarray): The low corner of each node's bounding box.
+        upper (numpy.ndarray): The high corner of each node's bounding box.
+        built_spread (float): The leaves' total box size when the tree was built.
+
+    Methods:
+        refit(points): Moves the points, keeping the tree's splits.
+        spread(): Returns the total size of the leaves' boxes.
+        query(point, count): Returns the points nearest a position.
+        query_radius(point, radius): Returns the points within a distance of a position.
+    """
+
+    def __init__(self, points, leaf_size: int = 16) -> None:
+        """
+        Initializes the KDTree and builds it.
+
+        Args:
+            points (numpy.ndarray): The points, shaped (points, 3).
+            leaf_size (int): The most points in a leaf. Defaults to 16.
+        """
+        require_numpy()
+        self.points = np.asarray(points, dtype=np.float64)
+        self.leaf_size = max(leaf_size, 1)
+        self.order = np.arange(len(self.points))
+
+        starts, stops, children = [0], [len(self.points)], []
+        node = 0
+        # Nodes are split in the order they were created, so children always follow their parent
+        while node < len(starts):
+            start, stop = starts[node], stops[node]
+            if stop - start <= self.leaf_size:
+                children.append((-1, -1))
+            else:
+                run = self.order[start:stop]
+                coordinates = self.points[run]
+                axis = int(np.argmax(coordinates.max(axis=0) - coordinates.min(axis=0)))
+                middle = (stop - start) // 2
+                self.order[start:stop] = run[np.argpartition(coordinates[:, axis], middle)]
+                children.append((len(starts), len(starts) + 1))
+                starts += [start, start + middle]
+                stops += [start + middle, stop]
+            node += 1
+
+        self.starts = np.array(starts, dtype=np.int64)
+        self.stops = np.array(stops, dtype=np.int64)
+        self.children = np.array(children, dtype=np.int64).reshape(-1, 2)
+        self.refit(self.points)
+        self.built_spread = self.spread()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of points.
+
+        Returns:
+            int: The number of points.
+        """
+        return len(self.points)
+
+    def refit(self, points) -> None:
+        """
+        Moves the points to new positions and recomputes every node's bounding box,
+        keeping the tree's splits.
+
+        Args:
+            points (numpy.ndarray): The new positions, in the same order as when the tree was built.
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        if not len(self.points):
+            self.lower = self.upper = np.zeros((len(self.starts), 3))
+            return
+        ordered = self.points[self.order]
+        # reduceat over (start, stop) pairs reduces each node's run; the extra row keeps
+        # every stop a valid index and its results are dropped with the odd entries
+        padded = np.vstack([ordered, ordered[-1:]])
+        bounds = np.column_stack([self.starts, self.stops]).ravel()
+        self.lower = np.minimum.reduceat(padded, bounds)[::2]
+        self.upper = np.maximum.reduceat(padded, bounds)[::2]
+
+    def spread(self) -> float:
+        """
+        Returns the total size of the leaves' bounding boxes, which grows as refitted
+        points drift away from the splits they were built with.
+
+        Returns:
+            float: The sum of the leaves' box edge lengths.
+        """
+        leaves = self.children[:, 0] < 0
+        return float((self.upper[leaves] - self.lower[leaves]).sum())
+
+    def box_distances(self, nodes, point):
+        """
+        Returns the squared distances from a position to the nearest points of some nodes'
+        bounding boxes.
+
+        Args:
+            nodes (numpy.ndarray): The nodes.
+            point (numpy.ndarray): The position.
+
+        Returns:
+            numpy.ndarray: The squared distance to each node's box, 0 if the position is inside it.
+        """
+        gap = np.maximum(self.lower[nodes] - point, 0) + np.maximum(point - self.upper[nodes], 0)
+        return (gap * gap).sum(axis=1)
+
+    def query(self, point, count: int = 1) -> tuple:
+        """
+        Returns the points nearest a position. Nodes are searched nearest box first, and
+        the search stops once no box is closer than the furthest point found so far.
+
+        Args:
+            point (numpy.ndarray): The position.
+            count (int): The number of points wanted. Defaults to 1.
+
+        Returns:
+            tuple: The indices of the nearest points, nearest first, and their distances.
+        """
+        point = np.asarray(point, dtype=np.float64)
+        count = min(count, len(self.points))
+        best_indices = np.empty(0, dtype=np.int64)
+        best_distances = np.empty(0)
+        if count <= 0:
+            return best_indices, best_distances
+
+        heap = [(0.0, 0)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if len(best_distances) == count and distance > best_distances[-1]:
+                break
+            left, right = self.children[node]
+            if left >= 0:
+                children = np.array([left, right])
+                for child, child_distance in zip(children.tolist(), self.box_distances(children, point).tolist()):
+                    heapq.heappush(heap, (child_distance, child))
+                continue
+
+            leaf = self.order[self.starts[node]:self.stops[node]]
+            offsets = self.points[leaf] - point
+            indices = np.concatenate([best_indices, leaf])
+            distances = np.concatenate([best_distances, (offsets * offsets).sum(axis=1)])
+            if len(distances) > count:
+                keep = np.argpartition(distances, count - 1)[:count]
+                indices, distances = indices[keep], distances[keep]
+            ranked = np.argsort(distances, kind="stable")
+            best_indices, best_distances = indices[ranked], distances[ranked]
+        return best_indices, np.sqrt(best_distances)
+
+    def query_radius(self, point, radius: float) -> tuple:
+        """
+        Returns the points within a distance of a position. Nodes whose boxes lie wholly
+        outside the distance are skipped, and nodes wholly inside it are taken without
+        visiting their children.
+
+        Args:
+            point (numpy.ndarray): The position.
+            radius (float): The distance.
+
+        Returns:
+            tuple: The indices of the points found, nearest first, and their distances.
+        """
+        point = np.asarray(point, dtype=np.float64)
+        limit = radius * radius
+        runs = []
+        stack = [0] if len(self.points) and radius >= 0 else []
+        while stack:
+            node = stack.pop()
+            # The squared distance to the box's furthest corner
+            reach = np.maximum(np.abs(self.lower[node] - point), np.abs(self.upper[node] - point))
+            left, right = self.children[node]
+            if (reach * reach).sum() <= limit or left < 0:
+                runs.append(self.order[self.starts[node]:self.stops[node]])
+                continue
+            children = np.array([left, right])
+            stack.extend(children[self.box_distances(children, point) <= limit].tolist())
+
+        indices = np.concatenate(runs) if runs else np.empty(0, dtype=np.int64)
+        offsets = self.points[indices] - point
+        distances = (offsets * offsets).sum(axis=1)
+        found = distances <= limit
+        indices, distances = indices[found], distances[found]
+        ranked = np.argsort(distances, kind="stable")
+        return indices[ranked], np.sqrt(distances[ranked])
+
+
+class BodyLocator:
+    """
+    A class to find the bodies nearest another body, or within a distance of it, at a
+    given time.
+
+    The positions of every body at a time come from the system's ephemeris and are put in
+    a KDTree. Asking about another time refits the same tree to the new positions, and the
+    tree is only rebuilt once refitting has let its leaves' boxes grow to more than
+    rebuild_spread times their size when it was built. The ephemeris is rebuilt if bodies
+    are added to the system.
+
+    Attributes:
+        solar_system (Star): The solar system object containing planets and moons.
+        elements (dict): Maps case-folded body names to their orbital elements.
+        leaf_size (int): The most bodies in a leaf of the tree.
+        rebuild_spread (float): How far the leaves' boxes may grow before the tree is rebuilt.
+        ephemeris (Ephemeris): The system's ephemeris.
+        ephemeris_version (int): The catalog version the ephemeris was built from.
+        rows (dict): Maps case-folded body names to their rows in the ephemeris.
+        tree (KDTree): The tree of the positions at the last time asked about.
+        epoch (float): The time the tree's positions are for, in days.
+
+    Methods:
+        get_ephemeris(): Returns the ephemeris, rebuilding it if the catalog has changed.
+        index_at(epoch): Returns the tree of every body's position at a time.
+        find_row(name): Returns a body's row in the ephemeris.
+        nearest(name, epoch, count): Returns the bodies nearest a body.
+        within(name, radius, epoch): Returns the bodies within a distance of a body.
+    """
+
+    def __init__(self, solar_system, elements: dict | None = None, leaf_size: int = 16,
+                 rebuild_spread: float = 2.0, catalog_folder: str = os.curdir) -> None:
+        """
+        Initializes the BodyLocator. The ephemeris and tree are built when first needed.
+
+        Args:
+            solar_system (Star): The solar system object containing planets and moons.
+            elements (dict, optional): Maps case-folded body names to their orbital elements.
+                Defaults to the elements in planets.json and orbits.json in catalog_folder,
+                if they exist.
+            leaf_size (int): The most bodies in a leaf of the tree. Defaults to 16.
+            rebuild_spread (float): How far the leaves' boxes may grow before the tree is
+                rebuilt. Defaults to 2.
+            catalog_folder (str): The folder the system was loaded from. Defaults to the
+                current directory.
+        """
+        if elements is None:
+            elements = load_catalog_elements(catalog_folder)
+        self.solar_system = solar_system
+        self.elements = elements
+        self.leaf_size = leaf_size
+        self.rebuild_spread = rebuild_spread
+        self.ephemeris = None
+        self.ephemeris_version = None
+        self.rows = {}
+        self.tree = None
+        self.epoch = None
+
+    def get_ephemeris(self) -> Ephemeris:
+        """
+        Returns the system's ephemeris, rebuilding it and dropping the tree if bodies have
+        been added since it was built.
+
+        Returns:
+            Ephemeris: The ephemeris.
+        """
+        version = self.solar_system.get_catalog_version()
+        if self.ephemeris is None or version != self.ephemeris_version:
+            self.ephemeris = Ephemeris.from_star(self.solar_system, self.elements)
+            self.ephemeris_version = version
+            self.rows = {}
+            for row, name in enumerate(self.ephemeris.names):
+                self.rows.setdefault(name.casefold(), row)
+            self.tree = None
+            self.epoch = None
+        return self.ephemeris
+
+    def index_at(self, epoch: float) -> KDTree:
+        """
+        Returns the tree of every body's position at a time, refitting or rebuilding the
+        tree if it was for another time.
+
+        Args:
+            epoch (float): The time, in days.
+
+        Returns:
+            KDTree: The tree.
+        """
+        ephemeris = self.get_ephemeris()
+        if self.tree is not None and epoch == self.epoch:
+            return self.tree
+
+        start = time.perf_counter()
+        positions = ephemeris.positions([epoch])[0]
+        if self.tree is None:
+            self.tree = KDTree(positions, self.leaf_size)
+            action = "Built"
+        else:
+            self.tree.refit(positions)
+            action = "Refitted"
+            if self.tree.spread() > self.rebuild_spread * self.tree.built_spread:
+                self.tree = KDTree(positions, self.leaf_size)
+                action = "Rebuilt"
+        self.epoch = epoch
+        logging.debug(f"{action} spatial index of {len(positions)} bodies for day {epoch:g} "
+                      f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return self.tree
+
+    def find_row(self, name: str) -> int | None:
+        """
+        Returns a body's row in the ephemeris.
+
+        Args:
+            name (str): The body's name, in any case.
+
+        Returns:
+            int | None: The body's row, or None if there's no body with that name.
+        """
+        self.get_ephemeris()
+        return self.rows.get(name.strip().casefold())
+
+    def nearest(self, name: str, epoch: float = 0.0, count: int = 1) -> list | None:
+        """
+        Returns the bodies nearest a body at a time, not counting the body itself.
+
+        Args:
+            name (str): The body's name.
+            epoch (float): The time, in days. Defaults to 0.
+            count (int): The number of bodies wanted. Defaults to 1.
+
+        Returns:
+            list | None: (name, distance in million km) pairs, nearest first, or None if
+                there's no body with that name.
+        """
+        row = self.find_row(name)
+        if row is None:
+            return None
+        tree = self.index_at(epoch)
+        indices, distances = tree.query(tree.points[row], count + 1)
+        return [(self.ephemeris.names[index], distance)
+                for index, distance in zip(indices.tolist(), distances.tolist()) if index != row][:count]
+
+    def within(self, name: str, radius: float, epoch: float = 0.0) -> list | None:
+        """
+        Returns the bodies within a distance of a body at a time, not counting the body itself.
+
+        Args:
+            name (str): The body's name.
+            radius (float): The distance, in million km.
+            epoch (float): The time, in days. Defaults to 0.
+
+        Returns:
+            list | None: (name, distance in million km) pairs, nearest first, or None if
+                there's no body with that name.
+        """
+        row = self.find_row(name)
+        if row is None:
+            return None
+        tree = self.index_at(epoch)
+        indices, distances = tree.query_radius(tree.points[row], radius)
+        return [(self.ephemeris.names[index], distance)
+                for index, distance in zip(indices.tolist(), distances.tolist()) if index != row]
@@ -1,6 +1,15 @@
+import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from system_ui import ShowSystemAll, ShowInfo
+from system_ui import ShowSystemAll, ShowInfo, WindowPool
+from query_engine import QueryEngine
+from instrumentation import metrics, timed
+
+# Milliseconds between checks for the result of reading the catalog files
+RESULT_INTERVAL = 50
 
 
 class SystemMenu:
@@ -11,27 +20,49 @@ class SystemMenu:
         solar_system (Star): The solar system object containing planets and moons.
         root (tk.Tk): The root window for the GUI.
         entry (ttk.Entry): The input field for user commands.
+        engine (QueryEngine): The GUI-free engine that interprets the user's questions.
+        windows (WindowPool): The pool of Toplevel windows used to show answers.
+        watcher (CatalogWatcher | None): Reloads the catalog files when they change, if given.
+        reload_interval (int): Milliseconds between checks of the catalog files.
+        reload_results (queue.SimpleQueue): Hands what the watcher's poll() found back to the Tk thread.
+        reload_thread (threading.Thread | None): The thread reading the catalog files, once started.
 
     Methods:
         determine_menu_choice(user_input): Determines the menu choice based on user input.
         handle_choice(choice): Handles the action for a selected menu choice.
         process_input(): Processes the user's input and executes the corresponding menu action.
         create_widgets(): Creates and arranges the GUI widgets.
+        check_reload(): Starts reading the catalog files on a background thread.
+        poll_catalog(): Reads the catalog files and queues what changed for the Tk thread.
+        finish_reload(): Applies the changes found and redraws the open windows.
         run(): Starts the Tkinter main loop.
     """
 
-    def __init__(self, solar_system) -> None:
+    def __init__(self, solar_system, watcher=None, reload_interval: int = 2000, catalog_folder: str = os.curdir) -> None:
         """
         Initializes the SystemMenu class with a solar system object.
 
         Args:
             solar_system (Star): The solar system object containing planets and moons.
+            watcher (CatalogWatcher, optional): Reloads the catalog files when they change.
+                Defaults to None, which never reloads them.
+            reload_interval (int): Milliseconds between checks of the catalog files. Defaults to 2000.
+            catalog_folder (str): The folder the system was loaded from. Defaults to the
+                current directory.
         """
         self.solar_system = solar_system
+        self.watcher = watcher
+        self.reload_interval = reload_interval
+        self.reload_results = queue.SimpleQueue()
+        self.reload_thread = None
+        self.engine = QueryEngine(solar_system, catalog_folder=catalog_folder)
         self.root = tk.Tk()
         self.root.title("Solar System Menu")
-        self.root.geometry("650x400")
+        self.root.geometry("650x460")
+        self.windows = WindowPool(self.root)
         self.create_widgets()
+        if watcher is not None:
+            self.root.after(reload_interval, self.check_reload)
 
     def determine_menu_choice(self, user_input: str) -> str | None:
         """
@@ -43,56 +74,29 @@ class SystemMenu:
         Returns:
             str | None: The corresponding menu choice as a string, or None if no match is found.
         """
-        user_input = user_input.lower()
-        choices = {
-            1: ["tell me about", "details about", "planet details", "planet info", "display planet", "show planet"],
-            2: ["mass", "weight", "heavy", "weigh"],
-            3: ["check planet", "in the list", "exists", "exist", "list of planets", "in list", "a planet"],
-            4: ["moons", "how many", "how many moons", "planet's moons", "number of moons", "show number"],
-            5: ["show all", "all information", "all info", "everything", "complete system", "solar system"],
-            6: ["exit", "quit", "leave", "close", "bye"],
-        }
-        
-        # Get the planet names and see if the user typed the name of one in their input
-        planet_names = [name.strip() for name in self.solar_system.get_orbiting_object_names().split(",")]
-        for planet in planet_names:
-            if planet.lower() in user_input:
-                planet_choice = planet
-                break
-        else:
-            planet_choice = None
-
-        # Determine if a single word is entered by the user that is the name of a planet
-        if len(user_input.split()) < 2 and planet_choice is not None:
-            choice = 1  # Default to the menu choice showing the information related to that planet only
-            return choice, planet_choice
-
-        for choice, keywords in choices.items():
-            if any(keyword in user_input for keyword in keywords):
-                return choice, planet_choice
-        return None, None
+        return self.engine.determine_menu_choice(user_input)
 
-    def handle_choice(self, planet_choice, choice: int) -> None:
+    @timed("handle_choice")
+    def handle_choice(self, planet_choice, choice: int, start: float | None = None) -> None:
         """
-        Handles the action for a selected menu choice.
+        Handles the action for a selected menu choice. Answers are shown in Toplevel windows
+        of the menu's root, reusing windows that have been closed.
 
         Args:
             choice (int): The menu choice number.
+            start (float, optional): The time.perf_counter() value when the query was
+                submitted, used to measure how long the answer takes to appear.
         """
-        if choice == 1:
-            planet_info = ShowInfo(self.solar_system, "1", planet_choice)
-            planet_info.run()
-        elif choice == 2:
-            planet_mass = ShowInfo(self.solar_system, "2", planet_choice)
-            planet_mass.run()
-        elif choice == 3:
-            planet_exists = ShowInfo(self.solar_system, "3", planet_choice)
-            planet_exists.run()
-        elif choice == 4:
-            planet_moons = ShowInfo(self.solar_system, "4", planet_choice)
-            planet_moons.run()
+        start = time.perf_counter() if start is None else start
+        metrics.count("menu_choices", choice=choice)
+        if choice in (1, 2, 3, 4):
+            planet_info = self.windows.acquire(
+                ShowInfo, lambda master: ShowInfo(self.solar_system, str(choice), planet_choice, self.engine, master))
+            self.windows.track_first_frame(planet_info.root, start, f"Menu choice {choice}")
+            planet_info.show(str(choice), planet_choice)
         elif choice == 5:
-            show_all = ShowSystemAll(self.solar_system)
+            show_all = self.windows.acquire(ShowSystemAll, lambda master: ShowSystemAll(self.solar_system, master))
+            self.windows.track_first_frame(show_all.root, start, "Complete system")
             show_all.show_complete_system()
         elif choice == 6:
             self.root.destroy()
@@ -104,6 +108,7 @@ class SystemMenu:
         Processes user input from the entry field and triggers the corresponding menu action.
         """
 
+        start = time.perf_counter()
         user_input = self.entry.get()
         # Checks for empty or whitespace-only input and shows an error if so
         if not user_input.strip():
@@ -112,9 +117,15 @@ class SystemMenu:
             return  # Stop further processing and returns control to the menu
 
         choice, planet_choice = self.determine_menu_choice(user_input)
-        if choice:
+        if choice in (7, 8, 9, 10, 11):
+            # Ranking and range questions are answered from the star's sorted indexes, and
+            # nearest body questions from the spatial index of the bodies' positions
             self.entry.delete(0, tk.END)
-            self.handle_choice(planet_choice, choice)
+            title = {7: "Planet rankings", 8: "Planet rankings", 11: "System summary"}.get(choice, "Nearby bodies")
+            messagebox.showinfo(title, self.engine.answer(user_input)["answer"])
+        elif choice:
+            self.entry.delete(0, tk.END)
+            self.handle_choice(planet_choice, choice, start)
         else:
             messagebox.showerror(
                 "Error", "Could not understand what you asked for. Please try again.")
@@ -153,8 +164,48 @@ class SystemMenu:
         ttk.Label(frame, text="'How many moons does Saturn have' or 'Neptune's Moons'",
                   font=("Arial", 10)).pack(pady=2)
         ttk.Label(frame, text="'show all' or 'tell me everything'", font=("Arial", 10)).pack(pady=2)
+        ttk.Label(frame, text="'heaviest planet' or 'planets further than 1000 million km'",
+                  font=("Arial", 10)).pack(pady=2)
+        ttk.Label(frame, text="'closest to Mars on 2030-01-01' or 'within 100 million km of Jupiter'",
+                  font=("Arial", 10)).pack(pady=2)
         ttk.Label(frame, text="'exit' or 'bye' - if you don't want to learn anymore 🥺", font=("Arial", 10)).pack(pady=2)
 
+    def check_reload(self) -> None:
+        """
+        Starts reading the catalog files on a background thread, so that parsing a large
+        catalog doesn't freeze the menu, and waits for the result on the Tk event loop.
+        """
+        self.reload_thread = threading.Thread(target=self.poll_catalog, name="catalog-poll", daemon=True)
+        self.reload_thread.start()
+        self.root.after(RESULT_INTERVAL, self.finish_reload)
+
+    def poll_catalog(self) -> None:
+        """
+        Reads the catalog files if they have changed and queues what differs for the Tk
+        thread. Runs on the background thread and doesn't touch the tree or any widget.
+        """
+        pending = None
+        try:
+            pending = self.watcher.poll()
+        finally:
+            self.reload_results.put(pending)
+
+    def finish_reload(self) -> None:
+        """
+        Applies the changes found by poll_catalog() and redraws the open windows, or checks
+        again shortly if the files are still being read. This runs on the Tk event loop
+        between two events, so no answer is drawn from a half-applied catalog; the engine's
+        caches and indexes notice the new catalog version themselves.
+        """
+        try:
+            pending = self.reload_results.get_nowait()
+        except queue.Empty:
+            self.root.after(RESULT_INTERVAL, self.finish_reload)
+            return
+        if self.watcher.apply(pending) is not None:
+            self.windows.refresh()
+        self.root.after(self.reload_interval, self.check_reload)
+
     def run(self) -> None:
         """
         Starts the Tkinter main loop.
@@ -1,68 +1,110 @@
+import logging
+import time
 import tkinter as tk
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import accumulate
 from tkinter import ttk
+from instrumentation import timed
+from query_engine import planet_details, describe_planet, describe_suggestions, find_planet
 
 
 class PlanetCard:
     """
     A class to create and display a card containing planetary details.
 
+    A card can be refilled with another planet's details, reusing its labels, so a virtualised
+    ScrollableFrame can recycle cards as the user scrolls.
+
     Attributes:
         display_frame (tk.Widget): The parent frame where the card will be displayed.
         planet (Planet): The planet object containing details to display.
+        label_widgets (list): The card's labels, one per detail.
 
     Methods:
         create_labels(): Creates and adds labels for planetary details to the card.
+        fill(planet): Shows a planet's details on the card, reusing its labels.
     """
 
-    def __init__(self, display_frame, planet) -> None:
+    def __init__(self, display_frame, planet=None) -> None:
         """
         Initializes the PlanetCard with a display frame and planet object.
 
         Args:
             display_frame (tk.Widget): The parent frame where the card will be displayed.
-            planet (Planet): The planet object containing details to display.
+            planet (Planet, optional): The planet object containing details to display.
+                Defaults to None for a card that is filled later.
         """
         self.display_frame = display_frame
         self.planet = planet
         self.card = ttk.Frame(self.display_frame, padding=10, relief="ridge")
-        self.labels = [
-            f"Name: {self.planet.get_name()}",
-            f"Orbits: {self.planet.get_primary()}",
-            f"Mass: {self.planet.get_mass()} x 10^24 kg",
-            f"Distance from Sun: {self.planet.get_distance()} million km",
-            f"Rotational speed: {self.planet.get_rotational()} m/s",
-            f"Fact 1: {self.planet.get_planet_fact1()}",
-            f"Fact 2: {self.planet.get_planet_fact2()}",
-            f"Number of moons: {self.planet.get_num_orbiting_objects()}",
-            f"Moon names: {self.planet.get_orbiting_object_names()}",
-        ]
+        self.labels = planet_details(self.planet) if planet is not None else []
+        self.label_widgets = []
 
     def create_labels(self) -> None:
         """
         Creates and adds labels displaying planetary details to the card.
         """
         self.card.pack(padx=10, pady=10, fill="x")
+        self.fill(self.planet)
+
+    def fill(self, planet) -> ttk.Frame:
+        """
+        Shows a planet's details on the card, creating its labels the first time and
+        updating their text after that.
 
-        for text in self.labels:
-            if text[:10] == "Moon names" and self.planet.get_num_orbiting_objects() == 0:
-                continue  # Skip showing "Moon Names" if there are no moons
-            ttk.Label(self.card, text=text, wraplength=650,
-                      justify="left").pack(anchor="w", pady=2)
+        Args:
+            planet (Planet): The planet object containing details to display.
+
+        Returns:
+            ttk.Frame: The card's frame.
+        """
+        self.planet = planet
+        self.labels = planet_details(planet)
+        while len(self.label_widgets) < len(self.labels):
+            self.label_widgets.append(ttk.Label(self.card, wraplength=650, justify="left"))
+
+        for label, text in zip(self.label_widgets, self.labels):
+            if text[:10] == "Moon names" and planet.get_num_orbiting_objects() == 0:
+                label.pack_forget()  # Skip showing "Moon Names" if there are no moons
+                continue
+            label.configure(text=text)
+            if not label.winfo_manager():
+                label.pack(anchor="w", pady=2)
+        return self.card
 
 
 class ScrollableFrame:
     """
     A class to create a scrollable frame for displaying long content.
 
+    The frame can hold its content in two ways. create_sf() packs widgets into
+    scrollable_frame as usual. show_items() virtualises a long list instead: only the rows
+    in or near the visible part of the canvas have widgets, rows that scroll out of view are
+    recycled for the rows scrolling in, and the scroll region is kept at the height of the
+    whole list. Row heights start at an estimate and are replaced by the measured height
+    the first time each row is shown.
+
     Attributes:
         root (tk.Widget): The parent widget for the scrollable frame.
         frame (ttk.Frame): The container frame for the canvas and scrollbar.
         canvas (tk.Canvas): The canvas to hold the scrollable content.
         scrollbar (ttk.Scrollbar): The vertical scrollbar for the canvas.
         scrollable_frame (ttk.Frame): The frame inside the canvas for content.
+        items (list): The items shown as virtualised rows.
+        heights (list): The height of each row in pixels, measured or estimated.
+        offsets (list): The top of each row in pixels, plus the total height at the end.
+        visible (dict): Maps the index of each row with widgets to (row, widget, canvas item).
+        pool (list): The rows that have scrolled out of view, ready to be refilled.
 
     Methods:
         create_sf(): Sets up the scrollable frame with a canvas and scrollbar.
+        show_items(items, create_row, fill_row, estimated_height, overscan): Shows a
+            virtualised list of items.
+        on_view_change(first, last): Updates the scrollbar and schedules a refresh.
+        row_width(): Returns the width of a row.
+        refresh(): Creates and recycles rows to match the visible part of the list.
+        layout(): Positions the rows and sets the scroll region from the row heights.
     """
 
     def __init__(self, root) -> None:
@@ -78,6 +120,16 @@ class ScrollableFrame:
         self.scrollbar = ttk.Scrollbar(
             self.frame, orient="vertical", command=self.canvas.yview)
         self.scrollable_frame = ttk.Frame(self.canvas)
+        self.items = []
+        self.heights = []
+        self.offsets = [0]
+        self.visible = {}
+        self.pool = []
+        self.create_row = None
+        self.fill_row = None
+        self.overscan = 2
+        self.padding = 10
+        self.refresh_pending = False
 
     def create_sf(self) -> None:
         """
@@ -96,6 +148,118 @@ class ScrollableFrame:
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
 
+    def show_items(self, items, create_row, fill_row, estimated_height: int = 260, overscan: int = 2) -> None:
+        """
+        Sets up the canvas and scrollbar to show a virtualised list of items. It can be
+        called again to show a different list, reusing the rows already created.
+
+        Args:
+            items (Iterable): The items to show, one row each.
+            create_row (Callable): Creates an empty row given its parent widget.
+            fill_row (Callable): Fills a row with an item and returns the widget to place.
+            estimated_height (int): The height in pixels assumed for rows not yet shown.
+                Defaults to 260.
+            overscan (int): The number of extra rows kept above and below the visible ones.
+                Defaults to 2.
+        """
+        # Rows left over from a previous list go back to the pool to be refilled
+        for row, _, window in self.visible.values():
+            self.canvas.delete(window)
+            self.pool.append(row)
+        self.visible.clear()
+        self.canvas.yview_moveto(0)
+
+        self.items = list(items)
+        self.heights = [estimated_height] * len(self.items)
+        self.create_row = create_row
+        self.fill_row = fill_row
+        self.overscan = overscan
+
+        # Every change to the view (scrollbar, resizing, a new scroll region) reaches the
+        # scrollbar through here, so it is also where rows are brought into view
+        self.canvas.configure(yscrollcommand=self.on_view_change)
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+
+        self.frame.pack(fill="both", expand=True)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.layout()
+
+    def on_view_change(self, first, last) -> None:
+        """
+        Updates the scrollbar and schedules a refresh of the visible rows.
+
+        Args:
+            first (str): The fraction of the list above the view.
+            last (str): The fraction of the list at the bottom of the view.
+        """
+        self.scrollbar.set(first, last)
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.canvas.after_idle(self.refresh)
+
+    def row_width(self) -> int:
+        """
+        Returns the width of a row, which fills the canvas less the padding.
+
+        Returns:
+            int: The row width in pixels.
+        """
+        return max(self.canvas.winfo_width() - 2 * self.padding, 1)
+
+    def layout(self) -> None:
+        """
+        Positions the rows with widgets and sets the scroll region to the height of the
+        whole list.
+        """
+        self.offsets = [0, *accumulate(self.heights)]
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.offsets[-1]))
+        width = self.row_width()
+        for index, (_, _, window) in self.visible.items():
+            self.canvas.coords(window, self.padding, self.offsets[index] + self.padding)
+            self.canvas.itemconfigure(window, width=width)
+        self.on_view_change(*self.canvas.yview())
+
+    def refresh(self) -> None:
+        """
+        Creates rows for the items in or near the visible part of the canvas, recycling the
+        rows that have scrolled out of view, and measures the rows shown for the first time.
+        """
+        self.refresh_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(bisect_right(self.offsets, top) - 1 - self.overscan, 0)
+        last = min(bisect_left(self.offsets, bottom) + self.overscan, len(self.items))
+
+        for index in [index for index in self.visible if not first <= index < last]:
+            row, _, window = self.visible.pop(index)
+            self.canvas.delete(window)
+            self.pool.append(row)
+
+        shown = []
+        for index in range(first, last):
+            if index in self.visible:
+                continue
+            row = self.pool.pop() if self.pool else self.create_row(self.canvas)
+            widget = self.fill_row(row, self.items[index])
+            window = self.canvas.create_window(self.padding, self.offsets[index] + self.padding, window=widget,
+                                               anchor="nw", width=self.row_width())
+            self.visible[index] = (row, widget, window)
+            shown.append(index)
+        if not shown:
+            return
+
+        # Replace the estimated heights of the new rows with their real heights
+        self.canvas.update_idletasks()
+        changed = False
+        for index in shown:
+            height = self.visible[index][1].winfo_reqheight() + 2 * self.padding
+            if height != self.heights[index]:
+                self.heights[index] = height
+                changed = True
+        if changed:
+            self.layout()
+
 
 class ClearFrame:
     """
@@ -105,7 +269,7 @@ class ClearFrame:
         frame (tk.Widget): The frame to clear.
 
     Methods:
-        clear_frame(): Removes all widgets from the frame.
+        clear_frame(keep): Removes all widgets from the frame.
     """
 
     def __init__(self, frame) -> None:
@@ -124,13 +288,123 @@ class ClearFrame:
     #     for widget in self.frame.winfo_children():
     #         widget.destroy()
 
-    def clear_frame(self) -> None:
+    def clear_frame(self, keep=()) -> None:
         """
         Clears all widgets from the frame.
+
+        Args:
+            keep (tuple): Widgets to hide rather than destroy, so they can be shown again.
+                Defaults to none.
         """
 
         for widget in self.frame.winfo_children():
-            widget.destroy()
+            if widget in keep:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+
+
+class WindowPool:
+    """
+    A class to hand out Toplevel windows of the application's single Tk root, reusing
+    windows that have been closed instead of building new ones.
+
+    Each view (ShowInfo or ShowSystemAll) owns one Toplevel. Closing a pooled view only
+    withdraws its window and keeps its widgets, so the next query of the same kind clears
+    and refills it. The pool also measures how long each query takes to draw its first frame.
+
+    Attributes:
+        root (tk.Tk): The application's root window.
+        max_idle (int): The most closed views of each kind kept for reuse.
+        idle (dict): Maps each view class to its closed views.
+        active (list): The views whose windows are open.
+        latencies (deque): The most recent query to first frame times, in seconds.
+
+    Methods:
+        acquire(view_class, create): Returns a closed view to reuse, or a new one.
+        release(view): Withdraws a view's window and keeps it for reuse.
+        refresh(): Redraws every open view from the current catalog.
+        track_first_frame(window, start, label): Logs when a window is first drawn.
+    """
+
+    def __init__(self, root, max_idle: int = 2) -> None:
+        """
+        Initializes the WindowPool.
+
+        Args:
+            root (tk.Tk): The application's root window.
+            max_idle (int): The most closed views of each kind kept for reuse. Defaults to 2.
+        """
+        self.root = root
+        self.max_idle = max_idle
+        self.idle = {}
+        self.active = []
+        self.latencies = deque(maxlen=100)
+
+    def acquire(self, view_class, create):
+        """
+        Returns a closed view of the given class to reuse, or creates a new one.
+
+        Args:
+            view_class (type): The class of view wanted.
+            create (Callable): Creates a new view given the root window.
+
+        Returns:
+            ShowInfo | ShowSystemAll: The view, whose window belongs to this pool.
+        """
+        views = self.idle.get(view_class)
+        if views:
+            view = views.pop()
+        else:
+            view = create(self.root)
+            view.pool = self
+            view.root.protocol("WM_DELETE_WINDOW", view.close)
+        self.active.append(view)
+        return view
+
+    def release(self, view) -> None:
+        """
+        Withdraws a view's window and keeps the view for reuse, destroying it instead if
+        enough views of its kind are already waiting.
+
+        Args:
+            view (ShowInfo | ShowSystemAll): The view being closed.
+        """
+        if view in self.active:
+            self.active.remove(view)
+        views = self.idle.setdefault(type(view), [])
+        if view in views:  # Already closed
+            return
+        if len(views) >= self.max_idle:
+            view.root.destroy()
+            return
+        view.root.withdraw()
+        views.append(view)
+
+    def refresh(self) -> None:
+        """
+        Redraws every open view from the current catalog, such as after it is reloaded.
+        The views' widgets are refilled rather than rebuilt.
+        """
+        for view in self.active:
+            view.refresh()
+
+    def track_first_frame(self, window, start: float, label: str) -> None:
+        """
+        Logs the time from a query to its window's first frame being drawn.
+
+        Args:
+            window (tk.Toplevel): The window showing the answer.
+            start (float): The time.perf_counter() value when the query was submitted.
+            label (str): A description of the window for the log.
+        """
+        def drawn(event) -> None:
+            window.unbind("<Expose>", binding)
+            latency = time.perf_counter() - start
+            self.latencies.append(latency)
+            logging.info(f"{label} window drawn {latency * 1000:.1f}ms after the query")
+
+        binding = window.bind("<Expose>", drawn, add="+")
 
 
 class ShowSystemAll:
@@ -139,39 +413,68 @@ class ShowSystemAll:
 
     Attributes:
         solar_system (Star): The solar system object containing planets and moons.
-        root (tk.Tk): The root window for the display.
+        root (tk.Tk | tk.Toplevel): The window for the display.
+        sf (ScrollableFrame): The scrollable list of planet cards, once created.
+        pool (WindowPool): The pool the window is returned to when closed, if any.
 
     Methods:
         show_complete_system(): Displays all planetary and moon details.
+        refresh(): Refills the displayed planets from the current catalog.
+        close(): Closes the window, returning it to its pool if it has one.
     """
 
-    def __init__(self, s) -> None:
+    def __init__(self, s, master=None) -> None:
         """
         Initializes the ShowSystemAll class.
 
         Args:
             s (Star): The solar system object containing planets and moons.
+            master (tk.Tk, optional): The application's root window, which the display
+                opens a Toplevel of. Defaults to None, which creates its own Tk root.
         """
         self.solar_system = s
-        self.root = tk.Tk()
+        self.root = tk.Tk() if master is None else tk.Toplevel(master)
+        self.sf = None
+        self.pool = None
 
+    @timed("render_show_system_all")
     def show_complete_system(self) -> None:
         """
-        Displays all planetary and moon details in a scrollable frame.
+        Displays all planetary and moon details in a scrollable frame, refilling the
+        existing frame if the window is being reused.
         """
+        if self.sf is not None:
+            self.sf.show_items(self.solar_system.get_orbiting_objects(), PlanetCard, PlanetCard.fill)
+            self.root.deiconify()
+            self.root.lift()
+            return
+
         self.root.title("The Complete Solar System")
         self.root.geometry("700x800")
 
-        sf = ScrollableFrame(self.root)
-        sf.create_sf()
-
-        for planet in self.solar_system.get_orbiting_objects():
-            planet_card = PlanetCard(sf.scrollable_frame, planet)
-            planet_card.create_labels()
+        # Only the cards in view are created, so large systems open as quickly as small ones
+        self.sf = ScrollableFrame(self.root)
+        self.sf.show_items(self.solar_system.get_orbiting_objects(), PlanetCard, PlanetCard.fill)
 
-        ttk.Button(self.root, text="Close", command=lambda: self.root.destroy()).pack(
+        ttk.Button(self.root, text="Close", command=self.close).pack(
             pady=5, anchor="nw")
 
+    def refresh(self) -> None:
+        """
+        Refills the displayed planets from the current catalog, keeping the window's widgets.
+        """
+        if self.sf is not None:
+            self.sf.show_items(self.solar_system.get_orbiting_objects(), PlanetCard, PlanetCard.fill)
+
+    def close(self) -> None:
+        """
+        Closes the window, returning it to its pool to be reused if it has one.
+        """
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.root.destroy()
+
 
 class ShowInfo:
     """
@@ -180,36 +483,55 @@ class ShowInfo:
     Attributes:
         solar_system (Star): The solar system object containing planets and moons.
         message (str): The user-selected operation to perform.
-        root (tk.Tk): The root window for the display.
+        root (tk.Tk | tk.Toplevel): The window for the display.
         display_frame (ttk.Frame): The frame to display planetary details.
         cf (ClearFrame): A ClearFrame instance for clearing the display frame.
+        engine (QueryEngine): The engine whose cached answers are displayed, if given.
+        planet_card (PlanetCard): The card refilled each time a planet's details are shown.
+        shown (str | None): The name of the planet last shown, if any.
+        pool (WindowPool): The pool the window is returned to when closed, if any.
 
     Methods:
         get_input_and_display(): Gets user input and displays the relevant information.
         set_display_area(): Sets up the input and display interface.
+        fill_display_area(): Clears the display and shows the answer for the current query.
+        clear_display(): Clears the display, keeping the planet card.
+        show(message, p_value): Shows a new query, reusing the window's widgets.
+        refresh(): Shows the last planet again from the current catalog.
+        close(): Closes the window, returning it to its pool if it has one.
         run(): Runs the application.
     """
 
-    def __init__(self, solar_system, message, p_value) -> None:
+    def __init__(self, solar_system, message, p_value, engine=None, master=None) -> None:
         """
         Initializes the ShowInfo class.
 
         Args:
             solar_system (Star): The solar system object containing planets and moons.
             message (str): The user-selected operation to perform.
+            engine (QueryEngine, optional): The engine whose cached answers are displayed.
+                Defaults to None, which formats each answer when it is shown.
+            master (tk.Tk, optional): The application's root window, which the display
+                opens a Toplevel of. Defaults to None, which creates its own Tk root.
         """
         self.solar_system = solar_system
         self.message = message
         self.planet_choice = p_value
-        self.root = tk.Tk()
+        self.root = tk.Tk() if master is None else tk.Toplevel(master)
         self.display_frame = ttk.Frame(self.root)
         self.cf = ClearFrame(self.display_frame)
+        self.engine = engine
+        self.entry = None
+        self.planet_card = None
+        self.shown = None
+        self.pool = None
 
+    @timed("render_show_info")
     def get_input_and_display(self) -> None:
         """
         Gets the user input for a planet name and displays the relevant information.
         """
-        self.cf.clear_frame()
+        self.clear_display()
 
         # We check to see if a planet was entered in the menu input and gather input if not
         if not self.planet_choice:
@@ -218,35 +540,34 @@ class ShowInfo:
                 ttk.Label(self.display_frame, text="Please enter a valid planet name.", font=(
                     "Arial", 12)).pack(pady=50)
                 return
-            self.planet_choice = user_input.capitalize()
-
-        # Use the 'message' variable from the menu to drive the appropriate display
-        for planet in self.solar_system.get_orbiting_objects():
-            if planet.get_name() == self.planet_choice:
-                if self.message == "1":
-                    planet_card = PlanetCard(self.display_frame, planet)
-                    planet_card.create_labels()
-                elif self.message == "2":
-                    ttk.Label(self.display_frame, text=f"The mass of planet {planet.get_name()} is: {planet.get_mass()} x 10^24 kg.",
-                              font=("Arial", 12)).pack(pady=50)
-                elif self.message == "3":
-                    ttk.Label(self.display_frame, text=f"Yes! Planet {planet.get_name()} exists.",
-                              font=("Arial", 12)).pack(pady=50)
-                elif self.message == "4":
-                    if planet.get_orbiting_object_names() != "None":
-                        ttk.Label(self.display_frame, text=f"The number of moons orbiting planet {planet.get_name()} is: {planet.get_num_orbiting_objects()}.\n\nThey are {planet.get_orbiting_object_names()}",
-                                  font=("Arial", 12)).pack(pady=50)
-                    else:
-                        ttk.Label(self.display_frame, text=f"{planet.get_name()} has no moons.",
-                                  font=("Arial", 12)).pack(pady=50)
-
-                self.planet_choice = None  # reset the entry for the next input
-                self.entry.delete(0, tk.END)  # Clear the entry input box
-                return
-        ttk.Label(self.display_frame, text="Planet can't be found.",
+            self.planet_choice = user_input
+
+        # Use the 'message' variable from the menu to drive the appropriate display, allowing
+        # for a misspelled planet name
+        planet, matches = find_planet(self.solar_system, self.planet_choice)
+        if planet is not None:
+            if self.message == "1":
+                if self.planet_card is None:
+                    self.planet_card = PlanetCard(self.display_frame)
+                self.planet_card.fill(planet)
+                self.planet_card.card.pack(padx=10, pady=10, fill="x")
+            else:
+                if self.engine is not None:
+                    text = self.engine.render(int(self.message), planet.get_name())["answer"]
+                else:
+                    text = describe_planet(planet, int(self.message))
+                ttk.Label(self.display_frame, text=text, font=("Arial", 12)).pack(pady=50)
+
+            self.shown = planet.get_name()
+            self.planet_choice = None  # reset the entry for the next input
+            self.entry.delete(0, tk.END)  # Clear the entry input box
+            return
+        suggestions = describe_suggestions(match.name for match in matches)
+        ttk.Label(self.display_frame, text="Planet can't be found." + suggestions,
                               font=("Arial", 12)).pack(pady=50)
         ttk.Label(self.display_frame, text="Please try again, or close back to main menu.",
                               font=("Arial", 12)).pack(pady=5)
+        self.shown = None
         self.planet_choice = None  # reset the entry for the next input
         self.entry.delete(0, tk.END)  # Clear the entry input box
 
@@ -269,6 +590,23 @@ class ShowInfo:
         # Bind the Enter key to submit the input
         self.root.bind("<Return>", lambda event: self.get_input_and_display())
 
+        # Wait for user input and bind Submit button to get_input_and_display
+        ttk.Button(self.root, text="Submit",
+                   command=self.get_input_and_display).pack(pady=10)
+
+        self.display_frame.pack(fill="both", expand=True)
+
+        ttk.Button(self.root, text="Close", command=self.close).pack(
+            pady=5, anchor="nw")
+
+        self.fill_display_area()
+
+    def fill_display_area(self) -> None:
+        """
+        Clears the display and shows the answer for the current menu choice and planet.
+        """
+        self.clear_display()
+
         # Determine if menu option 3 has been triggered by the users' input
         if self.message == "3":
             print("menu option 3 chosen")
@@ -285,14 +623,49 @@ class ShowInfo:
             # Automatically display the planet information
             self.get_input_and_display()
 
-        # Wait for user input and bind Submit button to get_input_and_display
-        ttk.Button(self.root, text="Submit",
-                   command=self.get_input_and_display).pack(pady=10)
+    def clear_display(self) -> None:
+        """
+        Clears the display, keeping the planet card to be refilled.
+        """
+        self.cf.clear_frame(keep=(self.planet_card.card,) if self.planet_card else ())
 
-        self.display_frame.pack(fill="both", expand=True)
+    def show(self, message, p_value) -> None:
+        """
+        Shows a new query in the window. The first time the display area is built; after
+        that the existing widgets are cleared and refilled.
 
-        ttk.Button(self.root, text="Close", command=lambda: self.root.destroy()).pack(
-            pady=5, anchor="nw")
+        Args:
+            message (str): The user-selected operation to perform.
+            p_value (str): The planet named in the user's input, if any.
+        """
+        self.message = message
+        self.planet_choice = p_value
+        if self.entry is None:
+            self.set_display_area()
+            return
+        self.entry.delete(0, tk.END)
+        self.fill_display_area()
+        self.root.deiconify()
+        self.root.lift()
+        self.entry.focus()
+
+    def refresh(self) -> None:
+        """
+        Shows the last planet again from the current catalog, such as after it is reloaded,
+        or says it can't be found if it has been removed.
+        """
+        if self.entry is not None and self.shown is not None:
+            self.planet_choice = self.shown
+            self.get_input_and_display()
+
+    def close(self) -> None:
+        """
+        Closes the window, returning it to its pool to be reused if it has one.
+        """
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.root.destroy()
 
     def run(self) -> None:
         """
@@ -11,11 +11,40 @@
 
 '''
 
+import io
+import argparse
+import os
+import asyncio
+import pickle
+import json
+import shutil
+import tempfile
+import threading
+import time
+import subprocess
+import sys
 import unittest
-from unittest.mock import MagicMock
-from celestial import CelestialBody, Star, Planet, Moon
+from bisect import bisect_left, bisect_right
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+from celestial import CelestialBody, Galaxy, Star, Planet, Moon
 from system_menu import SystemMenu
-from main import load_json_data
+from system_ui import ScrollableFrame, WindowPool
+from menu_matcher import MenuMatcher, ProximityMatcher
+from query_engine import QueryEngine
+from query_server import QueryServer
+from celestial_store import BodyStore, PLANET, MOON
+from binary_catalog import HEADER, SECTIONS, open_binary_catalog, write_binary_catalog
+from json_stream import JsonStreamReader, iter_json_array, iter_json_object
+from ephemeris import Ephemeris, np
+from ephemeris_export import FORMATS, export_positions
+from spatial_index import BodyLocator, KDTree
+from instrumentation import metrics
+from hot_reload import CatalogWatcher
+from benchmarks.import_time import measure_import, check_budget
+from benchmarks.menu_matcher import baseline_match
+from benchmarks.scaling import compare
+from main import load_json_data, create_moons, create_columnar_system, create_catalog, create_system, run_batch, load_system, load_snapshot, catalog_fingerprint, snapshot_format, EXPORT_FORMATS
 
 
 class CelestialSystemTest(unittest.TestCase):
@@ -108,8 +137,129 @@ class CelestialSystemTest(unittest.TestCase):
         self.assertEqual(celestial_body.get_orbiting_objects(), [], "An empty orbiting objects property causes an error")
         self.assertEqual(celestial_body.get_orbiting_object_names(), "None", "An empty orbiting objects names property causes an error")
 
+# ---------------- Test Compact Object Model ------------------
+
+    #Test Plan Reference: Core_011
+    def test_compact_bodies(self):
+        self.assertFalse(hasattr(self.io, "__dict__"), "Moons are not using slots")
+        self.assertFalse(hasattr(self.earth, "__dict__"), "Planets are not using slots")
+        self.assertFalse(hasattr(self.star, "__dict__"), "Stars are not using slots")
+        mars = Planet(name="Mars", primary=self.star, f1="".join(["I am ", "red."]))
+        ares = Planet(name="Ares", primary=self.star, f1="".join(["I am ", "red."]))
+        self.assertIs(mars.get_planet_fact1(), ares.get_planet_fact1(), "Identical facts are not shared")
+
+# ---------------- Test Name Index ------------------
+
+    #Test Plan Reference: Core_009
+    def test_star_name_index_lookup(self):
+        self.star.add_orbiting_objects([self.earth, self.jupiter])
+        self.earth.add_orbiting_objects([self.the_moon])
+        self.assertIs(self.star.get_planet("earth"), self.earth, "Star is not finding planets regardless of case.")
+        self.assertIs(self.star.get_planet(" JUPITER "), self.jupiter, "Star is not finding planets regardless of case.")
+        self.assertIsNone(self.star.get_planet("The Moon"), "Star is returning a moon as a planet.")
+        self.assertIs(self.star.get_body("the moon"), self.the_moon, "Star is not indexing moons added after their planet.")
+        self.assertIsNone(self.star.get_body("Pluto"), "Star is returning a body that doesn't exist.")
+
+    #Test Plan Reference: Core_010
+    def test_star_name_index_includes_existing_moons(self):
+        self.jupiter.add_orbiting_objects([self.io])
+        self.star.add_orbiting_objects([self.jupiter])
+        self.assertIs(self.star.get_body("IO"), self.io, "Star is not indexing moons added before their planet.")
+
+
+# ---------------- Test Lazy Moons ------------------
+
+    #Test Plan Reference: Core_012
+    def test_lazy_moons(self):
+        lazy = create_system("Sol", lazy_moons=True)
+        saturn = lazy.get_planet("saturn")
+        self.assertEqual(saturn.get_num_orbiting_objects(), 7, "Deferred moons are not counted")
+        self.assertEqual(saturn.get_orbiting_object_names(), create_system("Sol").get_planet("saturn").get_orbiting_object_names())
+        self.assertIsNotNone(saturn.deferred_objects, "Counting or naming moons created them")
+        titan = lazy.get_body("titan")
+        self.assertIsInstance(titan, Moon, "Deferred moon can't be found by name")
+        self.assertIs(titan.primary, saturn)
+        self.assertIsNone(saturn.deferred_objects, "Finding a moon didn't create its siblings")
+        self.assertEqual(saturn.get_num_orbiting_objects(), 7, "Moons counted twice after creation")
+        self.assertIsNotNone(lazy.get_planet("jupiter").deferred_objects, "Other planets' moons were created")
+
+# ---------------- Test Derived Strings ------------------
+
+    #Test Plan Reference: Core_013
+    def test_derived_strings_remembered_until_orbiters_change(self):
+        self.jupiter.add_orbiting_objects([self.io])
+        names = self.jupiter.get_orbiting_object_names()
+        text = str(self.jupiter)
+        self.assertIs(self.jupiter.get_orbiting_object_names(), names, "Names string is rebuilt on every call")
+        self.assertIs(str(self.jupiter), text, "Planet string is rebuilt on every call")
+        self.jupiter.add_orbiting_objects([Moon(name="Europa", primary=self.jupiter)])
+        self.assertEqual(self.jupiter.get_orbiting_object_names(), "Io, Europa", "Names string not rebuilt after adding a moon")
+        self.assertIn("2 orbiting objects: Io, Europa", str(self.jupiter), "Planet string not rebuilt after adding a moon")
+        self.jupiter.defer_orbiting_objects(["Ganymede"], Moon)
+        self.assertEqual(self.jupiter.get_orbiting_object_names(), "Io, Europa, Ganymede", "Names string not rebuilt after deferring a moon")
+
+# ---------------- Test Sorted Indexes ------------------
+
+    #Test Plan Reference: Core_014
+    def test_sorted_indexes_update_incrementally(self):
+        self.star.add_orbiting_objects([self.earth, self.jupiter])
+        self.assertEqual(self.star.get_top_bodies("mass", 1, Planet), [self.jupiter])
+        mars = Planet(name="Mars", primary=self.star, mass=0.642, distance=228)
+        saturn = Planet(name="Saturn", primary=self.star, mass=568, distance=1434)
+        self.star.add_orbiting_objects([mars, saturn])
+        self.assertEqual(self.star.get_top_bodies("mass", 2, Planet, largest=False), [mars, self.earth])
+        self.assertEqual(self.star.get_bodies_in_range("distance", 200, 1000, Planet), [mars, self.jupiter])
+        many = [Planet(name=f"P{number}", primary=self.star, mass=number) for number in range(20)]
+        self.star.add_orbiting_objects(many)
+        self.assertEqual(self.star.get_bodies_in_range("mass", 17, 19.5, Planet), many[17:])
+        self.jupiter.add_orbiting_objects([self.io])
+        self.assertEqual(self.star.get_bodies_in_range("mass", kind=Moon), [self.io], "Moons added to a planet are not indexed")
+        self.jupiter.defer_orbiting_objects(["Europa"], Moon)
+        self.assertEqual([moon.get_name() for moon in self.star.get_bodies_in_range("mass", kind=Moon)], ["Io", "Europa"],
+                         "Deferred moons are missing from the moon index")
+        self.jupiter.defer_orbiting_objects(["Ganymede"], Moon)
+        self.assertEqual(len(self.star.get_bodies_in_range("mass")), 27, "Deferred moons are missing from the index of every body")
+
+# ---------------- Test Traversals and Subtree Totals ------------------
+
+    #Test Plan Reference: Core_015
+    def test_depth_first_and_breadth_first_order(self):
+        self.star.add_orbiting_objects([self.earth, self.jupiter])
+        self.earth.add_orbiting_objects([self.the_moon])
+        self.jupiter.add_orbiting_objects([self.io])
+        minilith = Moon(name="Minilith", primary=self.the_moon)
+        self.the_moon.add_orbiting_objects([minilith])
+        names = lambda bodies: [body.get_name() for body in bodies]
+        self.assertEqual(names(self.star.iter_depth_first()), ["Sun", "Earth", "The Moon", "Minilith", "Jupiter", "Io"])
+        self.assertEqual(names(self.star.iter_breadth_first()), ["Sun", "Earth", "Jupiter", "The Moon", "Io", "Minilith"])
+        self.assertEqual(names(self.star.iter_bodies(Moon)), ["The Moon", "Minilith", "Io"])
+        self.assertEqual(names(self.star.iter_bodies(Planet, breadth_first=True)), ["Earth", "Jupiter"])
+        self.jupiter.defer_orbiting_objects(["Europa"], Moon)
+        self.assertEqual(names(self.jupiter.iter_depth_first(include_self=False, materialise=False)), ["Io"])
+        self.assertEqual(names(self.jupiter.iter_depth_first(include_self=False)), ["Io", "Europa"])
+
+    #Test Plan Reference: Core_016
+    def test_subtree_totals_follow_add_defer_and_materialise(self):
+        self.star.add_orbiting_objects([self.earth])
+        self.assertEqual(tuple(self.star.get_subtree_totals()), (5.97, 1, 1))
+        self.earth.add_orbiting_objects([self.the_moon])
+        self.star.add_orbiting_objects([self.jupiter])
+        self.assertEqual(tuple(self.star.get_subtree_totals()), (5.97 + 1898, 3, 2))
+        self.jupiter.defer_orbiting_objects(["Io", "Europa"], Moon)
+        self.assertEqual(tuple(self.jupiter.get_subtree_totals()), (1898, 2, 1))
+        self.assertEqual(self.star.get_subtree_totals().descendants, 5, "Deferred moons not counted")
+        self.jupiter.get_orbiting_objects()
+        self.assertEqual(self.star.get_subtree_totals().descendants, 5, "Materialised moons counted twice")
+        io = self.star.get_body("Io")
+        io.add_orbiting_objects([Moon(name="Pebble", primary=io)])
+        self.assertEqual(tuple(self.star.get_subtree_totals()), (5.97 + 1898, 6, 3))
+        self.assertEqual(tuple(self.jupiter.get_subtree_totals()), (1898, 3, 2))
+        expected = sum(body.get_mass() for body in self.star.iter_depth_first())
+        self.assertEqual(self.star.get_subtree_totals().mass, expected)
+        self.assertEqual(tuple(create_columnar_system("Sol").get_subtree_totals()),
+                         tuple(create_system("Sol").get_subtree_totals()))
+
 
-       
 class FileOperationsTest(unittest.TestCase):
     def setUp(self) -> None:
         pass
@@ -131,9 +281,108 @@ class FileOperationsTest(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             load_json_data("DoesntExist.json")
 
+# ---------------- Test JSON Streaming ------------------
+    #Test Plan Reference: File_005
+    def test_stream_json_matches_load(self):
+        self.assertEqual(list(iter_json_array("planets.json")), load_json_data("planets.json"), "Streamed planets do not match the loaded file")
+        self.assertEqual(dict(iter_json_object("moons.json")), load_json_data("moons.json"), "Streamed moons do not match the loaded file")
+
+    #Test Plan Reference: File_008
+    def test_stream_numbers_cut_at_chunk_boundary(self):
+        array = '[1.5, 22.25, 3e5, -0.125, 1E-3, 7, {"mass": 12.5e+2, "moons": [10, 200]}, true, "x"]'
+        objects = '{"a": 1.5, "b": -22.25e1, "c": 300}'
+        for chunk_size in range(1, 16):
+            self.assertEqual(list(JsonStreamReader(io.StringIO(array), chunk_size).iter_array()), json.loads(array),
+                             f"Array numbers cut with chunks of {chunk_size}")
+            self.assertEqual(dict(JsonStreamReader(io.StringIO(objects), chunk_size).iter_object()), json.loads(objects),
+                             f"Object numbers cut with chunks of {chunk_size}")
+
+    #Test Plan Reference: File_009
+    def test_stream_value_larger_than_many_chunks(self):
+        moons = {"Jupiter": [f"Moon {number}" for number in range(20_000)], "Saturn": ["Titan"]}
+        reads = []
+
+        class CountingText(io.StringIO):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+
+        text = json.dumps(moons)
+        self.assertEqual(dict(JsonStreamReader(CountingText(text), 1024).iter_object()), moons)
+        self.assertGreater(len(text), 200 * 1024)
+        self.assertLess(len(reads), 20, "A large value is re-read a chunk at a time, so decoding it is quadratic")
+
+    #Test Plan Reference: File_006
+    def test_create_moons_invalid_structure(self):
+        with tempfile.TemporaryDirectory() as folder:
+            moons_file = os.path.join(folder, "moons.json")
+            with open(moons_file, "w") as file:
+                json.dump(["The Moon"], file)
+            with self.assertRaises(ValueError):
+                create_moons(Star("Sol"), moons_file)
+
+# ---------------- Test Multi-Star Catalogs ------------------
+    #Test Plan Reference: File_007
+    def test_create_catalog_in_parallel(self):
+        with tempfile.TemporaryDirectory() as catalog_dir:
+            for star_name in ("Sol", "Vega"):
+                os.mkdir(os.path.join(catalog_dir, star_name))
+                for filename in ("planets.json", "moons.json"):
+                    shutil.copy(filename, os.path.join(catalog_dir, star_name, filename))
+            for workers, columnar in ((1, False), (2, False), (2, True)):
+                galaxy = create_catalog(catalog_dir, workers=workers, columnar=columnar)
+                self.assertIsInstance(galaxy, Galaxy)
+                self.assertEqual(galaxy.get_orbiting_object_names(), "Sol, Vega", "Star systems not combined in order")
+                vega = galaxy.get_star("vega")
+                self.assertEqual(vega.get_planet("mars").get_orbiting_object_names(), "Phobos, Deimos")
+                self.assertEqual(vega.get_planet("mars").get_primary(), "Vega")
+
+# ---------------- Test System Snapshot ------------------
+    #Test Plan Reference: File_003
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            snapshot_file = os.path.join(folder, "snapshot.pickle")
+            built = load_system("Sol", snapshot_file)
+            self.assertTrue(os.path.exists(snapshot_file), "Snapshot file not saved")
+            loaded = load_system("Sol", snapshot_file)
+            self.assertIsNot(loaded, built, "System was not loaded from the snapshot")
+            self.assertEqual(str(loaded), str(built), "Snapshot does not contain the same system")
+            self.assertEqual(loaded.get_planet("mars").get_orbiting_object_names(), "Phobos, Deimos")
+
+    #Test Plan Reference: File_004
+    def test_snapshot_stale_key(self):
+        with tempfile.TemporaryDirectory() as folder:
+            snapshot_file = os.path.join(folder, "snapshot.pickle")
+            load_system("Sol", snapshot_file)
+            stale_key = {"star_name": "Sol", "lazy_moons": False, "catalog": [("planets.json", 0, 0, "")]}
+            self.assertIsNone(load_snapshot(stale_key, snapshot_file), "Stale snapshot was loaded")
+            fresh_key = {"star_name": "Sol", "lazy_moons": False, "catalog": catalog_fingerprint()}
+            self.assertIsNotNone(load_snapshot(fresh_key, snapshot_file), "Valid snapshot was not loaded")
+
+    #Test Plan Reference: File_010
+    def test_snapshot_of_old_format_rebuilt(self):
+        with tempfile.TemporaryDirectory() as folder:
+            snapshot_file = os.path.join(folder, "snapshot.pickle")
+            key = {"star_name": "Sol", "lazy_moons": False, "catalog": catalog_fingerprint()}
+            star = create_system("Sol")
+            del star.sorted_indexes
+            for snapshot in ({"format": 6, "key": key, "star": create_system("Sol")},
+                             {"format": snapshot_format(), "key": key, "star": star},
+                             {"format": snapshot_format(), "key": key, "star": "Sol"}, ["not", "a", "snapshot"]):
+                with open(snapshot_file, "wb") as file:
+                    pickle.dump(snapshot, file)
+                self.assertIsNone(load_snapshot(key, snapshot_file), f"Snapshot {snapshot!r:.40} was loaded")
+            rebuilt = load_system("Sol", snapshot_file)
+            self.assertEqual(rebuilt.get_top_bodies("mass", 1)[0].name, "Jupiter", "Rebuilt system is incomplete")
+            self.assertIsNotNone(load_snapshot(key, snapshot_file), "Rebuilt system was not saved in the current format")
+
 
 class MenuSystemTest(unittest.TestCase):
     def setUp(self) -> None:
+        # Tk is patched out so the menu logic is tested with or without a display
+        patcher = patch.multiple("system_menu", tk=MagicMock(), ttk=MagicMock(), WindowPool=MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.mock_solar_system = MagicMock()
         self.mock_solar_system.get_orbiting_object_names.return_value = "Earth, Mars, Venus, Jupiter"
         self.menu = SystemMenu(self.mock_solar_system)
@@ -186,8 +435,868 @@ class MenuSystemTest(unittest.TestCase):
         choice, planet_choice = self.menu.determine_menu_choice("this is unmatched")
         self.assertIsNone(choice, None)
         self.assertIsNone(planet_choice, None)
+
+    #Test Plan Reference: Menu_012
+    def test_catalog_read_off_the_tk_thread(self):
+        watcher = MagicMock()
+        watcher.poll.side_effect = lambda: threading.get_ident()
+        self.menu.watcher = watcher
+        self.menu.root.after.reset_mock()
+        self.menu.finish_reload()
+        watcher.apply.assert_not_called()
+        self.assertEqual (self.menu.root.after.call_args.args[1], self.menu.finish_reload, "Not checked again while reading")
+
+        self.menu.check_reload()
+        self.menu.reload_thread.join()
+        self.menu.finish_reload()
+        polled_on = watcher.apply.call_args.args[0]
+        self.assertNotEqual (polled_on, threading.get_ident(), "The files were read on the Tk thread")
+        self.menu.windows.refresh.assert_called_once()
+        self.assertEqual (self.menu.root.after.call_args.args, (self.menu.reload_interval, self.menu.check_reload))
     
    
+class MenuMatcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.matcher = MenuMatcher(["Earth", "Mars", "Venus", "Jupiter"])
+
+    def tearDown(self) -> None:
+        self.matcher = None
+
+  # ---------------- Compiled Menu Matcher ------------------
+    #Test Plan Reference: Menu_008
+    def test_matcher_prefers_first_listed_planet_and_lowest_choice(self):
+        choice, planet_choice = self.matcher.match("how heavy are Jupiter and Earth")
+        self.assertEqual (choice, 2)
+        self.assertEqual (planet_choice, "Earth")
+
+    #Test Plan Reference: Menu_009
+    def test_matcher_finds_overlapping_keywords(self):
+        choice, planet_choice = self.matcher.match("is mars in the list of planets")
+        self.assertEqual (choice, 3)
+        self.assertEqual (planet_choice, "Mars")
+
+    #Test Plan Reference: Menu_011
+    def test_matcher_agrees_with_substring_search(self):
+        names = ["Mars", "Marsh", "Arsenal", "Sea", "Seal", "Kepler-22b", "Earth"]
+        matcher = MenuMatcher(names)
+        questions = ["how massive is the marsh", "does kepler-22b exist", "seals of arsenal", "tell me about mars",
+                     "earthsea", "show all of the solar system", "nothing here", "marsenal", "a planet called sea?"]
+        for question in questions:
+            self.assertEqual (matcher.match(question), baseline_match(", ".join(names), question), question)
+        self.assertEqual (matcher.automaton.find("the marshes of the arsenal"), {"mars", "marsh", "arsenal"})
+
+    #Test Plan Reference: Menu_010
+    def test_catalog_version_changes_when_bodies_added(self):
+        star = Star("Sun")
+        version = star.get_catalog_version()
+        star.add_orbiting_objects([Planet(name="Earth", primary=star)])
+        self.assertGreater(star.get_catalog_version(), version, "Adding a planet does not change the catalog version.")
+
+class QueryEngineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.star = create_system("Sol")
+        self.engine = QueryEngine(self.star)
+
+    def tearDown(self) -> None:
+        self.star = None
+        self.engine = None
+
+  # ---------------- Headless Query Engine ------------------
+    #Test Plan Reference: Query_001
+    def test_answer_planet_mass(self):
+        result = self.engine.answer("How massive is Neptune?")
+        self.assertEqual (result["choice"], 2)
+        self.assertEqual (result["planet"], "Neptune")
+        self.assertEqual (result["status"], "ok")
+        self.assertEqual (result["answer"], "The mass of planet Neptune is: 102 x 10^24 kg.")
+
+    #Test Plan Reference: Query_002
+    def test_answer_unknown_planet_and_blank_input(self):
+        self.assertEqual (self.engine.answer("Is Pluto in the list of planets?")["status"], "not_found")
+        self.assertEqual (self.engine.answer("   ")["status"], "blank")
+        self.assertEqual (self.engine.answer("this is unmatched")["status"], "not_understood")
+
+    #Test Plan Reference: Query_003
+    def test_run_batch_writes_one_answer_per_line(self):
+        output = io.StringIO()
+        count = run_batch(self.star, io.StringIO("how many moons does mars have\nbye\nsaturn\n"), output, chunk_size=2)
+        answers = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual (count, 3)
+        self.assertEqual ([answer["choice"] for answer in answers], [4, 6, 1])
+        self.assertIn ("Phobos, Deimos", answers[0]["answer"])
+
+        output = io.StringIO()
+        with patch.object(QueryEngine, "get_locator", side_effect=ValueError("Unknown orbital element 'eccentricty'")), \
+                self.assertLogs(level="ERROR"):
+            count = run_batch(self.star, io.StringIO("closest to mars\nsaturn\n"), output)
+        answers = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual ((count, [answer["status"] for answer in answers]), (2, ["error", "ok"]),
+                          "An error answering one question stops the batch")
+
+    #Test Plan Reference: Query_004
+    def test_repeated_questions_hit_cache(self):
+        first = self.engine.answer("How massive is Jupiter?")
+        second = self.engine.answer("  how MASSIVE is jupiter?  ")
+        self.assertEqual ({**first, "question": None}, {**second, "question": None})
+        self.assertEqual (second["question"], "  how MASSIVE is jupiter?  ")
+        stats = self.engine.get_cache_stats()
+        self.assertEqual ((stats["questions"]["hits"], stats["questions"]["misses"]), (1, 1))
+        self.assertEqual ((stats["answers"]["hits"], stats["answers"]["misses"]), (1, 1))
+
+    #Test Plan Reference: Query_005
+    def test_cache_invalidated_when_catalog_changes(self):
+        self.assertEqual (self.engine.answer("tell me about vulcan")["status"], "not_found")
+        self.star.add_orbiting_objects([Planet(name="Vulcan", primary=self.star, mass=1)])
+        result = self.engine.answer("tell me about vulcan")
+        self.assertEqual (result["status"], "ok", "Cached answer not discarded after a planet was added")
+        self.assertEqual (result["planet"], "Vulcan")
+
+        lazy = create_system("Sol", lazy_moons=True)
+        engine = QueryEngine(lazy)
+        engine.answer("heaviest planet")
+        version = lazy.get_catalog_version()
+        lazy.get_planet("Saturn").materialise_orbiting_objects()
+        self.assertEqual (lazy.get_catalog_version(), version)
+        engine.answer("heaviest planet")
+        self.assertEqual (engine.get_cache_stats()["answers"]["hits"], 0, "Cached answer kept after moons were created")
+
+    #Test Plan Reference: Query_006
+    def test_cache_discards_least_recently_used(self):
+        engine = QueryEngine(self.star, cache_size=2)
+        engine.determine_menu_choice("mass of mars")
+        engine.determine_menu_choice("mass of venus")
+        engine.determine_menu_choice("mass of mars")
+        engine.determine_menu_choice("mass of earth")
+        self.assertEqual (list(engine.question_cache.entries), ["mass of mars", "mass of earth"])
+        self.assertEqual (engine.get_cache_stats()["questions"]["size"], 2)
+        self.assertEqual (QueryEngine(self.star, cache_size=0).determine_menu_choice("mass of mars"), (2, "Mars"))
+
+    #Test Plan Reference: Query_007
+    def test_ranking_and_range_questions(self):
+        heaviest = self.engine.answer("Which is the heaviest planet?")
+        self.assertEqual ((heaviest["choice"], heaviest["intent"]), (7, "ranking"))
+        self.assertEqual (heaviest["answer"], "The heaviest planet is Jupiter (1898 x 10^24 kg).")
+        self.assertIn ("Jupiter (12600 m/s), Saturn (10233 m/s), Neptune", self.engine.answer("three fastest rotating planets")["answer"])
+        far = self.engine.answer("planets further than 1,000 million km")
+        self.assertEqual (far["choice"], 8)
+        self.assertEqual (far["answer"], "The planets further than 1000 million km are: Saturn (1434 million km), "
+                                         "Uranus (2817 million km), Neptune (4495 million km).")
+        self.assertEqual (self.engine.answer("What is the mass of Mars?")["choice"], 2)
+        view = create_columnar_system("Sol")
+        self.assertEqual (QueryEngine(view).answer("planets further than 1000 million km")["answer"], far["answer"])
+        heaviest_moon = self.engine.answer("heaviest moon")
+        self.assertEqual ((heaviest_moon["status"], heaviest_moon["answer"]), ("no_data", "The catalog has no mass data for moons."))
+        huge = self.engine.answer("the " + "9" * 5000 + " heaviest planets")
+        self.assertEqual (huge["status"], "not_understood", "A count with thousands of digits is not understood")
+        self.assertIn ("Neptune", self.engine.answer("top 100 heaviest planets")["answer"])
+
+    #Test Plan Reference: Query_008
+    @unittest.skipUnless(np is not None, "NumPy is not installed")
+    def test_nearest_and_within_questions(self):
+        nearest = self.engine.answer("Which body is closest to Mars on 2003-08-27?")
+        self.assertEqual ((nearest["choice"], nearest["intent"], nearest["planet"]), (9, "nearest", "Mars"))
+        self.assertIn ("Earth (55.7", self.engine.answer("four nearest bodies to mars on 2003-08-27")["answer"])
+        within = self.engine.answer("everything within 1.5 million km of Jupiter on day 100")
+        self.assertEqual (within["choice"], 10, "'everything' is taken as show all")
+        self.assertEqual ([name for name in ("Io", "Europa", "Ganymede", "Callisto") if name in within["answer"]],
+                          ["Io", "Europa", "Ganymede"])
+        self.assertEqual (self.engine.answer("closest to vulcan")["status"], "not_found")
+        self.assertEqual (self.engine.answer("closest planet")["choice"], 7)
+
+    #Test Plan Reference: Query_009
+    def test_summary_questions(self):
+        result = self.engine.answer("count everything")
+        self.assertEqual ((result["choice"], result["intent"]), (11, "summary"))
+        self.assertIn ("Sol has 31 bodies orbiting it, 2 levels deep", result["answer"])
+        self.assertIn ("Jupiter has 4 bodies", self.engine.answer("total mass of Jupiter")["answer"])
+        self.assertEqual (self.engine.answer("tell me everything")["choice"], 5)
+
+    #Test Plan Reference: Query_010
+    def test_misspelled_names(self):
+        result = self.engine.answer("tell me about jupitor")
+        self.assertEqual ((result["choice"], result["planet"], result["status"]), (1, "Jupiter", "ok"))
+        self.assertEqual ((result["confidence"], result["candidates"]), (0.857, ["Jupiter"]))
+        self.assertEqual (self.engine.determine_menu_choice("nepture"), (1, "Neptune"))
+        self.assertEqual (self.engine.answer("what is the mass")["status"], "not_found", "'mass' is not read as Mars")
+        self.assertEqual (self.engine.answer("hello there")["status"], "not_understood")
+        self.assertEqual (self.engine.find_name("the moon of earth").name, "The Moon")
+        self.assertEqual (self.star.find_bodies("ganymed")[0].name, "Ganymede")
+        self.assertEqual (self.star.find_bodies("earth", kind=Planet), [("Earth", 1.0)])
+
+        lazy = create_system("Sol", lazy_moons=True)
+        self.assertEqual (lazy.find_bodies("titon", limit=1)[0].name, "Triton", "Deferred moons are not searched")
+        lazy.add_orbiting_objects([Planet(name="Vulcan", primary=lazy, mass=1)])
+        self.assertEqual (lazy.find_bodies("vulkan", limit=1, kind=Planet)[0].name, "Vulcan")
+        self.assertEqual (create_columnar_system("Sol").find_bodies("saturnn", limit=1)[0].name, "Saturn")
+
+    #Test Plan Reference: Query_011
+    def test_invalid_times_not_understood(self):
+        invalid = self.engine.answer("which body is closest to mars on 2024-02-30")
+        self.assertEqual ((invalid["choice"], invalid["status"]), (9, "not_understood"), "An invalid date is read as a ranking")
+        self.assertIn ("'2024-02-30' is not a valid time", invalid["answer"])
+        for question in ("closest to mars on day 1e5", "closest to mars on day 1" + "0" * 400, "within 5 mkm of io on day nan"):
+            self.assertEqual (self.engine.answer(question)["status"], "not_understood", question[:40])
+        self.assertEqual (ProximityMatcher().match("closest to mars on day 100.").epoch, 100.0)
+
+    #Test Plan Reference: Query_012
+    def test_columnar_and_mapped_systems_answer_alike(self):
+        questions = ("which planet is the heaviest", "three fastest rotating planets", "planets lighter than 10",
+                     "planets further than 1,000 million km", "tell me about jupitor", "count everything",
+                     "total mass of Jupiter", "how many moons does saturn have", "heaviest moon")
+        expected = [self.engine.answer(question) for question in questions]
+        view = create_columnar_system("Sol")
+        self.assertEqual ([QueryEngine(view).answer(question) for question in questions], expected)
+        self.assertEqual ([body.name for body in view.get_sorted_index("mass", Planet).top(2)], ["Jupiter", "Saturn"])
+        self.assertEqual (len(view.get_sorted_index("distance").range()), 31, "The star is not one of its own bodies")
+        self.assertEqual (view.get_name_index(Moon).search("europe", 1)[0].name, "Europa")
+        with tempfile.TemporaryDirectory() as folder:
+            catalog_file = os.path.join(folder, "sol.celcat")
+            write_binary_catalog(view.store, catalog_file)
+            with open_binary_catalog(catalog_file) as catalog:
+                engine = QueryEngine(catalog.get_root())
+                self.assertEqual ([engine.answer(question) for question in questions], expected)
+                engine = None
+
+class ColumnarStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.star = create_system("Sol")
+        self.view = create_columnar_system("Sol")
+
+    def tearDown(self) -> None:
+        self.star = None
+        self.view = None
+
+  # ---------------- Columnar Body Store ------------------
+    #Test Plan Reference: Store_001
+    def test_views_match_objects(self):
+        self.assertEqual(str(self.view), str(self.star), "Star view does not match the star object")
+        for planet_view, planet in zip(self.view.get_orbiting_objects(), self.star.get_orbiting_objects()):
+            self.assertEqual(str(planet_view), str(planet), "Planet view does not match the planet object")
+            self.assertEqual(planet_view.get_orbiting_object_names(), planet.get_orbiting_object_names())
+        self.assertEqual(self.view.get_body("titan").get_primary(), "Saturn", "Moon view does not find its primary")
+        self.assertEqual(self.view.get_planet("earth"), self.view.get_planet("Earth"), "Views of the same body are not equal")
+
+    #Test Plan Reference: Store_002
+    def test_column_queries(self):
+        store = BodyStore.from_star(self.star)
+        names = [store.string(store.name_id[row]) for row in store.top("mass", 2, PLANET)]
+        self.assertEqual(names, ["Jupiter", "Saturn"])
+        far = [store.string(store.name_id[row]) for row in store.select("distance", low=2000, kind=PLANET)]
+        self.assertEqual(far, ["Uranus", "Neptune"])
+        self.assertAlmostEqual(store.total("mass", PLANET), sum(p.get_mass() for p in self.star.get_orbiting_objects()))
+
+    #Test Plan Reference: Store_003
+    def test_binary_catalog_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            catalog_file = os.path.join(folder, "sol.celcat")
+            write_binary_catalog(self.view.store, catalog_file)
+            with open_binary_catalog(catalog_file) as catalog:
+                star = catalog.get_root()
+                self.assertEqual(str(star), str(self.star), "Mapped star does not match the star object")
+                for planet_view, planet in zip(star.get_orbiting_objects(), self.star.get_orbiting_objects()):
+                    self.assertEqual(str(planet_view), str(planet), "Mapped planet does not match the planet object")
+                self.assertEqual(star.get_body("GANYMEDE").get_primary(), "Jupiter")
+                self.assertIsNone(star.get_body("Pluto"))
+                self.assertEqual(catalog.select("mass", low=500, kind=PLANET), [5, 6])
+                star = planet_view = None
+
+    #Test Plan Reference: Store_004
+    def test_binary_catalog_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            open_binary_catalog("planets.json")
+
+    #Test Plan Reference: Store_006
+    def test_binary_catalog_rejects_truncated_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            catalog_file = os.path.join(folder, "sol.celcat")
+            write_binary_catalog(self.view.store, catalog_file)
+            with open(catalog_file, "rb") as file:
+                data = file.read()
+            header_size = HEADER.size + SECTIONS.size
+            offsets = list(SECTIONS.unpack_from(data, HEADER.size))
+            swapped = offsets[:]
+            swapped[2], swapped[3] = swapped[3], swapped[2]
+            past_end = offsets[:-1] + [len(data) + 8]
+            for damaged in (data[:len(data) - 1], data[:offsets[5] + 4], data[:header_size + 8],
+                            data[:HEADER.size] + SECTIONS.pack(*swapped) + data[header_size:],
+                            data[:HEADER.size] + SECTIONS.pack(*past_end) + data[header_size:]):
+                with open(catalog_file, "wb") as file:
+                    file.write(damaged)
+                with self.assertRaises(ValueError, msg=f"A damaged catalog of {len(damaged)} bytes was opened"):
+                    open_binary_catalog(catalog_file)
+
+    #Test Plan Reference: Store_005
+    def test_subtree_totals_worked_out_once(self):
+        for body in self.star.iter_breadth_first():
+            self.assertEqual(tuple(self.view.get_body(body.name).get_subtree_totals()) if body is not self.star
+                             else tuple(self.view.get_subtree_totals()), tuple(body.get_subtree_totals()))
+        store = self.view.store
+        totals = store.subtree_totals
+        self.view.get_body("Io").get_subtree_totals()
+        self.assertIs(store.subtree_totals, totals, "Subtree totals worked out again")
+        store.add_body(MOON, "Moonlet", len(store) - 1)
+        self.assertEqual(tuple(self.view.get_subtree_totals())[1:], (32, 3), "Added body not counted")
+        with self.assertRaises(TypeError):
+            self.view.update_body(self.view.get_planet("Earth"), {"mass": 6})
+
+class QueryServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.query_server = QueryServer(create_system("Sol"), max_pending=2, max_line=64)
+        self.server = await self.query_server.start("127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
+        self.query_server = None
+
+  # ---------------- Query Server ------------------
+    #Test Plan Reference: Server_001
+    async def test_pipelined_questions_answered_in_order(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"how massive is neptune\nhow many moons does mars have\nbye\nsaturn\n")
+        await writer.drain()
+        answers = [json.loads(await reader.readline()) for _ in range(4)]
+        writer.close()
+        await writer.wait_closed()
+        self.assertEqual ([answer["choice"] for answer in answers], [2, 4, 6, 1])
+        self.assertEqual (answers[0]["planet"], "Neptune")
+        self.assertTrue (all(answer["latency_ms"] >= 0 for answer in answers))
+        self.assertEqual (self.query_server.latency_summary()["answered"], 4)
+
+    #Test Plan Reference: Server_002
+    async def test_too_long_question_closes_connection(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"x" * 200 + b"\n")
+        await writer.drain()
+        answer = json.loads(await reader.readline())
+        self.assertEqual (answer["status"], "too_long")
+        self.assertEqual (await reader.readline(), b"", "Connection is not closed after a too long question")
+        writer.close()
+
+    #Test Plan Reference: Server_003
+    async def test_error_answering_keeps_connection(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        with patch.object(QueryEngine, "get_locator", side_effect=ValueError("Unknown orbital element 'eccentricty'")), \
+                self.assertLogs(level="ERROR"):
+            writer.write(b"closest to mars\nsaturn\n")
+            await writer.drain()
+            answers = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        await writer.wait_closed()
+        self.assertEqual ([answer["status"] for answer in answers], ["error", "ok"])
+
+@unittest.skipUnless(np is not None, "NumPy is not installed")
+class EphemerisTest(unittest.TestCase):
+    def setUp(self) -> None:
+        elements = {"the moon": {"semi_major_axis": 0.3844, "eccentricity": 0.055, "period": 27.3}}
+        self.ephemeris = Ephemeris.from_star(create_system("Sol"), elements)
+        self.earth = self.ephemeris.names.index("Earth")
+        self.moon = self.ephemeris.names.index("The Moon")
+
+    def tearDown(self) -> None:
+        self.ephemeris = None
+
+  # ---------------- Ephemeris ------------------
+    #Test Plan Reference: Ephemeris_001
+    def test_circular_orbit_from_distance(self):
+        period = 2 * np.pi / self.ephemeris.mean_motion[self.earth]
+        self.assertAlmostEqual (period, 365.25, delta=1)
+        start, half = self.ephemeris.positions([0, period / 2])[:, self.earth]
+        self.assertAlmostEqual (np.linalg.norm(start), 149.6, places=3)
+        np.testing.assert_allclose(half, -start, atol=1e-6)
+
+    #Test Plan Reference: Ephemeris_002
+    def test_kepler_equation_and_moons_follow_planets(self):
+        mean_anomaly = np.linspace(-10, 10, 1001)
+        anomaly, sine, _ = Ephemeris.solve_kepler(mean_anomaly, 0.9)
+        np.testing.assert_allclose(anomaly - 0.9 * sine, np.remainder(mean_anomaly, 2 * np.pi), atol=1e-12)
+        positions = self.ephemeris.positions(np.linspace(0, 30, 7))
+        offsets = np.linalg.norm(positions[:, self.moon] - positions[:, self.earth], axis=1)
+        self.assertTrue (np.all((offsets >= 0.3844 * 0.945 - 1e-9) & (offsets <= 0.3844 * 1.055 + 1e-9)))
+        self.assertGreater (offsets.max() - offsets.min(), 0.01)
+
+    #Test Plan Reference: Ephemeris_003
+    def test_export_streams_chunks_to_file(self):
+        folder = tempfile.mkdtemp()
+        try:
+            times = np.linspace(0, 100, 7)
+            path = os.path.join(folder, "positions.npy")
+            summary = export_positions(self.ephemeris, times, path, time_chunk=3, body_chunk=5)
+            self.assertEqual (summary["positions"], 7 * len(self.ephemeris))
+            np.testing.assert_allclose(np.load(path), self.ephemeris.positions(times), atol=1e-9)
+            with open(os.path.join(folder, "positions.json")) as index_file:
+                self.assertEqual (json.load(index_file)["names"], self.ephemeris.names)
+
+            path = os.path.join(folder, "positions.csv")
+            export_positions(self.ephemeris, times[:2], path, "csv", time_chunk=1, body_chunk=4)
+            with open(path) as csv_file:
+                lines = csv_file.read().splitlines()
+            self.assertEqual (lines[0], "time,name,x,y,z")
+            self.assertEqual (len(lines), 1 + 2 * len(self.ephemeris))
+
+            with self.assertRaises(ValueError):
+                export_positions(self.ephemeris, times, path, "csv", workers=-1)
+        finally:
+            shutil.rmtree(folder)
+
+    #Test Plan Reference: Ephemeris_004
+    def test_orbits_read_from_catalog_folder(self):
+        folder = tempfile.mkdtemp()
+        try:
+            shutil.copy("planets.json", folder)
+            with open(os.path.join(folder, "orbits.json"), "w") as orbits_file:
+                json.dump({"Mars": {"eccentricity": 0.5}}, orbits_file)
+            star = create_system("Sol")
+            self.assertEqual (BodyLocator(star, catalog_folder=folder).elements, {"mars": {"eccentricity": 0.5}})
+            self.assertIn ("mercury", BodyLocator(star).elements, "The current directory's orbits are the default")
+            self.assertEqual (BodyLocator(star, catalog_folder=os.path.join(folder, "missing")).elements, {})
+
+            with open(os.path.join(folder, "orbits.json"), "w") as orbits_file:
+                json.dump({"Mars": {"eccentricty": 0.5}}, orbits_file)
+            with self.assertLogs(level="ERROR"):
+                result = QueryEngine(star, catalog_folder=folder).answer_safely("closest to mars")
+            self.assertEqual (result["status"], "error", "The misspelled element in the catalog folder is not read")
+        finally:
+            shutil.rmtree(folder)
+
+
+@unittest.skipUnless(np is not None, "NumPy is not installed")
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.points = np.random.default_rng(0).uniform(-100, 100, (2000, 3))
+        self.tree = KDTree(self.points, leaf_size=8)
+
+    def tearDown(self) -> None:
+        self.tree = None
+
+  # ---------------- Spatial Index ------------------
+    #Test Plan Reference: Spatial_001
+    def test_queries_match_brute_force(self):
+        for point in self.points[:20]:
+            distances = np.linalg.norm(self.points - point, axis=1)
+            indices, found = self.tree.query(point, 5)
+            np.testing.assert_allclose(found, np.sort(distances)[:5])
+            indices, found = self.tree.query_radius(point, 15.0)
+            self.assertEqual (sorted(indices.tolist()), np.flatnonzero(distances <= 15.0).tolist())
+            self.assertTrue (np.all(np.diff(found) >= 0))
+
+    #Test Plan Reference: Spatial_002
+    def test_refit_keeps_queries_exact(self):
+        moved = self.points + np.random.default_rng(1).normal(0, 5, self.points.shape)
+        self.tree.refit(moved)
+        self.assertGreater (self.tree.spread(), self.tree.built_spread)
+        for point in moved[:20]:
+            distances = np.linalg.norm(moved - point, axis=1)
+            np.testing.assert_allclose(self.tree.query(point, 3)[1], np.sort(distances)[:3])
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        metrics.reset()
+
+    def tearDown(self) -> None:
+        metrics.enable(False)
+        metrics.reset()
+
+  # ---------------- Instrumentation ------------------
+    #Test Plan Reference: Metrics_001
+    def test_nothing_recorded_while_disabled(self):
+        engine = QueryEngine(create_system("Sol"))
+        engine.answer("mass of mars")
+        self.assertEqual ((metrics.counters, metrics.histograms), ({}, {}))
+        self.assertEqual (metrics.format_prometheus(), "")
+
+    #Test Plan Reference: Metrics_002
+    def test_spans_counters_and_exports(self):
+        metrics.enable()
+        engine = QueryEngine(create_system("Sol"))
+        engine.answer("mass of mars")
+        engine.answer("tell me about vulcan")
+        engine.determine_menu_choice("mass of mars")
+        load_json_data("planets.json")
+        self.assertEqual (metrics.histograms["load_json_data"].count, 1)
+        self.assertEqual (metrics.histograms["create_planets"].count, 1)
+        self.assertEqual (metrics.histograms["determine_menu_choice"].count, 1)
+        self.assertEqual (metrics.histograms["answer"].count, 2)
+        self.assertEqual (metrics.counters[("answers", (("status", "not_found"),))], 1)
+        text = metrics.format_prometheus()
+        self.assertIn ('celestial_span_seconds_count{span="create_moons"} 1', text)
+        self.assertIn ('celestial_span_seconds_bucket{span="answer",le="+Inf"} 2', text)
+        self.assertIn ('celestial_answers_total{status="ok"} 1', text)
+        self.assertIn ("answer n=2", metrics.format_log_line())
+
+
+class HotReloadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+        self.planets_file = os.path.join(self.folder, "planets.json")
+        self.moons_file = os.path.join(self.folder, "moons.json")
+        shutil.copy("planets.json", self.planets_file)
+        shutil.copy("moons.json", self.moons_file)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    def rewrite(self, planets, moons) -> None:
+        for filename, data in ((self.planets_file, planets), (self.moons_file, moons)):
+            stat = os.stat(filename)
+            with open(filename, "w") as file:
+                json.dump(data, file)
+            os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+  # ---------------- Hot Reload ------------------
+    #Test Plan Reference: Reload_001
+    def test_changes_applied_in_place(self):
+        star = create_system("Sol", self.planets_file, self.moons_file)
+        engine = QueryEngine(star)
+        watcher = CatalogWatcher(star, self.planets_file, self.moons_file)
+        self.assertEqual (engine.answer("heaviest planet")["answer"], "The heaviest planet is Jupiter (1898 x 10^24 kg).")
+        star.get_subtree_totals()
+        earth, mars = star.get_planet("Earth"), star.get_planet("Mars")
+        self.assertIsNone (watcher.check(), "Unchanged files are not reloaded")
+
+        planets, moons = load_json_data(self.planets_file), load_json_data(self.moons_file)
+        planets = [planet for planet in planets if planet["name"] != "Venus"]
+        next(planet for planet in planets if planet["name"] == "Mars")["mass"] = 5000
+        planets.append({**planets[0], "name": "Vulcan", "mass": 1})
+        moons["Vulcan"] = ["Phobos", "Spock"]
+        moons["Mars"] = ["Deimos"]
+        self.rewrite(planets, moons)
+        diff = watcher.check()
+        self.assertEqual (diff.describe(), "1 planet(s) added, 1 removed, 1 changed; 2 moon(s) added, 1 removed")
+
+        self.assertIs (star.get_planet("Earth"), earth, "Unchanged planets are kept")
+        self.assertIs (star.get_planet("Mars"), mars)
+        self.assertIsNone (star.get_planet("Venus"))
+        self.assertEqual (star.get_body("Phobos").get_primary(), "Vulcan")
+        self.assertEqual (engine.answer("heaviest planet")["answer"], "The heaviest planet is Mars (5000 x 10^24 kg).")
+        self.assertEqual (engine.answer("how many moons does mars have")["answer"],
+                          "The number of moons orbiting planet Mars is: 1.\n\nThey are Deimos")
+        fresh = create_system("Sol", self.planets_file, self.moons_file)
+        self.assertEqual (star.get_subtree_totals(), fresh.get_subtree_totals())
+        self.assertEqual (sorted(star.body_index), sorted(fresh.body_index))
+
+    #Test Plan Reference: Reload_002
+    def test_bad_files_leave_catalog_alone(self):
+        star = create_system("Sol", self.planets_file, self.moons_file, lazy_moons=True)
+        watcher = CatalogWatcher(star, self.planets_file, self.moons_file, lazy_moons=True)
+        version = star.get_catalog_version()
+        self.rewrite([{"name": "Vulcan"}], {})
+        self.assertIsNone (watcher.check())
+        self.assertEqual (star.get_catalog_version(), version)
+        self.assertIsNotNone (star.get_planet("Earth"))
+
+        planets = load_json_data("planets.json")
+        self.rewrite(planets, {**load_json_data("moons.json"), "Neptune": ["Triton", "Larissa"]})
+        watcher.check()
+        self.assertEqual (star.get_planet("Neptune").get_orbiting_object_names(), "Triton, Larissa")
+        self.assertIsNotNone (star.get_body("Uranus"))
+
+
+class StartupTest(unittest.TestCase):
+  # ---------------- Startup ------------------
+    #Test Plan Reference: Startup_001
+    def test_headless_import_budget(self):
+        times = measure_import("main")
+        self.assertEqual (check_budget(times, "main", 2000), [],
+                          "Importing main must not load the GUI, NumPy or asyncio and must stay well under two seconds")
+
+    #Test Plan Reference: Startup_002
+    def test_headless_questions_do_not_load_numpy(self):
+        script = ("import io, sys\n"
+                  "from main import create_system, run_batch\n"
+                  "questions = io.StringIO('tell me about mars\\nheaviest planet\\nplanets further than 1000 million km\\n"
+                  "how many moons does jupitor have\\ncount everything\\n')\n"
+                  "run_batch(create_system('Sol'), questions, io.StringIO())\n"
+                  "print(sorted(name for name in ('numpy', 'tkinter', 'asyncio') if name in sys.modules))\n")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual (result.returncode, 0, result.stderr)
+        self.assertEqual (result.stdout.strip(), "[]", "Answering questions that need no positions loaded NumPy")
+        self.assertEqual (EXPORT_FORMATS, FORMATS)
+
+
+class ScalingBenchmarkTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    def compare_runs(self, baseline: dict, current: dict, threshold: float = 0.2, min_seconds: float = 0.001) -> tuple:
+        files = []
+        for name, results in (("baseline.json", baseline), ("current.json", current)):
+            files.append(os.path.join(self.folder, name))
+            with open(files[-1], "w") as file:
+                json.dump({"meta": {}, "results": results}, file)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = compare(argparse.Namespace(baseline=files[0], current=files[1], threshold=threshold,
+                                                min_seconds=min_seconds))
+        return status, [line for line in output.getvalue().splitlines() if "REGRESSION" in line]
+
+  # ---------------- Scaling Benchmark ------------------
+    #Test Plan Reference: Bench_001
+    def test_compare_flags_only_real_slowdowns(self):
+        baseline = {"1000": {"create_system": {"min": 0.09, "median": 0.1}, "format_answers": {"min": 0.0001, "median": 0.0001}},
+                    "10000": {"create_system": {"min": 0.9, "median": 1.0}}}
+        current = {"1000": {"create_system": {"min": 0.1, "median": 0.115}, "format_answers": {"min": 0.0004, "median": 0.0005}},
+                   "10000": {"create_system": {"min": 1.2, "median": 1.3}, "create_moons": {"min": 9.0, "median": 9.0}}}
+        status, flagged = self.compare_runs(baseline, current)
+        self.assertEqual (status, 1)
+        self.assertEqual (len(flagged), 1, "Only the 30% slowdown is over 20% and over a millisecond")
+        self.assertEqual (flagged[0].split()[:2], ["10000", "create_system"])
+        self.assertEqual (self.compare_runs(baseline, current, threshold=0.5), (0, []))
+        self.assertEqual (self.compare_runs(baseline, current, min_seconds=0.0001)[1][0].split()[1], "format_answers")
+        self.assertEqual (self.compare_runs(baseline, {"100": current["1000"]}), (0, []), "Sizes in one run only are skipped")
+
+
+class StandInCanvas:
+    """
+    Just enough of a tk.Canvas for ScrollableFrame to lay out and scroll rows without a display.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.top = 0
+        self.options = {}
+        self.windows = {}
+        self.next_window = 1
+        self.idle = []
+
+    def configure(self, **options) -> None:
+        self.options.update(options)
+
+    def bind(self, sequence, function) -> None:
+        pass
+
+    def pack(self, **options) -> None:
+        pass
+
+    def winfo_width(self) -> int:
+        return self.width
+
+    def winfo_height(self) -> int:
+        return self.height
+
+    def canvasy(self, y) -> float:
+        return self.top + y
+
+    def yview(self) -> tuple:
+        total = max(self.options["scrollregion"][3], 1)
+        return self.top / total, min((self.top + self.height) / total, 1.0)
+
+    def yview_moveto(self, fraction) -> None:
+        self.top = fraction * self.options.get("scrollregion", (0, 0, 0, 0))[3]
+
+    def after_idle(self, function) -> None:
+        self.idle.append(function)
+
+    def run_idle(self) -> None:
+        while self.idle:
+            self.idle.pop(0)()
+
+    def update_idletasks(self) -> None:
+        pass
+
+    def create_window(self, x, y, window=None, anchor=None, width=None) -> int:
+        self.windows[self.next_window] = [x, y, window, width]
+        self.next_window += 1
+        return self.next_window - 1
+
+    def coords(self, window, x, y) -> None:
+        self.windows[window][:2] = [x, y]
+
+    def itemconfigure(self, window, width=None) -> None:
+        self.windows[window][3] = width
+
+    def delete(self, window) -> None:
+        del self.windows[window]
+
+
+class StandInRow:
+    """
+    A row whose widget asks for a height that depends on the item it shows.
+    """
+
+    def __init__(self) -> None:
+        self.item = None
+
+    def winfo_reqheight(self) -> int:
+        return 80 if self.item % 2 == 0 else 40
+
+
+class ScrollableFrameTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.frame = ScrollableFrame.__new__(ScrollableFrame)
+        self.frame.frame = MagicMock()
+        self.frame.scrollbar = MagicMock()
+        self.frame.canvas = self.canvas = StandInCanvas(400, 300)
+        self.frame.items, self.frame.heights, self.frame.offsets = [], [], [0]
+        self.frame.visible, self.frame.pool = {}, []
+        self.frame.create_row, self.frame.fill_row = None, None
+        self.frame.overscan, self.frame.padding, self.frame.refresh_pending = 2, 10, False
+        self.created = []
+
+    def tearDown(self) -> None:
+        self.frame = None
+        self.canvas = None
+
+    def create_row(self, parent) -> StandInRow:
+        self.created.append(StandInRow())
+        return self.created[-1]
+
+    def fill_row(self, row, item) -> StandInRow:
+        row.item = item
+        return row
+
+    def expected_range(self) -> list:
+        offsets = self.frame.offsets
+        first = max(bisect_right(offsets, self.canvas.top) - 1 - 2, 0)
+        last = min(bisect_left(offsets, self.canvas.top + self.canvas.height) + 2, len(self.frame.items))
+        return list(range(first, last))
+
+  # ---------------- Scrollable Frame ------------------
+    #Test Plan Reference: Scroll_001
+    def test_only_visible_rows_created_and_measured(self):
+        self.frame.show_items(range(1000), self.create_row, self.fill_row, estimated_height=260)
+        self.canvas.run_idle()
+        self.assertEqual (sorted(self.frame.visible), self.expected_range())
+        self.assertLessEqual (len(self.created), 10, "Rows were created for items out of view")
+        shown = sorted(self.frame.visible)
+        self.assertEqual ([self.frame.heights[index] for index in shown], [100 if index % 2 == 0 else 60 for index in shown])
+        self.assertEqual (self.frame.heights[shown[-1] + 1:], [260] * (999 - shown[-1]), "Rows not yet shown keep the estimate")
+        self.assertEqual (self.canvas.options["scrollregion"], (0, 0, 400, sum(self.frame.heights)))
+        for index, (row, widget, window) in self.frame.visible.items():
+            self.assertEqual ((row.item, self.canvas.windows[window][:2]), (index, [10, self.frame.offsets[index] + 10]))
+        self.assertEqual (len(self.canvas.windows), len(self.frame.visible))
+
+    #Test Plan Reference: Scroll_002
+    def test_rows_recycled_when_scrolling_and_reshowing(self):
+        self.frame.show_items(range(1000), self.create_row, self.fill_row, estimated_height=260)
+        self.canvas.run_idle()
+        items = set(self.frame.visible)
+        for top in (2_000, 50_000, 120_000, 0):
+            self.canvas.top = top
+            self.frame.refresh()
+            self.canvas.run_idle()
+            self.assertEqual (sorted(self.frame.visible), self.expected_range(), f"Wrong rows shown at {top}")
+            self.assertTrue (all(row.item == index for index, (row, _, _) in self.frame.visible.items()))
+            items.update(self.frame.visible)
+        self.assertLessEqual (len(self.created), 12, "Rows that scrolled out of view were not reused")
+        self.assertGreater (len(items), 2 * len(self.created))
+        self.assertEqual (len(self.frame.pool) + len(self.frame.visible), len(self.created))
+        self.assertEqual (len(self.canvas.windows), len(self.frame.visible), "Windows of recycled rows were not deleted")
+
+        rows = len(self.created)
+        self.frame.show_items([10, 11, 12], self.create_row, self.fill_row)
+        self.canvas.run_idle()
+        self.assertEqual (len(self.created), rows, "Rows of the previous list were not reused")
+        self.assertEqual ([row.item for row, _, _ in self.frame.visible.values()], [10, 11, 12])
+        self.assertEqual (self.canvas.options["scrollregion"], (0, 0, 400, 100 + 60 + 100))
+        self.assertEqual (self.frame.offsets, [0, 100, 160, 260])
+
+
+class StandInWindow:
+    """
+    Just enough of a tk.Toplevel for WindowPool to withdraw, destroy and bind it without a display.
+    """
+
+    def __init__(self) -> None:
+        self.state = "normal"
+        self.bindings = {}
+        self.protocols = {}
+
+    def protocol(self, name, function) -> None:
+        self.protocols[name] = function
+
+    def withdraw(self) -> None:
+        self.state = "withdrawn"
+
+    def destroy(self) -> None:
+        self.state = "destroyed"
+
+    def bind(self, sequence, function, add=None) -> str:
+        self.bindings[sequence] = function
+        return f"binding-{len(self.bindings)}"
+
+    def unbind(self, sequence, binding) -> None:
+        del self.bindings[sequence]
+
+
+class StandInView:
+    """
+    A view that counts how often it is redrawn and returns itself to its pool when closed.
+    """
+
+    def __init__(self, master) -> None:
+        self.master = master
+        self.root = StandInWindow()
+        self.pool = None
+        self.refreshed = 0
+
+    def refresh(self) -> None:
+        self.refreshed += 1
+
+    def close(self) -> None:
+        self.pool.release(self)
+
+
+class OtherStandInView(StandInView):
+    pass
+
+
+class WindowPoolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = MagicMock()
+        self.pool = WindowPool(self.root, max_idle=1)
+
+    def tearDown(self) -> None:
+        self.root = None
+        self.pool = None
+
+  # ---------------- Window Pool ------------------
+    #Test Plan Reference: Pool_001
+    def test_closed_views_reused(self):
+        first = self.pool.acquire(StandInView, StandInView)
+        self.assertEqual ((first.master, first.pool, self.pool.active), (self.root, self.pool, [first]))
+        first.root.protocols["WM_DELETE_WINDOW"]()
+        self.assertEqual ((first.root.state, self.pool.active), ("withdrawn", []), "Closing did not withdraw the window")
+        self.assertIs (self.pool.acquire(StandInView, StandInView), first, "The closed view was not reused")
+        other = self.pool.acquire(OtherStandInView, OtherStandInView)
+        self.assertIsNot (other, first, "A view of another kind was reused")
+        self.assertEqual (self.pool.active, [first, other])
+
+    #Test Plan Reference: Pool_002
+    def test_views_over_the_idle_limit_destroyed(self):
+        views = [self.pool.acquire(StandInView, StandInView) for _ in range(3)]
+        for view in views:
+            view.close()
+        self.assertEqual ([view.root.state for view in views], ["withdrawn", "destroyed", "destroyed"])
+        self.assertEqual (self.pool.idle[StandInView], views[:1])
+        views[0].close()
+        self.assertEqual (self.pool.idle[StandInView], views[:1], "A view released twice was kept twice")
+        self.assertEqual (views[0].root.state, "withdrawn", "A view released twice was destroyed while kept")
+
+    #Test Plan Reference: Pool_003
+    def test_refresh_redraws_open_views_only(self):
+        open_view, closed = self.pool.acquire(StandInView, StandInView), self.pool.acquire(StandInView, StandInView)
+        closed.close()
+        self.pool.refresh()
+        self.assertEqual ((open_view.refreshed, closed.refreshed), (1, 0))
+
+    #Test Plan Reference: Pool_004
+    def test_first_frame_logged_once(self):
+        window = StandInWindow()
+        with self.assertLogs(level="INFO") as logs:
+            self.pool.track_first_frame(window, time.perf_counter(), "Planet info")
+            window.bindings["<Expose>"](None)
+        self.assertEqual (len(self.pool.latencies), 1)
+        self.assertIn ("Planet info window drawn", logs.output[0])
+        self.assertNotIn ("<Expose>", window.bindings, "Later redraws would be logged too")
+
 
 if __name__ == "__main__":
     unittest.main()